@@ -1,6 +1,9 @@
+import json
 import os
 import subprocess
 
+from processor_protocol import report_job, report_start, run_tool, serve
+
 def process_chd_queue(queue):
     """
     Process a list of ROMs for compression to CHD format using chdman.
@@ -14,13 +17,15 @@ def process_chd_queue(queue):
         
         if not action or action not in ['Compress', 'Uncompress'] or not file_path or not os.path.exists(file_path):
             print(f"Skipping invalid item: {item}")
+            report_job(file_path, [file_path] if file_path else [], [], ok=False)
             continue
             
         # Get the chdman executable path
         chdman_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chdman", "chdman.exe")
         if not os.path.exists(chdman_path):
             print(f"ERROR: chdman.exe not found at: {chdman_path}")
-            return
+            report_job(file_path, [file_path], [], ok=False)
+            continue
         
         # Handle decompression (CHD to ISO/BIN+CUE)
         if action == 'Uncompress' and file_path.lower().endswith('.chd'):
@@ -34,11 +39,13 @@ def process_chd_queue(queue):
                 bin_path = base_name + '.bin'
                 
                 print(f"Decompressing PS2 CHD: {file_path} -> BIN/CUE format")
+                report_start(file_path, [cue_path, bin_path])
+                ok = False
                 
                 try:
                     cmd = [chdman_path, "extractcd", "-i", file_path, "-o", cue_path, "-ob", bin_path]
                     print(f"Running command: {' '.join(cmd)}")
-                    subprocess.run(cmd, check=True)
+                    run_tool(cmd)
                     
                     # Verifica se os arquivos foram gerados com sucesso
                     if os.path.exists(cue_path) and os.path.exists(bin_path):
@@ -47,33 +54,39 @@ def process_chd_queue(queue):
                         print(f"Successfully extracted {file_path} to BIN/CUE format")
                         print(f"BIN file: {bin_path} (Size: {bin_size} bytes)")
                         print(f"CUE file: {cue_path} (Size: {cue_size} bytes)")
+                        ok = True
                     else:
                         print(f"Warning: Output files not found after extraction")
                 except subprocess.CalledProcessError as e:
                     print(f"Error decompressing {file_path}: {e}")
                 except Exception as e:
                     print(f"General error during decompression: {e}")
+                report_job(file_path, [file_path], [cue_path, bin_path], ok)
             else:
                 # Para outros sistemas, mantém o formato ISO
                 out_path = os.path.splitext(file_path)[0] + '.iso'
                 
                 print(f"Decompressing CHD: {file_path} ({platform}) -> {out_path}")
+                report_start(file_path, [out_path])
+                ok = False
                 
                 try:
                     cmd = [chdman_path, "extractcd", "-i", file_path, "-o", out_path]
                     print(f"Running command: {' '.join(cmd)}")
-                    subprocess.run(cmd, check=True)
+                    run_tool(cmd)
                     
                     # Verifica se o arquivo ISO foi gerado com sucesso
                     if os.path.exists(out_path):
                         iso_size = os.path.getsize(out_path)
                         print(f"Successfully extracted {file_path} to {out_path} (Size: {iso_size} bytes)")
+                        ok = True
                     else:
                         print(f"Warning: Output file {out_path} not found after extraction")
                 except subprocess.CalledProcessError as e:
                     print(f"Error decompressing {file_path}: {e}")
                 except Exception as e:
                     print(f"General error during decompression: {e}")
+                report_job(file_path, [file_path], [out_path], ok)
             continue
         
         # Handle compression
@@ -83,6 +96,12 @@ def process_chd_queue(queue):
         
         # Para PlayStation 2, verificamos especialmente se é um arquivo .cue ou .bin
         is_ps2 = platform and ('playstation 2' in platform.lower() or platform.lower() == 'ps2')
+        inputs = [file_path]
+        outputs = [out_path]
+        ok = False
+        # A PS2 .bin without .cue gets one generated next to it
+        cue_path = os.path.splitext(file_path)[0] + '.cue'
+        report_start(file_path, [out_path, cue_path] if is_ps2 and ext == '.bin' else [out_path])
         
         try:
             if is_ps2 and ext == '.cue':
@@ -94,6 +113,7 @@ def process_chd_queue(queue):
                 cue_path = os.path.splitext(file_path)[0] + '.cue'
                 if os.path.exists(cue_path):
                     print(f"Found matching .cue file for PS2 .bin, using that instead: {cue_path}")
+                    inputs.append(cue_path)
                     cmd = [chdman_path, "createcd", "-i", cue_path, "-o", out_path]
                 else:
                     print(f"Warning: PS2 .bin file without .cue. Creating .cue file...")
@@ -101,6 +121,7 @@ def process_chd_queue(queue):
                     bin_name = os.path.basename(file_path)
                     with open(cue_path, 'w') as f:
                         f.write(f'FILE "{bin_name}" BINARY\n  TRACK 01 MODE2/2352\n    INDEX 01 00:00:00')
+                    outputs.append(cue_path)
                     cmd = [chdman_path, "createcd", "-i", cue_path, "-o", out_path]
             elif is_ps2 and ext == '.iso':
                 print(f"Warning: PS2 .iso files might not compress correctly with chdman.")
@@ -114,30 +135,36 @@ def process_chd_queue(queue):
                 cue_path = os.path.splitext(file_path)[0] + '.cue'
                 if os.path.exists(cue_path):
                     print(f"Found matching .cue file, using that instead: {cue_path}")
+                    inputs.append(cue_path)
                     cmd = [chdman_path, "createcd", "-i", cue_path, "-o", out_path]
                 else:
                     cmd = [chdman_path, "createraw", "-i", file_path, "-o", out_path]
             else:
                 print(f"Unsupported file type for CHD: {file_path}")
+                report_job(file_path, inputs, [], ok=False)
                 continue
                 
             print(f"Running command: {' '.join(cmd)}")
             # Don't use shell=True to avoid path quoting issues
-            subprocess.run(cmd, check=True)
+            run_tool(cmd)
+            ok = True
         except subprocess.CalledProcessError as e:
             print(f"Error compressing {file_path} to CHD: {e}")
         except Exception as e:
             print(f"General error: {e}")
+        report_job(file_path, inputs, outputs, ok)
 
 if __name__ == "__main__":
     import argparse
-    import json
     parser = argparse.ArgumentParser(description="Process a queue of ROMs for CHD compression.")
-    parser.add_argument("queue_file", help="Path to a JSON file containing the queue list.")
+    parser.add_argument("queue_file", nargs="?", help="Path to a JSON file containing the queue list.")
+    parser.add_argument("--serve", action="store_true", help="Take jobs as JSON lines on stdin instead of a queue file.")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output.")
     args = parser.parse_args()
 
-    if not os.path.exists(args.queue_file):
+    if args.serve:
+        serve(process_chd_queue)
+    elif not args.queue_file or not os.path.exists(args.queue_file):
         print(f"Queue file not found: {args.queue_file}")
     else:
         with open(args.queue_file, "r", encoding="utf-8") as f:
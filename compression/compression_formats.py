@@ -10,3 +10,26 @@ def is_compressed(filename):
     import os
     ext = os.path.splitext(filename)[1].lower()
     return ext in COMPRESSED_EXTENSIONS
+
+
+def get_format(filename):
+    """File format as stored in roms.db: the lower-case extension without the dot."""
+    import os
+    return os.path.splitext(filename)[1].lower().lstrip('.')
+
+
+# Rough share of the original size saved by compressing each format (CHD for disc images, NSZ/XCZ for Switch).
+# Only used to rank and pre-select ROMs before anything has been compressed.
+TYPICAL_SAVINGS = {
+    'iso': 0.35,
+    'bin': 0.45,
+    'img': 0.40,
+    'gdi': 0.45,
+    'nsp': 0.25,
+    'xci': 0.30,
+}
+
+
+def savings_ratio(file_format):
+    """Expected fraction of the size saved by compressing a file of this format (0 when unknown)."""
+    return TYPICAL_SAVINGS.get((file_format or '').lower(), 0.0)
@@ -1,6 +1,9 @@
+import json
 import os
 import subprocess
 
+from processor_protocol import report_job, report_start, run_tool, serve
+
 def process_nsz_queue(queue):
     """
     Process a list of Nintendo Switch ROMs for compression or decompression using NSZ.
@@ -11,31 +14,44 @@ def process_nsz_queue(queue):
         file_path = item.get('path')
         if not file_path or not os.path.exists(file_path):
             print(f"File not found: {file_path}")
+            report_job(file_path, [file_path] if file_path else [], [], ok=False)
             continue
         if action == 'Compress' and file_path.lower().endswith('.nsp'):
             print(f"Compressing NSP: {file_path}")
+            report_start(file_path, [os.path.splitext(file_path)[0] + '.nsz'])
+            ok = False
             try:
-                subprocess.run(["nsz", "-C", "-w", file_path], check=True)
+                run_tool(["nsz", "-C", "-w", file_path])
+                ok = True
             except subprocess.CalledProcessError as e:
                 print(f"Error compressing {file_path}: {e}")
+            # nsz -w writes next to the input, same name
+            report_job(file_path, [file_path], [os.path.splitext(file_path)[0] + '.nsz'], ok)
         elif action == 'Uncompress' and file_path.lower().endswith('.nsz'):
             print(f"Decompressing NSZ: {file_path}")
+            report_start(file_path, [os.path.splitext(file_path)[0] + '.nsp'])
+            ok = False
             try:
-                subprocess.run(["nsz", "-D", "-w", file_path], check=True)
+                run_tool(["nsz", "-D", "-w", file_path])
+                ok = True
             except subprocess.CalledProcessError as e:
                 print(f"Error decompressing {file_path}: {e}")
+            report_job(file_path, [file_path], [os.path.splitext(file_path)[0] + '.nsp'], ok)
         else:
             print(f"Unsupported action or file type for: {file_path}")
+            report_job(file_path, [file_path], [], ok=False)
 
 if __name__ == "__main__":
     import argparse
-    import json
     parser = argparse.ArgumentParser(description="Process a queue of Nintendo Switch ROMs for NSZ compression or decompression.")
-    parser.add_argument("queue_file", help="Path to a JSON file containing the queue list.")
+    parser.add_argument("queue_file", nargs="?", help="Path to a JSON file containing the queue list.")
+    parser.add_argument("--serve", action="store_true", help="Take jobs as JSON lines on stdin instead of a queue file.")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output.")
     args = parser.parse_args()
 
-    if not os.path.exists(args.queue_file):
+    if args.serve:
+        serve(process_nsz_queue)
+    elif not args.queue_file or not os.path.exists(args.queue_file):
         print(f"Queue file not found: {args.queue_file}")
     else:
         with open(args.queue_file, "r", encoding="utf-8") as f:
@@ -0,0 +1,140 @@
+"""
+What the queue processors (chd_queue_processor.py, nsz_queue_processor.py) print
+and read, shared by both. They run as scripts with this folder as sys.path[0]
+and import it as processor_protocol; core reads the same prefixes from here.
+"""
+import json
+import os
+import subprocess
+import time
+
+# Prefix of the line read back by core.queue_manager.parse_job_report
+JOB_REPORT_PREFIX = "@@job "
+# Printed before an item starts, with the files it is about to create
+JOB_START_PREFIX = "@@start "
+# Last line printed for each job in --serve mode (read by core.processor_pool)
+JOB_DONE_PREFIX = "@@done "
+
+# CPU seconds of finished tools that the OS does not total for us (Windows, see run_tool)
+_tool_cpu = [0.0]
+# cpu_seconds() when the current item started (report_start), for report_job
+_item_cpu = [None]
+
+def _windows_process_cpu(proc):
+    """User + kernel CPU seconds of a finished Popen, from its still open process handle."""
+    import ctypes
+    from ctypes import wintypes
+    times = [wintypes.FILETIME() for _ in range(4)]  # creation, exit, kernel, user
+    if not ctypes.windll.kernel32.GetProcessTimes(wintypes.HANDLE(int(proc._handle)), *[ctypes.byref(t) for t in times]):
+        return 0.0
+    return sum(t.dwHighDateTime << 32 | t.dwLowDateTime for t in times[2:]) / 1e7
+
+def run_tool(cmd):
+    """subprocess.run(cmd, check=True) that also counts the tool's CPU time in cpu_seconds()."""
+    proc = subprocess.Popen(cmd)
+    try:
+        proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    if os.name == "nt":
+        _tool_cpu[0] += _windows_process_cpu(proc)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+def cpu_seconds():
+    """CPU seconds (user + system) used so far by this processor and the tools it ran."""
+    total = time.process_time() + _tool_cpu[0]
+    try:
+        import resource
+    except ImportError:
+        return total
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return total + usage.ru_utime + usage.ru_stime
+
+def report_start(path, outputs):
+    """
+    Print the outputs an item is about to create, leaving out files that already exist:
+    if the item is interrupted, these are the partial files to clean up.
+    """
+    _item_cpu[0] = cpu_seconds()
+    outputs = [p for p in outputs if not os.path.exists(p)]
+    print(JOB_START_PREFIX + json.dumps({'path': path, 'outputs': outputs}, ensure_ascii=False), flush=True)
+
+def report_job(path, inputs, outputs, ok=True):
+    """
+    Print the files one item read and the ones it wrote (those that exist), as a single JSON line.
+    Every item of a queue ends with one, so the caller can finish items one by one.
+    Items that got as far as report_start also carry the CPU seconds they used ('cpu').
+    """
+    outputs = [p for p in outputs if os.path.exists(p)]
+    report = {'path': path, 'inputs': inputs, 'outputs': outputs, 'ok': ok}
+    if _item_cpu[0] is not None:
+        report['cpu'] = round(cpu_seconds() - _item_cpu[0], 3)
+        _item_cpu[0] = None
+    print(JOB_REPORT_PREFIX + json.dumps(report, ensure_ascii=False), flush=True)
+
+def serve(process_queue):
+    """
+    Take jobs as JSON lines on stdin until it is closed (core.processor_pool).
+    Each job is one queue item, or a list of them under 'items', plus a 'job'
+    number, handed to process_queue one item at a time and answered with the
+    usual output (one report_job line per item)
+    and then a JOB_DONE_PREFIX line carrying that number. A {"cancel": <job>}
+    line makes that job skip the items it has not started yet.
+    """
+    import queue
+    import sys
+    import threading
+    lines = queue.Queue()
+    def read_stdin():
+        # Read on a thread, so a cancel line is seen while a job is running
+        for line in sys.stdin:
+            lines.put(line)
+        lines.put(None)
+    threading.Thread(target=read_stdin, daemon=True).start()
+    jobs = []
+    cancelled = set()
+    def take_lines(block):
+        """Sort what arrived on stdin into jobs and cancels; False once stdin is closed."""
+        while True:
+            try:
+                line = lines.get(block=block)
+            except queue.Empty:
+                return True
+            if line is None:
+                return False
+            block = False
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError as e:
+                print(f"Invalid job: {e}")
+                print(JOB_DONE_PREFIX + json.dumps({'job': None, 'ok': False}), flush=True)
+                continue
+            if 'cancel' in message:
+                cancelled.add(message['cancel'])
+            else:
+                jobs.append(message)
+    stdin_open = True
+    while jobs or stdin_open:
+        if not jobs:
+            stdin_open = take_lines(True)
+            continue
+        job = jobs.pop(0)
+        ok = True
+        for item in job.get('items') or [job]:
+            if stdin_open:
+                stdin_open = take_lines(False)
+            if job.get('job') in cancelled:
+                print("Job cancelled, skipping the rest of its items")
+                break
+            try:
+                process_queue([item])
+            except Exception as e:
+                print(f"General error: {e}")
+                ok = False
+        print(JOB_DONE_PREFIX + json.dumps({'job': job.get('job'), 'ok': ok}), flush=True)
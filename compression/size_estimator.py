@@ -0,0 +1,108 @@
+"""
+Predicted compressed size of a ROM, from a few sampled blocks.
+
+Disc images (CHD): chdman compresses each hunk of 8 CD frames with every
+codec of its list and keeps the smallest result (cdlz = lzma, cdzl = zlib,
+cdfl = flac for audio). SAMPLES blocks of HUNKS_PER_SAMPLE hunks spread over
+the file are compressed the same way with zlib and lzma and the average ratio
+is extrapolated to the whole file. The band is two standard errors of that
+average; flac is not available here, so audio tracks come out pessimistic.
+
+Switch images (NSZ/XCZ): the NCAs inside are encrypted and nsz decrypts them
+before compressing, so sampling the raw bytes tells nothing. Those get the
+typical saving of their format with a wide band instead.
+"""
+import lzma
+import mmap
+import os
+import random
+import statistics
+import zlib
+
+from compression.compression_formats import TYPICAL_SAVINGS
+
+SAMPLES = 8
+HUNKS_PER_SAMPLE = 4
+# Bytes of input per CHD hunk: 8 frames of raw (2352) or cooked (2048) sectors
+CHD_HUNK_BYTES = {'iso': 8 * 2048}
+CHD_RAW_HUNK_BYTES = 8 * 2352
+CHD_FORMATS = ['iso', 'bin', 'img']
+TYPICAL_FORMATS = ['nsp', 'xci']
+# Formats the estimator knows about (only uncompressed ROMs of these are estimated)
+ESTIMATE_FORMATS = CHD_FORMATS + TYPICAL_FORMATS
+# Spread of the typical saving used as band when nothing can be measured (0.5 = +-50%)
+TYPICAL_SPREAD = 0.5
+
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 9, "dict_size": 1 << 16}]
+
+
+def _compressed_hunk(hunk):
+    """Size chdman would store for one hunk: the best codec, or the hunk itself if nothing helps."""
+    deflate = zlib.compressobj(9, zlib.DEFLATED, -15)
+    best = len(deflate.compress(hunk) + deflate.flush())
+    best = min(best, len(lzma.compress(hunk, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)))
+    return min(best, len(hunk))
+
+
+def _sample_offsets(size, sample_bytes, hunk_bytes, seed):
+    """One hunk-aligned offset per stratum of the file, jittered but repeatable for the same file."""
+    rng = random.Random(seed)
+    stratum = size / SAMPLES
+    offsets = []
+    for i in range(SAMPLES):
+        room = max(int(stratum) - sample_bytes, 0)
+        offset = int(i * stratum) + rng.randint(0, room)
+        offsets.append(min(offset - offset % hunk_bytes, max(size - sample_bytes, 0)))
+    return offsets
+
+
+def estimate_chd(path, file_format):
+    """
+    (estimate, low, high) in bytes for path compressed to CHD.
+    Files smaller than the samples together are compressed whole, with no band.
+    """
+    hunk_bytes = CHD_HUNK_BYTES.get(file_format, CHD_RAW_HUNK_BYTES)
+    sample_bytes = hunk_bytes * HUNKS_PER_SAMPLE
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if size == 0:
+            return 0, 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if size <= sample_bytes * SAMPLES:
+                total = sum(_compressed_hunk(data[start:start + hunk_bytes]) for start in range(0, size, hunk_bytes))
+                return total, total, total
+            ratios = []
+            for offset in _sample_offsets(size, sample_bytes, hunk_bytes, size * 1000003 + st.st_ino):
+                sample = data[offset:offset + sample_bytes]
+                compressed = sum(_compressed_hunk(sample[start:start + hunk_bytes])
+                                 for start in range(0, len(sample), hunk_bytes))
+                ratios.append(compressed / len(sample))
+    mean = statistics.fmean(ratios)
+    # Sampling without replacement: the finite population correction narrows the band for small files
+    fpc = (1 - len(ratios) * sample_bytes / size) ** 0.5
+    error = 2 * statistics.stdev(ratios) / len(ratios) ** 0.5 * fpc
+    return round(size * mean), round(size * max(mean - error, 0.0)), round(size * min(mean + error, 1.0))
+
+
+def estimate_typical(file_format, size):
+    """(estimate, low, high) from TYPICAL_SAVINGS, for formats whose content cannot be sampled."""
+    saving = TYPICAL_SAVINGS.get(file_format, 0.0)
+    low_saving = saving * (1 - TYPICAL_SPREAD)
+    high_saving = min(saving * (1 + TYPICAL_SPREAD), 1.0)
+    return round(size * (1 - saving)), round(size * (1 - high_saving)), round(size * (1 - low_saving))
+
+
+def estimate_file(path, file_format, size=None):
+    """
+    Predicted compressed size of one ROM as (estimate, low, high, method), or
+    None when its format is not handled. OSError/ValueError from reading are left to the caller.
+    """
+    file_format = (file_format or '').lower()
+    if file_format in CHD_FORMATS:
+        return estimate_chd(path, file_format) + ("chd-sampled",)
+    if file_format in TYPICAL_FORMATS:
+        if size is None:
+            size = os.path.getsize(path)
+        return estimate_typical(file_format, size) + ("typical",)
+    return None
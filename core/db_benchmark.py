@@ -0,0 +1,100 @@
+"""
+Insert throughput of roms.db writes, old style vs db_manager.
+
+    python -m core.db_benchmark [--rows 100000] [--batch 500]
+
+Rows are written in calls of --batch rows, like the streaming scanner does
+(use --batch 0 for a single call).
+"before" replays what every db_manager write used to do: a fresh connection
+per call in the default rollback-journal mode and one execute() per row.
+"after" goes through db_manager.upsert_roms: the shared WAL connection and a
+single executemany() inside one transaction per call, with the search index
+deferred and rebuilt once at the end as a scan does. "row by row" is the same
+with the search index kept in sync by its triggers, as for the watcher's
+small batches.
+All run against throwaway databases in a temporary folder.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from core import db_manager
+
+
+def _make_rows(count):
+    return [
+        (f"Game {i}.iso", "Sony Playstation 2", f"R:/ROMs/Sony Playstation 2/Game {i}.iso", "",
+         700 * 1024 * 1024 + i, 1_700_000_000_000_000_000 + i, i, "iso", 0)
+        for i in range(count)
+    ]
+
+
+def _batches(rows, batch):
+    if batch <= 0:
+        return [rows]
+    return [rows[i:i + batch] for i in range(0, len(rows), batch)]
+
+
+def bench_before(path, rows, batch):
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    c.execute("""
+        CREATE TABLE roms (id INTEGER PRIMARY KEY AUTOINCREMENT, file_name TEXT, platform TEXT, path TEXT,
+                           size TEXT, action TEXT, size_bytes INTEGER, mtime_ns INTEGER, inode INTEGER)
+    """)
+    c.execute("CREATE INDEX idx_roms_path ON roms (path)")
+    conn.commit()
+    conn.close()
+    start = time.perf_counter()
+    for chunk in _batches(rows, batch):
+        conn = sqlite3.connect(path)
+        c = conn.cursor()
+        for name, platform, rom_path, action, size_bytes, mtime_ns, inode, _format, _compressed in chunk:
+            c.execute(
+                "UPDATE roms SET file_name = ?, platform = ?, size = ?, action = ?, size_bytes = ?, mtime_ns = ?, inode = ? WHERE path = ?",
+                (name, platform, "700.00 MB", action, size_bytes, mtime_ns, inode, rom_path)
+            )
+            if c.rowcount == 0:
+                c.execute(
+                    "INSERT INTO roms (file_name, platform, path, size, action, size_bytes, mtime_ns, inode) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (name, platform, rom_path, "700.00 MB", action, size_bytes, mtime_ns, inode)
+                )
+        conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+
+def bench_after(path, rows, batch, defer_index=True):
+    db_manager.DB_PATH = path
+    db_manager.init_db()
+    start = time.perf_counter()
+    if defer_index:
+        db_manager.defer_search_index()
+    for chunk in _batches(rows, batch):
+        db_manager.upsert_roms(chunk, 1)
+    db_manager.restore_search_index()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark roms.db insert throughput.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of rows to insert.")
+    parser.add_argument("--batch", type=int, default=500, help="Rows per write call (0 = all at once).")
+    args = parser.parse_args()
+    rows = _make_rows(args.rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        before = bench_before(os.path.join(tmp, "before.db"), rows, args.batch)
+        after = bench_after(os.path.join(tmp, "after.db"), rows, args.batch)
+        row_by_row = bench_after(os.path.join(tmp, "row_by_row.db"), rows, args.batch, defer_index=False)
+        db_manager.close_connections()
+    print(f"rows:   {args.rows} (batch {args.batch or args.rows})")
+    print(f"before: {before:.2f}s ({args.rows / before:,.0f} rows/s)")
+    print(f"after:  {after:.2f}s ({args.rows / after:,.0f} rows/s)")
+    print(f"row by row index: {row_by_row:.2f}s ({args.rows / row_by_row:,.0f} rows/s)")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,120 @@
-def populate_table_db(gui, details_list):
-    """Fill tables in GUI using only DB data, never access disk."""
-    from compression.compression_formats import is_compressed
-    from PySide6.QtWidgets import QCheckBox, QWidget, QHBoxLayout, QTableWidgetItem
-    from PySide6.QtCore import Qt
-    uncompressed = []
-    compressed = []
-    for d in details_list:
-        name = d['file_name']
-        path = d['path']
-        platform = d['platform']
-        size = d['size']
-        if is_compressed(name):
-            compressed.append((name, platform, path, size))
-        else:
-            uncompressed.append((name, platform, path, size))
-    # Fill uncompressed table
-    gui.table_uncompressed.setRowCount(len(uncompressed))
-    checkboxes_uncompressed = []
-    for i, row in enumerate(uncompressed):
-        checkbox = QCheckBox()
-        checkbox.stateChanged.connect(lambda state, row=i: gui.update_selected_queue(row, state))
-        checkboxes_uncompressed.append(checkbox)
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.addWidget(checkbox)
-        layout.setAlignment(checkbox, Qt.AlignCenter)
-        layout.setContentsMargins(0,0,0,0)
-        gui.table_uncompressed.setCellWidget(i, 0, widget)
-        item_name = QTableWidgetItem(row[0])
-        item_name.setFlags(item_name.flags() & ~Qt.ItemIsEditable)
-        gui.table_uncompressed.setItem(i, 1, item_name)
-        item_platform = QTableWidgetItem(row[1])
-        item_platform.setFlags(item_platform.flags() & ~Qt.ItemIsEditable)
-        gui.table_uncompressed.setItem(i, 2, item_platform)
-        item_path = QTableWidgetItem(row[2])
-        item_path.setFlags(item_path.flags() & ~Qt.ItemIsEditable)
-        gui.table_uncompressed.setItem(i, 3, item_path)
-        item_size = QTableWidgetItem(row[3])
-        item_size.setFlags(item_size.flags() & ~Qt.ItemIsEditable)
-        gui.table_uncompressed.setItem(i, 4, item_size)
-    gui.checkboxes_uncompressed = checkboxes_uncompressed
-    # Fill compressed table
-    gui.table_compressed.setRowCount(len(compressed))
-    checkboxes_compressed = []
-    for i, row in enumerate(compressed):
-        checkbox = QCheckBox()
-        checkbox.stateChanged.connect(lambda state, row=i: gui.update_selected_queue(row, state))
-        checkboxes_compressed.append(checkbox)
-        widget = QWidget()
-        layout = QHBoxLayout(widget)
-        layout.addWidget(checkbox)
-        layout.setAlignment(checkbox, Qt.AlignCenter)
-        layout.setContentsMargins(0,0,0,0)
-        gui.table_compressed.setCellWidget(i, 0, widget)
-        item_name = QTableWidgetItem(row[0])
-        item_name.setFlags(item_name.flags() & ~Qt.ItemIsEditable)
-        gui.table_compressed.setItem(i, 1, item_name)
-        item_platform = QTableWidgetItem(row[1])
-        item_platform.setFlags(item_platform.flags() & ~Qt.ItemIsEditable)
-        gui.table_compressed.setItem(i, 2, item_platform)
-        item_path = QTableWidgetItem(row[2])
-        item_path.setFlags(item_path.flags() & ~Qt.ItemIsEditable)
-        gui.table_compressed.setItem(i, 3, item_path)
-        item_size = QTableWidgetItem(row[3])
-        item_size.setFlags(item_size.flags() & ~Qt.ItemIsEditable)
-        gui.table_compressed.setItem(i, 4, item_size)
-    gui.checkboxes_compressed = checkboxes_compressed
 def get_all_roms():
-    """Return all ROMs as list of dicts with keys: file_name, platform, path, size, action."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT file_name, platform, path, size, action FROM roms")
+    """Return all ROMs as list of dicts with keys: id, file_name, platform, path, size_bytes, format, compressed, action."""
+    c = read_connection().cursor()
+    c.execute("SELECT id, file_name, platform, path, size_bytes, format, compressed, action FROM roms")
     rows = c.fetchall()
-    conn.close()
     # Return as list of dicts for compatibility
     return [
         {
-            'file_name': row[0],
-            'platform': row[1],
-            'path': row[2],
-            'size': row[3],
-            'action': row[4]
+            'id': row[0],
+            'file_name': row[1],
+            'platform': row[2],
+            'path': row[3],
+            'size_bytes': row[4],
+            'format': row[5],
+            'compressed': bool(row[6]),
+            'action': row[7]
         }
         for row in rows
     ]
 
+import json
 import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 
-DB_PATH = "core/roms.db"
+# Absolute, so the app behaves the same whatever the working directory
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roms.db")
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+]
+
+_write_lock = threading.RLock()
+_writer = None
+_local = threading.local()
+
+
+def _connect(path):
+    # Autocommit mode: transactions are opened explicitly by transaction()
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    _register_functions(conn)
+    return conn
+
+
+def get_connection():
+    """
+    The shared writer connection, opened once per DB_PATH.
+    Use transaction() rather than writing through it directly.
+    """
+    global _writer
+    with _write_lock:
+        if _writer is None or _writer[0] != DB_PATH:
+            if _writer is not None:
+                _writer[1].close()
+            _writer = (DB_PATH, _connect(DB_PATH))
+        return _writer[1]
+
+
+def read_connection():
+    """
+    A read connection private to the calling thread. WAL lets these readers
+    (GUI thread, queue worker, scanners) run while another thread writes.
+    """
+    current = getattr(_local, "conn", None)
+    if current is None or current[0] != DB_PATH:
+        if current is not None:
+            current[1].close()
+        current = _local.conn = (DB_PATH, _connect(DB_PATH))
+    return current[1]
+
+
+def close_connections():
+    """Close the shared writer connection and the calling thread's reader."""
+    global _writer
+    with _write_lock:
+        if _writer is not None:
+            _writer[1].close()
+            _writer = None
+    current = getattr(_local, "conn", None)
+    if current is not None:
+        current[1].close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction():
+    """Run a block of writes as one transaction on the shared connection, one thread at a time."""
+    with _write_lock:
+        conn = get_connection()
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            yield c
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+
+# Keep IN (...) lists below SQLite's host parameter limit
+SQL_CHUNK_SIZE = 500
+
+
+def _table_columns(c, table):
+    return {row[1] for row in c.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate_v1(c):
+    """Original schema."""
     c.execute("""
         CREATE TABLE IF NOT EXISTS roms (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -103,31 +125,622 @@ def init_db():
             action TEXT
         )
     """)
-    conn.commit()
-    conn.close()
 
 
-def load_table_from_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT file_name, platform, path, size, action FROM roms")
+def _migrate_v2(c):
+    """Stat fingerprint for incremental rescans, last scan id and the header sniff cache."""
+    existing = _table_columns(c, "roms")
+    for column in ("size_bytes", "mtime_ns", "inode", "last_scan"):
+        if column not in existing:
+            c.execute(f"ALTER TABLE roms ADD COLUMN {column} INTEGER")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS content_sniffs (
+            path TEXT PRIMARY KEY,
+            size_bytes INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            format TEXT,
+            platform TEXT
+        )
+    """)
+
+
+def _migrate_v3(c):
+    """Typed columns: format and compressed flag, sizes only as integer bytes, one row per path."""
+    existing = _table_columns(c, "roms")
+    if "format" not in existing:
+        c.execute("ALTER TABLE roms ADD COLUMN format TEXT")
+    if "compressed" not in existing:
+        c.execute("ALTER TABLE roms ADD COLUMN compressed INTEGER NOT NULL DEFAULT 0")
+    # Best effort until the next rescan stores the exact size (mtime_ns is still NULL for these rows)
+    c.execute("UPDATE roms SET size_bytes = CAST(parse_size(size) AS INTEGER) WHERE size_bytes IS NULL")
+    c.execute("UPDATE roms SET size = NULL")
+    c.execute("UPDATE roms SET compressed = is_compressed(file_name), format = COALESCE(format, file_format(file_name))")
+    c.execute("DELETE FROM roms WHERE id NOT IN (SELECT MAX(id) FROM roms GROUP BY path)")
+    c.execute("DROP INDEX IF EXISTS idx_roms_path")
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_roms_path ON roms (path)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_roms_platform ON roms (platform)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_roms_compressed ON roms (compressed)")
+
+
+def _migrate_v4(c):
+    """
+    Trigram full-text index for the search box, kept in sync by triggers.
+    The file name is always the tail of the path, so indexing platform and path covers all three columns.
+    """
+    try:
+        c.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS roms_fts USING fts5(
+                platform, path,
+                content='roms', content_rowid='id', tokenize='trigram', columnsize=0
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5 or older than 3.34 (no trigram): searches fall back to fold_case()
+        return
+    _create_fts_triggers(c)
+    c.execute("INSERT INTO roms_fts (roms_fts) VALUES ('rebuild')")
+
+
+FTS_TRIGGERS = ("roms_fts_insert", "roms_fts_delete", "roms_fts_update")
+
+
+def _create_fts_triggers(c):
+    """Triggers keeping roms_fts in sync with roms row by row (dropped by defer_search_index)."""
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS roms_fts_insert AFTER INSERT ON roms BEGIN
+            INSERT INTO roms_fts (rowid, platform, path) VALUES (new.id, new.platform, new.path);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS roms_fts_delete AFTER DELETE ON roms BEGIN
+            INSERT INTO roms_fts (roms_fts, rowid, platform, path) VALUES ('delete', old.id, old.platform, old.path);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS roms_fts_update AFTER UPDATE OF platform, path ON roms BEGIN
+            INSERT INTO roms_fts (roms_fts, rowid, platform, path) VALUES ('delete', old.id, old.platform, old.path);
+            INSERT INTO roms_fts (rowid, platform, path) VALUES (new.id, new.platform, new.path);
+        END
+    """)
+
+
+def _migrate_v5(c):
+    """Cache of predicted compressed sizes (compression.size_estimator), keyed by path and fingerprint like content_sniffs."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS size_estimates (
+            path TEXT PRIMARY KEY,
+            size_bytes INTEGER,
+            mtime_ns INTEGER,
+            inode INTEGER,
+            estimate INTEGER,
+            low INTEGER,
+            high INTEGER,
+            method TEXT
+        )
+    """)
+
+
+def _migrate_v6(c):
+    """
+    Queue journal: one row per queued item in queue order, with its state
+    (pending, running, done, failed), attempts and the output paths (JSON list).
+    While running, outputs are the files the item is creating; afterwards, the ones it wrote.
+    """
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS queue_items (
+            id INTEGER PRIMARY KEY,
+            rom_id INTEGER,
+            action TEXT,
+            name TEXT,
+            path TEXT,
+            platform TEXT,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            outputs TEXT,
+            updated REAL
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_queue_items_state ON queue_items (state)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_queue_items_rom ON queue_items (rom_id)")
+
+
+def _migrate_v7(c):
+    """Throughput of finished queue items per backend, action and input format, summed over all runs."""
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS queue_throughput (
+            backend TEXT,
+            action TEXT,
+            format TEXT,
+            jobs INTEGER NOT NULL DEFAULT 0,
+            bytes_in INTEGER NOT NULL DEFAULT 0,
+            bytes_out INTEGER NOT NULL DEFAULT 0,
+            seconds REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (backend, action, format)
+        )
+    """)
+
+
+def _migrate_v8(c):
+    """
+    CPU seconds the processors report per item, with the input bytes of the items
+    that reported them (items from older processors have wall seconds only).
+    """
+    c.execute("ALTER TABLE queue_throughput ADD COLUMN cpu_bytes_in INTEGER NOT NULL DEFAULT 0")
+    c.execute("ALTER TABLE queue_throughput ADD COLUMN cpu_seconds REAL NOT NULL DEFAULT 0")
+
+
+# Schema version N is reached by running MIGRATIONS[:N]; the version lives in PRAGMA user_version
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3, _migrate_v4, _migrate_v5, _migrate_v6, _migrate_v7, _migrate_v8]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _register_functions(conn):
+    from compression.compression_formats import is_compressed, get_format, savings_ratio
+    from core.utils import parse_size
+    conn.create_function("parse_size", 1, parse_size)
+    conn.create_function("is_compressed", 1, lambda name: int(is_compressed(name or "")))
+    conn.create_function("file_format", 1, lambda name: get_format(name or ""))
+    conn.create_function("savings_ratio", 1, savings_ratio, deterministic=True)
+    # SQLite's lower() and LIKE only fold ASCII letters
+    conn.create_function("fold_case", 1, lambda text: (text or "").lower(), deterministic=True)
+
+
+def init_db():
+    """Create roms.db or bring an older one up to SCHEMA_VERSION, one transaction per step."""
+    version = read_connection().execute("PRAGMA user_version").fetchone()[0]
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        with transaction() as c:
+            MIGRATIONS[target - 1](c)
+            c.execute(f"PRAGMA user_version = {target}")
+    # A scan that died while the search index was deferred left it without its triggers
+    restore_search_index()
+
+
+def lookup_roms(paths):
+    """Return {path: ((size_bytes, mtime_ns, inode), platform, id, format)} for the given paths that are in the DB."""
+    paths = list(paths)
+    found = {}
+    c = read_connection().cursor()
+    for start in range(0, len(paths), SQL_CHUNK_SIZE):
+        chunk = paths[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT path, size_bytes, mtime_ns, inode, platform, id, format FROM roms WHERE path IN ({placeholders})", chunk)
+        for path, size_bytes, mtime_ns, inode, platform, rom_id, file_format in c.fetchall():
+            found[path] = ((size_bytes, mtime_ns, inode), platform, rom_id, file_format)
+    return found
+
+
+def get_roms_by_ids(ids):
+    """Return {id: dict shaped like get_all_roms()} for the given roms.id values that are in the DB."""
+    ids = list(ids)
+    found = {}
+    c = read_connection().cursor()
+    for start in range(0, len(ids), SQL_CHUNK_SIZE):
+        chunk = ids[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT id, file_name, platform, path, size_bytes, format, compressed, action FROM roms WHERE id IN ({placeholders})", chunk)
+        for row in c.fetchall():
+            found[row[0]] = {
+                'id': row[0],
+                'file_name': row[1],
+                'platform': row[2],
+                'path': row[3],
+                'size_bytes': row[4],
+                'format': row[5],
+                'compressed': bool(row[6]),
+                'action': row[7]
+            }
+    return found
+
+
+def get_rom_ids(paths):
+    """Return {path: id} for the given paths that are in the DB."""
+    return {path: stored[2] for path, stored in lookup_roms(paths).items()}
+
+
+def lookup_sniffs(paths):
+    """Return {path: ((size_bytes, mtime_ns, inode), format, platform)} of cached header sniffs."""
+    paths = list(paths)
+    found = {}
+    c = read_connection().cursor()
+    for start in range(0, len(paths), SQL_CHUNK_SIZE):
+        chunk = paths[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT path, size_bytes, mtime_ns, inode, format, platform FROM content_sniffs WHERE path IN ({placeholders})", chunk)
+        for path, size_bytes, mtime_ns, inode, file_format, platform in c.fetchall():
+            found[path] = ((size_bytes, mtime_ns, inode), file_format, platform)
+    return found
+
+
+def save_sniffs(sniffs):
+    """Store header sniffs given as (path, size_bytes, mtime_ns, inode, format, platform)."""
+    if not sniffs:
+        return
+    with transaction() as c:
+        c.executemany("INSERT OR REPLACE INTO content_sniffs (path, size_bytes, mtime_ns, inode, format, platform) VALUES (?, ?, ?, ?, ?, ?)", sniffs)
+
+
+# A cached estimate only counts while the ROM still has the fingerprint it was computed for
+_ESTIMATE_MATCH = ("e.path = roms.path AND e.size_bytes = roms.size_bytes AND e.mtime_ns = roms.mtime_ns"
+                   " AND e.inode IS roms.inode")
+
+
+def select_unestimated(formats, after=0, limit=500):
+    """
+    Uncompressed ROMs of the given formats with no estimate for their current
+    fingerprint, as (id, path, format) tuples in roms.db order, starting after roms.id `after`.
+    """
+    formats = list(formats)
+    c = read_connection().cursor()
+    c.execute(f"""
+        SELECT id, path, format FROM roms
+        WHERE id > ? AND compressed = 0 AND mtime_ns IS NOT NULL AND format IN ({",".join("?" * len(formats))})
+          AND NOT EXISTS (SELECT 1 FROM size_estimates e WHERE {_ESTIMATE_MATCH})
+        ORDER BY id LIMIT ?
+    """, [after] + formats + [limit])
     rows = c.fetchall()
-    conn.close()
     return rows
 
 
-def insert_roms(details_list):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    for detail in details_list:
-        c.execute("INSERT INTO roms (file_name, platform, path, size, action) VALUES (?, ?, ?, ?, ?)", detail)
-    conn.commit()
-    conn.close()
+def save_estimates(estimates):
+    """
+    Store size estimates given as (path, size_bytes, mtime_ns, inode, estimate, low, high, method).
+    A NULL estimate records a file that could not be read, so it is not retried until it changes.
+    """
+    if not estimates:
+        return
+    with transaction() as c:
+        c.executemany("""
+            INSERT OR REPLACE INTO size_estimates (path, size_bytes, mtime_ns, inode, estimate, low, high, method)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, estimates)
+
+
+def get_estimates(ids):
+    """Return {id: (estimate, low, high)} of the given ROMs that have an up-to-date estimate."""
+    ids = list(ids)
+    found = {}
+    c = read_connection().cursor()
+    for start in range(0, len(ids), SQL_CHUNK_SIZE):
+        chunk = ids[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"""
+            SELECT roms.id, e.estimate, e.low, e.high FROM roms JOIN size_estimates e ON {_ESTIMATE_MATCH}
+            WHERE roms.id IN ({placeholders}) AND e.estimate IS NOT NULL
+        """, chunk)
+        for rom_id, estimate, low, high in c.fetchall():
+            found[rom_id] = (estimate, low, high)
+    return found
+
+
+QUEUE_STATES = ("pending", "running", "done", "failed")
+
+
+def replace_queue(items):
+    """
+    Start a new queue journal with the given queue items, all pending, and
+    set each item's 'queue_id'. Rows of the previous queue are dropped.
+    """
+    now = time.time()
+    with transaction() as c:
+        c.execute("DELETE FROM queue_items")
+        for item in items:
+            c.execute(
+                "INSERT INTO queue_items (rom_id, action, name, path, platform, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (item.get('id'), item['action'], item.get('name'), item['path'], item['platform'], now),
+            )
+            item['queue_id'] = c.lastrowid
+
+
+def set_queue_item_state(queue_id, state, outputs=None, attempt=False):
+    """Move one journal row to state; outputs replaces its output paths when given, attempt counts a new try."""
+    with transaction() as c:
+        c.execute(
+            f"UPDATE queue_items SET state = ?, outputs = COALESCE(?, outputs), updated = ?"
+            f"{', attempts = attempts + 1' if attempt else ''} WHERE id = ?",
+            (state, None if outputs is None else json.dumps(outputs, ensure_ascii=False), time.time(), queue_id),
+        )
+
+
+def get_queue_items(states=QUEUE_STATES):
+    """Journal rows in the given states, in queue order, as queue item dicts plus queue_id, state, attempts and outputs."""
+    states = list(states)
+    c = read_connection().cursor()
+    c.execute(f"""
+        SELECT id, rom_id, action, name, path, platform, state, attempts, outputs FROM queue_items
+        WHERE state IN ({",".join("?" * len(states))}) ORDER BY id
+    """, states)
+    return [
+        {
+            'queue_id': row[0], 'id': row[1], 'action': row[2], 'name': row[3], 'path': row[4],
+            'platform': row[5], 'state': row[6], 'attempts': row[7], 'outputs': json.loads(row[8] or "[]"),
+        }
+        for row in c.fetchall()
+    ]
+
+
+def drop_pending_queue_items(rom_ids):
+    """Forget the pending journal rows of ROMs taken off the queue."""
+    rom_ids = list(rom_ids)
+    if not rom_ids:
+        return
+    with transaction() as c:
+        for start in range(0, len(rom_ids), SQL_CHUNK_SIZE):
+            chunk = rom_ids[start:start + SQL_CHUNK_SIZE]
+            c.execute(f"DELETE FROM queue_items WHERE state = 'pending' AND rom_id IN ({','.join('?' * len(chunk))})", chunk)
+
+
+def record_throughput(backend, action, file_format, bytes_in, bytes_out, seconds, cpu_seconds=None):
+    """
+    Add one finished queue item to the queue_throughput totals: wall seconds, and
+    CPU seconds when the processor reported them.
+    """
+    cpu_bytes_in = bytes_in if cpu_seconds is not None else 0
+    with transaction() as c:
+        c.execute("""
+            INSERT INTO queue_throughput (backend, action, format, jobs, bytes_in, bytes_out, seconds,
+                                          cpu_bytes_in, cpu_seconds)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+            ON CONFLICT (backend, action, format) DO UPDATE SET
+                jobs = jobs + 1, bytes_in = bytes_in + excluded.bytes_in,
+                bytes_out = bytes_out + excluded.bytes_out, seconds = seconds + excluded.seconds,
+                cpu_bytes_in = cpu_bytes_in + excluded.cpu_bytes_in,
+                cpu_seconds = cpu_seconds + excluded.cpu_seconds
+        """, (backend, action, file_format, bytes_in, bytes_out, seconds, cpu_bytes_in, cpu_seconds or 0))
+
+
+def get_throughput():
+    """
+    Return {(backend, action, format): (jobs, bytes_in, bytes_out, seconds, cpu_bytes_in, cpu_seconds)}
+    recorded so far.
+    """
+    c = read_connection().cursor()
+    c.execute("""
+        SELECT backend, action, format, jobs, bytes_in, bytes_out, seconds, cpu_bytes_in, cpu_seconds
+        FROM queue_throughput
+    """)
+    return {tuple(row[:3]): tuple(row[3:]) for row in c.fetchall()}
+
+
+def new_scan_id():
+    """
+    Id for a scan or a watcher/refresh write: one more than any stamped so far,
+    so a row written while a scan runs is never older than that scan.
+    """
+    c = read_connection().cursor()
+    c.execute("SELECT COALESCE(MAX(last_scan), 0) + 1 FROM roms")
+    scan_id = c.fetchone()[0]
+    return scan_id
+
+
+def touch_roms(paths, scan_id):
+    """Mark the given paths as seen by scan `scan_id`."""
+    with transaction() as c:
+        c.executemany("UPDATE roms SET last_scan = ? WHERE path = ?", [(scan_id, path) for path in paths])
+
+
+def _under(folder):
+    """WHERE clause (sql, params) for the paths under folder, the folder itself included."""
+    prefix = os.path.join(folder, "")
+    return "(path = ? OR substr(path, 1, ?) = ?)", [folder, len(prefix), prefix]
+
+
+def delete_unseen(scan_id, folder):
+    """
+    Delete the ROMs under folder that the scan `scan_id` did not see. Rows written
+    by the watcher or a refresh during the scan carry a newer id and are kept.
+    Returns the number of rows removed.
+    """
+    where, params = _under(folder)
+    with transaction() as c:
+        c.execute(f"DELETE FROM roms WHERE {where} AND (last_scan IS NULL OR last_scan < ?)", params + [scan_id])
+        return c.rowcount
+
+
+def upsert_roms(details_list, scan_id):
+    """
+    Insert or update ROMs keyed by path, stamped as seen by scan `scan_id`. Each detail is
+    (file_name, platform, path, action, size_bytes, mtime_ns, inode, format, compressed).
+    """
+    with transaction() as c:
+        c.executemany("""
+            INSERT INTO roms (file_name, platform, path, action, size_bytes, mtime_ns, inode, format, compressed, last_scan)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                file_name = excluded.file_name,
+                platform = excluded.platform,
+                action = excluded.action,
+                size_bytes = excluded.size_bytes,
+                mtime_ns = excluded.mtime_ns,
+                inode = excluded.inode,
+                format = excluded.format,
+                compressed = excluded.compressed,
+                last_scan = excluded.last_scan
+        """, [tuple(details) + (scan_id,) for details in details_list])
+
+
+def delete_roms(paths):
+    """Remove the ROMs with the given paths."""
+    with transaction() as c:
+        c.executemany("DELETE FROM roms WHERE path = ?", [(path,) for path in paths])
+
+
+def get_paths_under(folder):
+    """Return the paths of all ROMs stored under folder (the folder itself included)."""
+    where, params = _under(folder)
+    c = read_connection().cursor()
+    c.execute(f"SELECT path FROM roms WHERE {where}", params)
+    paths = [row[0] for row in c.fetchall()]
+    return paths
+
+
+# The trigram index only matches terms of at least this many characters
+FTS_MIN_TERM = 3
+
+
+def _has_fts(c):
+    return c.execute("SELECT 1 FROM sqlite_master WHERE name = 'roms_fts'").fetchone() is not None
+
+
+def _fts_triggers(c):
+    placeholders = ",".join("?" * len(FTS_TRIGGERS))
+    c.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})", FTS_TRIGGERS)
+    return c.fetchone()[0]
+
+
+def defer_search_index():
+    """
+    Stop keeping roms_fts in sync row by row, for bulk writes such as a first scan:
+    the triggers cost far more per row than one rebuild at the end. Searches see
+    the index as it was until restore_search_index() rebuilds it.
+    """
+    with transaction() as c:
+        if _has_fts(c):
+            for trigger in FTS_TRIGGERS:
+                c.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+
+def restore_search_index():
+    """
+    Rebuild roms_fts and put its triggers back if defer_search_index() removed them.
+    Returns whether it had to; otherwise nothing is written.
+    """
+    c = read_connection().cursor()
+    if not _has_fts(c) or _fts_triggers(c) == len(FTS_TRIGGERS):
+        return False
+    with transaction() as c:
+        _create_fts_triggers(c)
+        c.execute("INSERT INTO roms_fts (roms_fts) VALUES ('rebuild')")
+        return True
+
+
+def _search_clause(c, terms):
+    """
+    WHERE clause for the search box terms (comma-AND): every term must appear,
+    case-insensitively, in the name, platform or path. Returns (sql, params).
+    Terms long enough for the trigram index go through roms_fts, the others are
+    looked for in fold_case(), so non-ASCII letters match in any case too.
+    As in roms_fts, the path stands for the file name at its end.
+    """
+    clauses = []
+    params = []
+    indexed = []
+    use_fts = _has_fts(c)
+    for term in terms or []:
+        if use_fts and len(term) >= FTS_MIN_TERM:
+            indexed.append('"' + term.replace('"', '""') + '"')
+            continue
+        clauses.append("(instr(fold_case(platform), ?) > 0 OR instr(fold_case(path), ?) > 0)")
+        params.extend([term.lower()] * 2)
+    if indexed:
+        clauses.insert(0, "id IN (SELECT rowid FROM roms_fts WHERE roms_fts MATCH ?)")
+        params.insert(0, " AND ".join(indexed))
+    return (" AND ".join(clauses) or "1"), params
+
+
+def search_rom_ids(terms, ids=None):
+    """
+    Return the set of roms.id matching the search terms, or None when there is nothing to filter.
+    With ids, only those ids are checked.
+    """
+    if not terms:
+        return None
+    c = read_connection().cursor()
+    where, params = _search_clause(c, terms)
+    if ids is None:
+        c.execute(f"SELECT id FROM roms WHERE {where}", params)
+        return {row[0] for row in c.fetchall()}
+    ids = list(ids)
+    found = set()
+    for start in range(0, len(ids), SQL_CHUNK_SIZE):
+        chunk = ids[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT id FROM roms WHERE id IN ({placeholders}) AND {where}", chunk + params)
+        found.update(row[0] for row in c.fetchall())
+    return found
+
+
+def select_rom_ids(compressed, terms=None, platform=None, min_savings=None):
+    """
+    Ids of one ROM table (compressed or not) matching the search terms and, optionally,
+    a platform and a minimum expected saving in bytes: the sampled estimate when there is
+    one (size_estimates), otherwise compression_formats.savings_ratio of the format.
+    """
+    c = read_connection().cursor()
+    where, params = _search_clause(c, terms)
+    sql = f"SELECT id FROM roms WHERE compressed = ? AND {where}"
+    params = [int(bool(compressed))] + params
+    if platform is not None:
+        sql += " AND platform = ?"
+        params.append(platform)
+    if min_savings is not None:
+        sql += f"""
+            AND COALESCE(size_bytes - (SELECT e.estimate FROM size_estimates e WHERE {_ESTIMATE_MATCH}),
+                         COALESCE(size_bytes, 0) * savings_ratio(format)) >= ?
+        """
+        params.append(min_savings)
+    c.execute(sql + " ORDER BY id", params)
+    ids = [row[0] for row in c.fetchall()]
+    return ids
+
+
+def get_rom_rows(ids):
+    """Return {id: (id, file_name, platform, path, size_bytes)} (ROM table rows) for the given ids."""
+    ids = list(ids)
+    found = {}
+    c = read_connection().cursor()
+    for start in range(0, len(ids), SQL_CHUNK_SIZE):
+        chunk = ids[start:start + SQL_CHUNK_SIZE]
+        placeholders = ",".join("?" * len(chunk))
+        c.execute(f"SELECT id, file_name, platform, path, size_bytes FROM roms WHERE id IN ({placeholders})", chunk)
+        for row in c.fetchall():
+            found[row[0]] = row
+    return found
+
+
+# Sort keys of the ROM tables; NULLs are folded so keyset paging can compare row values
+ROM_SORT_KEYS = {
+    "id": "id",
+    "file_name": "COALESCE(file_name, '') COLLATE NOCASE",
+    "platform": "COALESCE(platform, '') COLLATE NOCASE",
+    "path": "COALESCE(path, '') COLLATE NOCASE",
+    "size_bytes": "COALESCE(size_bytes, 0)",
+}
+
+
+def fetch_rom_page(compressed, terms=None, order_by="id", descending=False, after=None, limit=1000):
+    """
+    One page of ROM table rows as (sort_value, (id, file_name, platform, path, size_bytes)) pairs.
+    Keyset paging: pass the (sort_value, id) of the last row received as `after` to get the next page.
+    """
+    c = read_connection().cursor()
+    where, params = _search_clause(c, terms)
+    key = ROM_SORT_KEYS[order_by]
+    direction = "DESC" if descending else "ASC"
+    sql = f"SELECT {key}, id, file_name, platform, path, size_bytes FROM roms WHERE compressed = ? AND {where}"
+    params = [int(bool(compressed))] + params
+    if after is not None:
+        sql += f" AND ({key}, id) {'<' if descending else '>'} (?, ?)"
+        params.extend(after)
+    sql += f" ORDER BY {key} {direction}, id {direction} LIMIT ?"
+    params.append(limit)
+    c.execute(sql, params)
+    return [(row[0], row[1:]) for row in c.fetchall()]
 
 
-def clear_roms():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM roms")
-    conn.commit()
-    conn.close()
+def get_totals(terms=None, by_platform=False):
+    """
+    Count and total bytes of the ROMs matching the search terms, straight from roms.db.
+    Returns {compressed: (count, size_bytes)}, or {(compressed, platform): (count, size_bytes)}
+    when by_platform is set. Groups with no ROMs are left out.
+    """
+    c = read_connection().cursor()
+    where, params = _search_clause(c, terms)
+    group = "compressed, platform" if by_platform else "compressed"
+    c.execute(f"SELECT {group}, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM roms WHERE {where} GROUP BY {group}", params)
+    totals = {}
+    for row in c.fetchall():
+        key = (bool(row[0]), row[1]) if by_platform else bool(row[0])
+        totals[key] = (row[-2], row[-1])
+    return totals
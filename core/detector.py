@@ -0,0 +1,149 @@
+import mmap
+import os
+import struct
+
+from core import db_manager
+
+# Only files with these extensions are worth opening when the path gives no platform
+SNIFF_EXTENSIONS = ['.iso', '.bin', '.img', '.chd', '.nsp', '.nsz', '.xci', '.xcz']
+
+CD_SYNC = b"\x00" + b"\xff" * 10 + b"\x00"
+ISO_SECTOR = 2048
+RAW_SECTOR = 2352
+PVD_LBA = 16
+# Never follow directory/file extents further than this when looking for SYSTEM.CNF
+MAX_DIRECTORY_BYTES = 8 * ISO_SECTOR
+
+# Identifiers found at the start of the first data sector (IP.BIN and friends)
+BOOT_SECTOR_IDS = [
+    (b"SEGA SEGAKATANA", "Sega Dreamcast"),
+    (b"SEGA SEGASATURN", "Sega Saturn"),
+    (b"SEGADISCSYSTEM", "Sega CD"),
+]
+
+
+class _Disc:
+    """Sector reader over a mapped ISO (2048 bytes/sector) or raw CD image (2352 bytes/sector)."""
+
+    def __init__(self, data, sector_size, data_offset):
+        self.data = data
+        self.sector_size = sector_size
+        self.data_offset = data_offset
+
+    def read(self, lba, length=ISO_SECTOR):
+        """Read `length` bytes of user data starting at sector lba (may span sectors)."""
+        chunks = []
+        while length > 0:
+            start = lba * self.sector_size + self.data_offset
+            chunk = self.data[start:start + min(length, ISO_SECTOR)]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            length -= len(chunk)
+            lba += 1
+        return b"".join(chunks)
+
+
+def _open_disc(data):
+    if data[:12] == CD_SYNC:
+        # Raw sector: 12 sync + 3 address + 1 mode byte, mode 2 adds an 8 byte subheader
+        mode = data[15] if len(data) > 15 else 1
+        return _Disc(data, RAW_SECTOR, 24 if mode == 2 else 16)
+    if data[PVD_LBA * ISO_SECTOR + 1:PVD_LBA * ISO_SECTOR + 6] == b"CD001":
+        return _Disc(data, ISO_SECTOR, 0)
+    return None
+
+
+def _find_in_directory(disc, extent, length, wanted):
+    """Return (extent, size) of file `wanted` (upper case, without ;1) in an ISO9660 directory."""
+    directory = disc.read(extent, min(length, MAX_DIRECTORY_BYTES))
+    offset = 0
+    while offset < len(directory):
+        record_length = directory[offset]
+        if record_length == 0:
+            # Records never cross a sector boundary: skip the padding
+            offset = (offset // ISO_SECTOR + 1) * ISO_SECTOR
+            continue
+        record = directory[offset:offset + record_length]
+        if len(record) < 33:
+            break
+        name_length = record[32]
+        name = record[33:33 + name_length].split(b";")[0].upper()
+        if name == wanted:
+            return struct.unpack_from("<I", record, 2)[0], struct.unpack_from("<I", record, 10)[0]
+        offset += record_length
+    return None
+
+
+def _detect_disc_platform(disc):
+    first_sector = disc.read(0, 256)
+    for marker, platform in BOOT_SECTOR_IDS:
+        if first_sector.startswith(marker):
+            return platform
+    pvd = disc.read(PVD_LBA)
+    if pvd[1:6] != b"CD001":
+        return None
+    root_extent, root_length = struct.unpack_from("<I", pvd, 156 + 2)[0], struct.unpack_from("<I", pvd, 156 + 10)[0]
+    system_cnf = _find_in_directory(disc, root_extent, root_length, b"SYSTEM.CNF")
+    if system_cnf:
+        boot = disc.read(system_cnf[0], min(system_cnf[1], ISO_SECTOR)).upper()
+        if b"BOOT2" in boot:
+            return "Sony Playstation 2"
+        if b"BOOT" in boot:
+            return "Sony Playstation"
+    if pvd[8:40].strip().startswith(b"PLAYSTATION"):
+        return "Sony Playstation"
+    return None
+
+
+def sniff_file(path):
+    """
+    Identify a file from its content. Returns (format, platform); either may be None.
+    Only the header and a few ISO9660 structures are touched through mmap,
+    never the whole file.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:8] == b"MComprHD":
+                    version = struct.unpack_from(">I", data, 12)[0]
+                    return ("chd" if version == 5 else f"chd_v{version}"), None
+                if data[:4] == b"PFS0":
+                    return ("nsz" if ext == ".nsz" else "nsp"), "Nintendo Switch"
+                if data[0x100:0x104] == b"HEAD":
+                    return ("xcz" if ext == ".xcz" else "xci"), "Nintendo Switch"
+                disc = _open_disc(data)
+                if disc is None:
+                    return None, None
+                disc_format = "bin" if disc.sector_size == RAW_SECTOR else "iso"
+                return disc_format, _detect_disc_platform(disc)
+    except (OSError, ValueError, struct.error):
+        return None, None
+
+
+def detect(entries):
+    """
+    Sniff a list of walker FileEntry objects, reusing results cached in roms.db
+    for files whose (size, mtime, inode) fingerprint did not change.
+    Returns {path: (format, platform)}.
+    """
+    entries = [e for e in entries if os.path.splitext(e.name)[1].lower() in SNIFF_EXTENSIONS]
+    if not entries:
+        return {}
+    cached = db_manager.lookup_sniffs(e.path for e in entries)
+    results = {}
+    fresh = []
+    for entry in entries:
+        fingerprint = (entry.size, entry.mtime_ns, entry.inode)
+        hit = cached.get(entry.path)
+        if hit and hit[0] == fingerprint:
+            results[entry.path] = hit[1:]
+            continue
+        file_format, platform = sniff_file(entry.path)
+        results[entry.path] = (file_format, platform)
+        fresh.append((entry.path,) + fingerprint + (file_format, platform))
+    db_manager.save_sniffs(fresh)
+    return results
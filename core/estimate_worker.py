@@ -0,0 +1,71 @@
+from PySide6.QtCore import QObject, Signal
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from core import db_manager
+from core.walker import stat_entry
+from compression.size_estimator import ESTIMATE_FORMATS, estimate_file
+
+# ROMs estimated between two DB writes / GUI updates
+DEFAULT_BATCH_SIZE = 32
+# zlib and lzma release the GIL while compressing, so threads run the samples in parallel
+DEFAULT_WORKERS = min(os.cpu_count() or 1, 4)
+
+
+def _estimate_rom(path, file_format):
+    """
+    size_estimates record for one file (None if it is gone); the estimate
+    is None when the file cannot be read, so it waits until it changes.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    try:
+        result = estimate_file(path, file_format, st.st_size)
+    except (OSError, ValueError):
+        result = None
+    if result is None:
+        result = (None, None, None, None)
+    # Fingerprinted like the roms row it is matched against
+    entry = stat_entry(path, st)
+    return (path, entry.size, entry.mtime_ns, entry.inode) + tuple(result)
+
+
+class EstimateWorker(QObject):
+    """
+    Fills the size_estimates cache in roms.db for the uncompressed ROMs that
+    have no estimate for their current fingerprint, meant to run in a QThread.
+    Files are sampled on a thread pool; each batch is saved and then handed to
+    the GUI through estimates_ready as {roms.id: (estimate, low, high)}.
+    """
+    estimates_ready = Signal(object)
+    finished = Signal(int)  # ROMs estimated
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+        super().__init__()
+        self.batch_size = batch_size
+        self.workers = workers
+        self.stop_flag = False
+
+    def stop(self):
+        self.stop_flag = True
+
+    def run(self):
+        done = 0
+        after = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while not self.stop_flag:
+                todo = db_manager.select_unestimated(ESTIMATE_FORMATS, after, self.batch_size)
+                if not todo:
+                    break
+                after = todo[-1][0]
+                records = list(pool.map(lambda rom: None if self.stop_flag else _estimate_rom(rom[1], rom[2]), todo))
+                ids = {rom[1]: rom[0] for rom in todo}
+                saved = [record for record in records if record]
+                db_manager.save_estimates(saved)
+                estimates = {ids[record[0]]: record[4:7] for record in saved if record[4] is not None}
+                done += len(saved)
+                if estimates:
+                    self.estimates_ready.emit(estimates)
+        self.finished.emit(done)
@@ -0,0 +1,138 @@
+import os
+import re
+import threading
+import time
+
+# chdman: "Compressing, 42.3% complete... (ratio=51.2%)", "Extracting, 10.0% complete..."
+_CHDMAN = re.compile(r"(\w+), (\d+(?:\.\d+)?)% complete\.\.\.(?: \(ratio=(\d+(?:\.\d+)?)%\))?")
+# nsz (tqdm): " 45%|####5     | 1.21G/2.68G [00:12<00:14, 101MB/s]"
+_TQDM = re.compile(r"(\d+(?:\.\d+)?)%\|[^|]*\|\s*([\d.]+)\s*([kMGTP]?)i?B?/([\d.]+)\s*([kMGTP]?)i?B?")
+_UNITS = {'': 1, 'k': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40, 'P': 1 << 50}
+# Progress events of one item are passed on at most this often (the last one always is)
+PROGRESS_INTERVAL = 0.25
+
+
+def parse_progress(line):
+    """
+    Progress of a backend from one of its output lines, as a dict with
+    'percent' and, when the line has them, 'ratio' (output/input, 0-1),
+    'bytes_in' and 'bytes_total'; None for any other line.
+    """
+    match = _CHDMAN.search(line)
+    if match:
+        progress = {'stage': match.group(1), 'percent': float(match.group(2))}
+        if match.group(3) is not None:
+            progress['ratio'] = float(match.group(3)) / 100
+        return progress
+    match = _TQDM.search(line)
+    if match:
+        return {
+            'percent': float(match.group(1)),
+            'bytes_in': round(float(match.group(2)) * _UNITS[match.group(3)]),
+            'bytes_total': round(float(match.group(4)) * _UNITS[match.group(5)]),
+        }
+    return None
+
+
+def format_eta(seconds):
+    """h:mm:ss (or m:ss) for a number of seconds, '?' when unknown."""
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class QueueProgress:
+    """
+    Byte-weighted progress of a queue run. Each item weighs its input size;
+    a running item counts for the share its backend reported. Rates are
+    averages since the item (or the queue) started, so ETAs do not jump
+    around with every update. Thread-safe: items report from pool threads.
+    """
+
+    def __init__(self, items):
+        self.sizes = {}
+        for item in items:
+            self.sizes[item['path']] = _file_size(item['path'])
+        self.total = sum(self.sizes.values())
+        self.done = 0
+        self.running = {}  # path -> [started, bytes_in, last event time]
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def start(self, item):
+        """The item's processor started on it (its rate is measured from here)."""
+        with self._lock:
+            self.running[item['path']] = [time.monotonic(), 0, 0.0]
+
+    def update(self, item, progress):
+        """
+        Record a parsed progress line of item; returns the event for the GUI
+        (see _event) or None when it comes too soon after the previous one.
+        """
+        now = time.monotonic()
+        path = item['path']
+        size = self.sizes.get(path) or progress.get('bytes_total') or 0
+        with self._lock:
+            state = self.running.setdefault(path, [now, 0, 0.0])
+            if progress.get('bytes_total') and self.sizes.get(path):
+                # nsz counts the NCA data it reads, which is not exactly the file size
+                state[1] = round(size * progress['bytes_in'] / progress['bytes_total'])
+            elif 'bytes_in' in progress:
+                state[1] = progress['bytes_in']
+            else:
+                state[1] = round(size * progress['percent'] / 100)
+            if now - state[2] < PROGRESS_INTERVAL and progress['percent'] < 100:
+                return None
+            state[2] = now
+            return self._event(item, progress, size, state, now)
+
+    def finished(self, item):
+        """
+        The item is over, whatever its outcome: its whole size counts as
+        processed. Returns an event with only the queue fields and 'finished'.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.running.pop(item['path'], None)
+            self.done += self.sizes.get(item['path'], 0)
+            event = {'rom_id': item.get('id'), 'path': item['path'], 'finished': True}
+            event.update(self._queue_fields(now))
+            return event
+
+    def _event(self, item, progress, size, state, now):
+        started, bytes_in, _last = state
+        elapsed = now - started
+        rate = bytes_in / elapsed if elapsed > 0 else 0.0
+        event = {
+            'rom_id': item.get('id'),
+            'path': item['path'],
+            'stage': progress.get('stage'),
+            'percent': progress['percent'],
+            'ratio': progress.get('ratio'),
+            'bytes_in': bytes_in,
+            'bytes_out': round(bytes_in * progress['ratio']) if 'ratio' in progress else None,
+            'rate': rate,
+            'eta': (size - bytes_in) / rate if rate > 0 and size else None,
+        }
+        event.update(self._queue_fields(now))
+        return event
+
+    def _queue_fields(self, now):
+        processed = min(self.done + sum(state[1] for state in self.running.values()), self.total)
+        elapsed = now - self.started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        return {
+            'queue_percent': 100 * processed / self.total if self.total else 0.0,
+            'queue_rate': rate,
+            'queue_eta': (self.total - processed) / rate if rate > 0 else None,
+        }
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,181 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+
+COMPRESSION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'compression')
+# Processor script of each backend; started with --serve they take jobs on stdin
+PROCESSOR_SCRIPTS = {
+    'chd': os.path.join(COMPRESSION_DIR, 'chd_queue_processor.py'),
+    'nsz': os.path.join(COMPRESSION_DIR, 'nsz_queue_processor.py'),
+}
+# Last line a processor prints for each job
+from compression.processor_protocol import JOB_DONE_PREFIX
+LINE_BREAK = re.compile(rb"\r\n|\r|\n")
+
+
+class ProcessorProcess:
+    """
+    One long-lived `processor.py --serve` interpreter. Jobs go in as one JSON
+    line on stdin; everything printed until the matching done line belongs
+    to that job. Only one job runs in a process at a time.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.jobs = 0
+        self._write_lock = threading.Lock()  # cancel() may come from another thread
+        # -u and an unbuffered binary pipe: the job output must not sit in any buffer,
+        # chdman/nsz progress lines end in a bare \r and would otherwise arrive in lumps
+        self.proc = subprocess.Popen(
+            [sys.executable, "-u", PROCESSOR_SCRIPTS[backend], "--serve"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0,
+        )
+        self._pending = b""
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def run(self, job, on_line):
+        """
+        Run one job dict and pass each output line (without the newline) to on_line;
+        a carriage return ends a line too, so progress updates arrive one by one.
+        Returns the done record ({'job', 'ok'}), or None when the process died.
+        A queue stop goes through cancel() instead: the current item finishes.
+        """
+        self.jobs += 1
+        job = dict(job, job=self.jobs)
+        if not self._write(job):
+            return None
+        for line in self._lines():
+            if line.startswith(JOB_DONE_PREFIX):
+                try:
+                    done = json.loads(line[len(JOB_DONE_PREFIX):])
+                except ValueError:
+                    continue
+                if done.get('job') == job['job']:
+                    return done
+                continue
+            on_line(line)
+        return None
+
+    def _lines(self):
+        """Output lines as they come, split on \\n and \\r, until the pipe closes."""
+        fd = self.proc.stdout.fileno()
+        while True:
+            # One line at a time: what follows the done line stays for the next job
+            match = LINE_BREAK.search(self._pending)
+            if match:
+                line, self._pending = self._pending[:match.start()], self._pending[match.end():]
+                if line:
+                    yield line.decode("utf-8", errors="replace")
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return
+            self._pending += chunk
+
+    def cancel(self):
+        """Ask the running job to skip the items it has not started (the current one finishes)."""
+        self._write({'cancel': self.jobs})
+
+    def _write(self, message):
+        with self._write_lock:
+            try:
+                self.proc.stdin.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+                self.proc.stdin.flush()
+                return True
+            except (OSError, ValueError):
+                return False
+
+    def terminate(self):
+        if self.alive():
+            self.proc.terminate()
+        self.proc.wait()
+
+    def close(self):
+        """Let the process finish: closing stdin ends its job loop."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.terminate()
+
+
+class ProcessorPool:
+    """
+    Idle processor processes per backend, reused across queue items so the
+    interpreter start-up is paid once per concurrent job instead of per item.
+    acquire() hands out an idle process or starts a new one; release() puts
+    it back unless it died. Thread-safe.
+    """
+
+    def __init__(self):
+        self._idle = {}
+        self._busy = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, backend):
+        with self._lock:
+            idle = self._idle.setdefault(backend, [])
+            while idle:
+                process = idle.pop()
+                if process.alive():
+                    self._busy.add(process)
+                    return process
+        process = ProcessorProcess(backend)
+        with self._lock:
+            self._busy.add(process)
+        return process
+
+    def release(self, process):
+        with self._lock:
+            self._busy.discard(process)
+            keep = process.alive() and not self._closed
+            if keep:
+                self._idle.setdefault(process.backend, []).append(process)
+        if not keep:
+            process.close()
+
+    def cancel_busy(self):
+        """Cancel the rest of the jobs running now (see ProcessorProcess.cancel)."""
+        with self._lock:
+            busy = list(self._busy)
+        for process in busy:
+            process.cancel()
+
+    def close(self):
+        """Stop the idle processes (busy ones are closed when released after this)."""
+        with self._lock:
+            self._closed = True
+            processes = [p for idle in self._idle.values() for p in idle]
+            self._idle.clear()
+        for process in processes:
+            process.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def processor_pool():
+    """The pool shared by the queue handlers (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessorPool()
+        return _pool
+
+
+def close_processor_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
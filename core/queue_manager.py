@@ -1,187 +1,177 @@
-import subprocess
-import sys
 import json
 import os
 import time
-import threading
 
-# Constantes
-QUEUE_FILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'queue.json')
+# Processors print one line per item starting with JOB_REPORT_PREFIX (report_job),
+# and one starting with JOB_START_PREFIX before the item starts (report_start)
+from compression.processor_protocol import JOB_REPORT_PREFIX, JOB_START_PREFIX
 
-def save_queue_to_file(queue):
+def parse_job_report(line, prefix=JOB_REPORT_PREFIX):
+    """Return the dict of a processor report line starting with prefix, or None for any other output."""
+    if not line.startswith(prefix):
+        return None
     try:
-        with open(QUEUE_FILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(queue, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        print(f"[queue_manager] Failed to save queue: {e}")
+        return json.loads(line[len(prefix):])
+    except ValueError:
+        return None
 
-def load_queue_from_file():
-    if os.path.exists(QUEUE_FILE_PATH):
-        try:
-            with open(QUEUE_FILE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[queue_manager] Failed to load queue: {e}")
-    return []
+def _journal(item, state, outputs=None, attempt=False):
+    """Record an item's new state in the queue journal (items built by build_queue carry a queue_id)."""
+    if item.get('queue_id') is not None:
+        from core import db_manager
+        db_manager.set_queue_item_state(item['queue_id'], state, outputs, attempt)
 
-def run_queue(table_uncompressed, table_compressed, queue_table, status_label, delete_original=False, gui=None):
-    queue = build_queue_from_tables(table_uncompressed, table_compressed, queue_table)
-    platform_handlers = {
-        'Nintendo Switch': handle_nintendo_switch_queue_item,
-        'Sony PlayStation 2': handle_chd_queue_item,
-        'Sony PlayStation': handle_chd_queue_item,
-        'Sega Saturn': handle_chd_queue_item,
-        'Sega CD': handle_chd_queue_item,
-        'Mega CD': handle_chd_queue_item,
-        'Neo Geo CD': handle_chd_queue_item,
-        'Sega Dreamcast': handle_chd_queue_item,
-        'TurboGrafx-CD': handle_chd_queue_item,
-        'PC Engine CD': handle_chd_queue_item,
-        'Philips CD-i': handle_chd_queue_item,
-        '3DO': handle_chd_queue_item,
-        'Arcade (MAME)': handle_chd_queue_item,
-    }
-    def queue_worker():
-        for idx, item in enumerate(queue):
-            if gui and getattr(gui, 'stop_queue_flag', False):
-                status_label.setText("Queue stopped by user.")
-                if gui:
-                    gui.queue_finished()
-                break
-            platform = item['platform']
-            handler = platform_handlers.get(platform)
-            if handler:
-                result = handler(item, status_label, delete_original, gui, sync=True)
-                queue_table.removeRow(0)
-            else:
-                status_label.setText(f"Platform not implemented: {platform}")
+def remove_partial_outputs(path, outputs):
+    """
+    Delete the outputs an interrupted item had started to create, and return
+    the ones removed. Nothing is touched once the input is gone: it is only
+    deleted after a successful run, so the outputs are then complete.
+    """
+    removed = []
+    if not os.path.exists(path):
+        return removed
+    for output in outputs:
+        if output != path and os.path.exists(output):
+            try:
+                os.remove(output)
+                removed.append(output)
+            except OSError:
+                pass
+    return removed
+
+def recover_queue():
+    """
+    Bring the queue journal back in line after the app stopped mid-run: items
+    left running lose their partial outputs and go back to pending, unless
+    their input is gone (then they are kept as failed, outputs untouched).
+    Returns (pending items in queue order, output paths removed).
+    """
+    from core import db_manager
+    removed = []
+    for item in db_manager.get_queue_items(["running"]):
+        if os.path.exists(item['path']):
+            removed += remove_partial_outputs(item['path'], item['outputs'])
+            db_manager.set_queue_item_state(item['queue_id'], "pending")
         else:
-            if gui:
-                gui.queue_finished()
-    thread = threading.Thread(target=queue_worker)
-    thread.start()
+            db_manager.set_queue_item_state(item['queue_id'], "failed")
+    return db_manager.get_queue_items(["pending"]), removed
 
+def processor_job(item):
+    """The part of a queue item a processor needs."""
+    return {'action': item['action'], 'platform': item['platform'], 'path': item['path']}
 
-def handle_nintendo_switch_queue_item(item, status_label, delete_original=False, gui=None, sync=False):
-    nsz_queue = [{'action': item['action'], 'path': item['path']}]
-    queue_file = os.path.join(os.path.dirname(__file__), '..', 'compression', 'nsz_queue_tmp.json')
-    with open(queue_file, 'w', encoding='utf-8') as f:
-        json.dump(nsz_queue, f, ensure_ascii=False, indent=2)
-    processor_path = os.path.join(os.path.dirname(__file__), '..', 'compression', 'nsz_queue_processor.py')
-    python_exe = sys.executable
-    def run_nsz():
-        try:
-            proc = subprocess.Popen([python_exe, processor_path, queue_file], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            if gui:
-                gui.nsz_proc = proc
-            for line in proc.stdout:
-                if gui and getattr(gui, 'stop_queue_flag', False):
-                    if gui:
-                        gui.status_update.emit("NSZ process interrupted by user.")
-                    proc.terminate()
-                    break
-                if gui:
-                    gui.status_update.emit(line.strip())
-            proc.wait()
-            if proc.returncode == 0:
+def run_processor_batch(backend, items, delete_original, gui, on_item=None, progress=None):
+    """
+    Run queue items in one job on a long-lived processor process of `backend`
+    (see core.processor_pool). Each item is finished as soon as its report
+    line arrives: its original is deleted if it succeeded and wrote something,
+    then on_item(item, report) is called with report = {'inputs', 'outputs', 'ok'}
+    plus 'seconds' the item ran when the processor said it started, and 'cpu'
+    when the processor reported the CPU seconds it used.
+    Items the processor never reported on because it died or was terminated
+    are finished at the end with ok False, after their partial outputs are
+    removed. Items a stopped queue (gui.stop_flag, see QueueWorker.stop)
+    cancelled before they started are left alone (their report is None).
+    Every state change is written to the queue journal first.
+    With a core.job_progress.QueueProgress, backend progress lines become
+    gui.job_progress events instead of log lines.
+    Returns the reports in item order.
+    """
+    from core.processor_pool import processor_pool
+    from core.job_progress import parse_progress
+    waiting = {item['path']: item for item in items}
+    started = {}  # path -> outputs the item is creating
+    started_at = {}  # path -> time.monotonic() when it started
+    current = [None]  # item the processor is working on; progress lines are about it
+    reports = {}
+    def finish(item, report):
+        # Journaled before the original is deleted, so a crash in between is not taken for a partial run
+        _journal(item, "done" if report['ok'] else "failed", report['outputs'])
+        if report['ok'] and delete_original and report['outputs'] and os.path.exists(item['path']):
+            try:
+                os.remove(item['path'])
                 if gui:
-                    gui.status_update.emit(f"Nintendo Switch queue processed: {item['action']}")
-                if delete_original and os.path.exists(item['path']):
-                    try:
-                        os.remove(item['path'])
-                        if gui:
-                            gui.status_update.emit(f"Arquivo deletado: {item['path']}")
-                    except Exception as e:
-                        if gui:
-                            gui.status_update.emit(f"Erro ao deletar arquivo: {e}")
-            elif proc.returncode is not None:
+                    gui.status_update.emit(f"File deleted: {item['path']}")
+            except Exception as e:
                 if gui:
-                    gui.status_update.emit(f"Error processing Nintendo Switch queue: código {proc.returncode}")
-        except Exception as e:
-            if gui:
-                gui.status_update.emit(f"Erro ao rodar NSZ: {e}")
-        finally:
-            if gui:
-                gui.nsz_proc = None
-            if os.path.exists(queue_file):
-                os.remove(queue_file)
-    if sync:
-        run_nsz()
+                    gui.status_update.emit(f"Error deleting file: {e}")
+        if item['path'] in started_at:
+            report['seconds'] = time.monotonic() - started_at[item['path']]
+        reports[item['path']] = report
+        if progress is not None and gui:
+            gui.job_progress.emit(progress.finished(item))
+        if on_item:
+            on_item(item, report)
+    def on_line(line):
+        start = parse_job_report(line, JOB_START_PREFIX)
+        if start is not None:
+            item = current[0] = waiting.get(start.get('path'))
+            if item is not None:
+                started[item['path']] = start.get('outputs', [])
+                started_at[item['path']] = time.monotonic()
+                _journal(item, "running", started[item['path']], attempt=True)
+                if progress is not None:
+                    progress.start(item)
+            return
+        job_report = parse_job_report(line)
+        if job_report is None:
+            parsed = parse_progress(line) if progress is not None and current[0] is not None else None
+            if parsed is not None:
+                event = progress.update(current[0], parsed)
+                if event is not None and gui:
+                    gui.job_progress.emit(event)
+            elif gui:
+                gui.status_update.emit(line.strip())
+            return
+        item = waiting.pop(job_report.get('path'), None)
+        if item is not None:
+            # The item itself is always refreshed, whatever the processor says it read
+            finish(item, {
+                'inputs': [item['path']] + job_report.get('inputs', []),
+                'outputs': job_report.get('outputs', []),
+                'ok': job_report.get('ok', True),
+                'cpu': job_report.get('cpu'),
+            })
+    if len(items) == 1:
+        job = processor_job(items[0])
     else:
-        thread = threading.Thread(target=run_nsz)
-        thread.start()
-
-def handle_chd_queue_item(item, status_label, delete_original=False, gui=None, sync=False):
-    chd_queue = [{'action': item['action'], 'platform': item['platform'], 'path': item['path']}]
-    queue_file = os.path.join(os.path.dirname(__file__), '..', 'compression', 'chd_queue_tmp.json')
-    with open(queue_file, 'w', encoding='utf-8') as f:
-        json.dump(chd_queue, f, ensure_ascii=False, indent=2)
-    processor_path = os.path.join(os.path.dirname(__file__), '..', 'compression', 'chd_queue_processor.py')
-    python_exe = sys.executable
-    def run_chd():
-        try:
-            if gui:
-                gui.status_update.emit(f"Starting CHD process for {item['platform']} - {item['path']}")
-            proc = subprocess.Popen([python_exe, processor_path, queue_file], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-            if gui:
-                gui.chd_proc = proc
-            started = False
-            for line in proc.stdout:
-                started = True
-                if gui and getattr(gui, 'stop_queue_flag', False):
-                    gui.status_update.emit("CHD process interrupted by user.")
-                    proc.terminate()
-                    break
-                if gui:
-                    gui.status_update.emit(line.strip())
-            proc.wait()
-            if not started and gui:
-                gui.status_update.emit("CHD process did not start. Check handler and processor path.")
-            if proc.returncode == 0:
-                if gui:
-                    gui.status_update.emit(f"CHD queue processed: {item['action']} ({item['platform']})")
-                if delete_original and os.path.exists(item['path']):
-                    try:
-                        os.remove(item['path'])
-                        if gui:
-                            gui.status_update.emit(f"File deleted: {item['path']}")
-                    except Exception as e:
-                        if gui:
-                            gui.status_update.emit(f"Error deleting file: {e}")
-            elif proc.returncode is not None:
-                if gui:
-                    gui.status_update.emit(f"Error processing CHD queue: code {proc.returncode}")
-        except Exception as e:
-            if gui:
-                gui.status_update.emit(f"Error running CHD: {e}")
-        finally:
-            if gui:
-                gui.chd_proc = None
-            if os.path.exists(queue_file):
-                os.remove(queue_file)
-    if sync:
-        run_chd()
-    else:
-        thread = threading.Thread(target=run_chd)
-        thread.start()
+        job = {'items': [processor_job(item) for item in items]}
+    pool = processor_pool()
+    process = pool.acquire(backend)
+    try:
+        done = process.run(job, on_line)
+    finally:
+        pool.release(process)
+    if waiting and gui and getattr(gui, 'stop_flag', False):
+        # Never started: they stay queued and get no report
+        gui.status_update.emit(f"{len(waiting)} {backend.upper()} items not started: queue stopped")
+        waiting.clear()
+    elif waiting and gui and done is None:
+        gui.status_update.emit(f"{backend.upper()} processor stopped unexpectedly on {next(iter(waiting))}")
+    for item in list(waiting.values()):
+        partial = remove_partial_outputs(item['path'], started.get(item['path'], []))
+        finish(item, {'inputs': [item['path']] + partial, 'outputs': [], 'ok': False})
+    for item in items:
+        report = reports.get(item['path'])
+        if report and not report['ok'] and gui and done is not None:
+            gui.status_update.emit(f"Error processing {backend.upper()} job: {item['path']}")
+    return [reports.get(item['path']) for item in items]
 
-def build_queue_from_tables(table_uncompressed, table_compressed, queue_table):
+def build_queue(selection):
+    """
+    Queue items for a list of (roms.id, action) pairs, in that order.
+    ROMs are looked up by id, so files with the same name in different folders stay apart.
+    """
+    from core import db_manager
+    selection = list(selection)
+    roms = db_manager.get_roms_by_ids(rom_id for rom_id, _action in selection)
     queue = []
-    for row in range(queue_table.rowCount()):
-        action = queue_table.item(row, 0).text()
-        name = queue_table.item(row, 1).text()
-        found = False
-        for table in [table_uncompressed, table_compressed]:
-            for i in range(table.rowCount()):
-                if table.item(i, 1).text() == name:
-                    path = table.item(i, 3).text()
-                    plat = table.item(i, 2).text()
-                    queue.append({'action': action, 'name': name, 'path': path, 'platform': plat})
-                    found = True
-                    break
-            if found:
-                break
-    save_queue_to_file(queue)
+    for rom_id, action in selection:
+        rom = roms.get(rom_id)
+        if rom:
+            queue.append({'id': rom_id, 'action': action, 'name': rom['file_name'], 'path': rom['path'], 'platform': rom['platform']})
+    # The journal in roms.db keeps the queue across restarts (see recover_queue)
+    db_manager.replace_queue(queue)
     return queue
 
 
@@ -196,45 +186,29 @@ def group_queue_by_platform_and_action(queue):
             action_groups[platform][item['action']].append(item)
     return action_groups
 
-def stop_nsz_process(gui):
-    import time
-    proc = getattr(gui, 'nsz_proc', None)
-    if proc and proc.poll() is None:
-        try:
-            proc.terminate()
-            time.sleep(1)  # Aguarda 1 segundo para encerrar
-            if proc.poll() is None:
-                proc.kill()
-                gui.status_label.setText("NSZ process killed.")
-            else:
-                gui.status_label.setText("NSZ process terminated.")
-        except Exception as e:
-            gui.status_label.setText(f"Erro ao terminar NSZ: {e}")
-        finally:
-            gui.nsz_proc = None
+# Backend of the processor (core.processor_pool.PROCESSOR_SCRIPTS) that runs each platform's items
+PLATFORM_BACKENDS = {
+    'Nintendo Switch': 'nsz',
+    'Sony PlayStation': 'chd',
+    'Sony Playstation': 'chd',
+    'Sony PlayStation 2': 'chd',
+    'Sony Playstation 2': 'chd',
+    'PSX': 'chd',
+    'PS1': 'chd',
+    'PS2': 'chd',
+    'Sega Saturn': 'chd',
+    'Sega CD': 'chd',
+    'Mega CD': 'chd',
+    'Neo Geo CD': 'chd',
+    'Sega Dreamcast': 'chd',
+    'TurboGrafx-CD': 'chd',
+    'PC Engine CD': 'chd',
+    'Philips CD-i': 'chd',
+    '3DO': 'chd',
+    'Arcade (MAME)': 'chd',
+}
 
-# Definição do mapeamento de plataformas para handlers - colocado após a definição de todas as funções handler
-def get_platform_handler(platform):
-    # All platform-handler mappings centralized here
-    mapping = {
-        'Nintendo Switch': handle_nintendo_switch_queue_item,
-        'Sony PlayStation': handle_chd_queue_item,
-        'Sony Playstation': handle_chd_queue_item,
-        'Sony PlayStation 2': handle_chd_queue_item,
-        'Sony Playstation 2': handle_chd_queue_item,  # Adicionando variação com 'P' minúsculo
-        'PSX': handle_chd_queue_item,
-        'PS1': handle_chd_queue_item,
-        'PS2': handle_chd_queue_item,
-        'Sega Saturn': handle_chd_queue_item,
-        'Sega CD': handle_chd_queue_item,
-        'Mega CD': handle_chd_queue_item,
-        'Neo Geo CD': handle_chd_queue_item,
-        'Sega Dreamcast': handle_chd_queue_item,
-        'TurboGrafx-CD': handle_chd_queue_item,
-        'PC Engine CD': handle_chd_queue_item,
-        'Philips CD-i': handle_chd_queue_item,
-        '3DO': handle_chd_queue_item,
-        'Arcade (MAME)': handle_chd_queue_item,
-    }
-    return mapping.get(platform)
+def get_platform_backend(platform):
+    """Backend ('chd', 'nsz') running the items of a platform, for per-backend job limits; None if unsupported."""
+    return PLATFORM_BACKENDS.get(platform)
 
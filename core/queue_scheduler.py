@@ -0,0 +1,353 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+CPU_COUNT = os.cpu_count() or 1
+# chdman and nsz are multi-threaded themselves, so a few jobs of each already fill the cores
+DEFAULT_BACKEND_JOBS = {
+    'chd': max(1, CPU_COUNT // 4),
+    'nsz': max(1, CPU_COUNT // 8),
+    '7z': max(1, CPU_COUNT // 8),
+}
+DEFAULT_MAX_JOBS = max(1, CPU_COUNT // 2)
+# Jobs at once per physical disk: one per spinning disk avoids seek thrash, SSDs are not limited (0)
+DEFAULT_HDD_JOBS = 1
+DEFAULT_SSD_JOBS = 0
+# Items of one platform and action handed to a processor in one job (1 = no batching)
+DEFAULT_BATCH_SIZE = 8
+# Order in which queue items start (see JobScheduler.priority); chosen per run, default from queue_policy
+POLICIES = {
+    'fifo': "Queue order",
+    'savings': "Largest savings first",
+    'sjf': "Shortest job first",
+    'savings_rate': "Most savings per CPU second first",
+}
+DEFAULT_POLICY = 'fifo'
+# Bytes of input per second assumed for a backend/action/format with no finished item in roms.db yet
+DEFAULT_THROUGHPUT = 50 * 1024 * 1024
+# Pending jobs are ranked again at most this often, as estimates and throughput come in
+RERANK_INTERVAL = 5.0
+# Devices /sys/block says nothing about (other OSes, network shares)
+DEFAULT_UNKNOWN_DEVICE_JOBS = 2
+SYS_DEV_BLOCK = "/sys/dev/block"
+
+# key groups the partitions of one disk; rotational is None when unknown
+Device = namedtuple("Device", ["key", "name", "rotational"])
+_devices = {}
+_devices_lock = threading.Lock()
+
+
+def load_queue_settings():
+    """
+    Job limits from user_config.yaml: queue_jobs (all backends together),
+    queue_backend_jobs ({backend: jobs}), queue_hdd_jobs / queue_ssd_jobs
+    (per disk, 0 = no limit), queue_batch_size and queue_policy (a POLICIES key),
+    falling back to the defaults.
+    """
+    settings = {
+        "max_jobs": DEFAULT_MAX_JOBS,
+        "backend_jobs": dict(DEFAULT_BACKEND_JOBS),
+        "hdd_jobs": DEFAULT_HDD_JOBS,
+        "ssd_jobs": DEFAULT_SSD_JOBS,
+        "batch_size": DEFAULT_BATCH_SIZE,
+        "policy": DEFAULT_POLICY,
+    }
+    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "user_config.yaml")
+    if os.path.exists(config_path):
+        import yaml
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+            settings["max_jobs"] = max(1, int(config.get("queue_jobs", DEFAULT_MAX_JOBS)))
+            settings["backend_jobs"].update(config.get("queue_backend_jobs") or {})
+            settings["hdd_jobs"] = int(config.get("queue_hdd_jobs", DEFAULT_HDD_JOBS))
+            settings["ssd_jobs"] = int(config.get("queue_ssd_jobs", DEFAULT_SSD_JOBS))
+            settings["batch_size"] = max(1, int(config.get("queue_batch_size", DEFAULT_BATCH_SIZE)))
+            if config.get("queue_policy") in POLICIES:
+                settings["policy"] = config["queue_policy"]
+    return settings
+
+
+def _read_rotational(sys_path):
+    """queue/rotational of a /sys/block entry, looking at the whole disk when sys_path is a partition."""
+    for candidate in (sys_path, os.path.dirname(sys_path)):
+        try:
+            with open(os.path.join(candidate, "queue", "rotational"), "r") as f:
+                return os.path.basename(candidate), f.read().strip() == "1"
+        except (OSError, ValueError):
+            continue
+    return None, None
+
+
+def _describe_device(st_dev):
+    if not hasattr(os, "major"):
+        return Device(st_dev, str(st_dev), None)
+    number = f"{os.major(st_dev)}:{os.minor(st_dev)}"
+    sys_path = os.path.realpath(os.path.join(SYS_DEV_BLOCK, number))
+    disk, rotational = _read_rotational(sys_path) if os.path.exists(sys_path) else (None, None)
+    if disk is None:
+        return Device(number, number, None)
+    return Device(disk, disk, rotational)
+
+
+def block_device(path):
+    """Device holding path, or its nearest existing parent (outputs do not exist yet)."""
+    while True:
+        try:
+            st_dev = os.stat(path).st_dev
+            break
+        except OSError:
+            parent = os.path.dirname(path)
+            if not parent or parent == path:
+                return Device(None, "?", None)
+            path = parent
+    with _devices_lock:
+        device = _devices.get(st_dev)
+        if device is None:
+            device = _devices[st_dev] = _describe_device(st_dev)
+    return device
+
+
+class DeviceStats:
+    """Throughput counters of one device over a queue run."""
+
+    def __init__(self, device):
+        self.device = device
+        self.jobs = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.busy = 0.0  # seconds with at least one job on the device
+        self._active = 0
+        self._since = None
+
+    def job_started(self, now):
+        if self._active == 0:
+            self._since = now
+        self._active += 1
+
+    def job_finished(self, now, bytes_read, bytes_written):
+        self._active -= 1
+        if self._active == 0:
+            self.busy += now - self._since
+        self.jobs += 1
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+
+    def throughput(self):
+        """Bytes read plus written per busy second."""
+        return (self.bytes_read + self.bytes_written) / self.busy if self.busy > 0 else 0.0
+
+
+class JobScheduler:
+    """
+    Decides which queue item starts next. An item may start when its backend
+    (see queue_manager.get_platform_backend) and every device it reads or
+    writes are below their job limits. Among those, the item whose devices
+    are the least busy wins, so jobs interleave across disks instead of
+    piling onto one spinning disk while others idle. Ties go to the job
+    ranked first by the policy (rank / rerank; 'fifo' keeps queue order).
+    The scheduled units are the jobs made by batches(); a single item works too.
+    Not thread-safe: only the QueueWorker thread calls it.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, backend_jobs=None, hdd_jobs=DEFAULT_HDD_JOBS,
+                 ssd_jobs=DEFAULT_SSD_JOBS, unknown_device_jobs=DEFAULT_UNKNOWN_DEVICE_JOBS,
+                 batch_size=DEFAULT_BATCH_SIZE, policy=DEFAULT_POLICY):
+        # Below 1 nothing of that backend (or nothing at all) could ever start
+        self.max_jobs = max(1, int(max_jobs))
+        self.backend_jobs = dict(DEFAULT_BACKEND_JOBS)
+        self.backend_jobs.update({backend: max(1, int(jobs)) for backend, jobs in (backend_jobs or {}).items()})
+        self.hdd_jobs = hdd_jobs
+        self.ssd_jobs = ssd_jobs
+        self.unknown_device_jobs = unknown_device_jobs
+        self.batch_size = batch_size
+        self.policy = policy
+        self.costs = {}  # path -> (size, estimated output size, estimated seconds, estimated CPU seconds)
+        self.ranked_at = None
+        self.running = {}  # backend -> jobs running
+        self.device_jobs = {}  # device key -> jobs running
+        self.stats = {}  # device key -> DeviceStats
+        self._item_devices = {}  # path -> devices it was started on
+        self._folder_devices = {}
+
+    @classmethod
+    def from_settings(cls, settings=None):
+        if settings is None:
+            settings = load_queue_settings()
+        return cls(settings["max_jobs"], settings["backend_jobs"], settings["hdd_jobs"], settings["ssd_jobs"],
+                   batch_size=settings.get("batch_size", DEFAULT_BATCH_SIZE),
+                   policy=settings.get("policy", DEFAULT_POLICY))
+
+    def backend_of(self, item):
+        from core.queue_manager import get_platform_backend
+        return get_platform_backend(item['platform'])
+
+    def devices_of(self, item):
+        """Devices an item reads from and writes to: its folder's, since outputs are written next to the input."""
+        folder = os.path.dirname(item['path'])
+        devices = self._folder_devices.get(folder)
+        if devices is None:
+            devices = self._folder_devices[folder] = [block_device(folder)]
+        return devices
+
+    def estimate_costs(self, items):
+        """
+        Refresh self.costs for items from roms.db: the output size comes from the
+        sampled estimate (size_estimates), else from the ratio recorded on earlier
+        runs, else from TYPICAL_SAVINGS; the wall and CPU time from the recorded
+        throughput (queue_throughput), else DEFAULT_THROUGHPUT. Sizes are read once per item.
+        """
+        from core import db_manager
+        from compression.compression_formats import get_format, savings_ratio
+        throughput = db_manager.get_throughput()
+        estimates = db_manager.get_estimates(item['id'] for item in items if item.get('id') is not None)
+        for item in items:
+            size = self.costs[item['path']][0] if item['path'] in self.costs else _file_size(item['path'])
+            file_format = get_format(item['path'])
+            _jobs, bytes_in, bytes_out, seconds, cpu_bytes_in, cpu_seconds = throughput.get(
+                (self.backend_of(item), item['action'], file_format), (0, 0, 0, 0, 0, 0))
+            if item['action'] == 'Compress' and estimates.get(item.get('id')):
+                output = estimates[item['id']][0]
+            elif bytes_in:
+                output = size * bytes_out / bytes_in
+            elif item['action'] == 'Compress':
+                output = size * (1 - savings_ratio(file_format))
+            else:
+                output = size
+            rate = bytes_in / seconds if bytes_in and seconds > 0 else DEFAULT_THROUGHPUT
+            cpu_rate = cpu_bytes_in / cpu_seconds if cpu_bytes_in and cpu_seconds > 0 else DEFAULT_THROUGHPUT
+            self.costs[item['path']] = (size, output, size / rate, size / cpu_rate)
+
+    def priority(self, item):
+        """Sort key of an item under the current policy (lower starts first); needs estimate_costs."""
+        if self.policy == 'fifo' or item['path'] not in self.costs:
+            return 0
+        size, output, seconds, cpu_seconds = self.costs[item['path']]
+        if self.policy == 'savings':
+            return output - size
+        if self.policy == 'sjf':
+            return seconds
+        # Per CPU second: wall time depends on how many jobs shared the cores when it was recorded
+        return (output - size) / max(cpu_seconds, 1e-3)
+
+    def rank(self, items):
+        """items sorted by priority (stable, so queue order breaks ties), with fresh costs."""
+        self.ranked_at = time.monotonic()
+        if self.policy == 'fifo':
+            return list(items)
+        self.estimate_costs(items)
+        return sorted(items, key=self.priority)
+
+    def rerank(self, jobs):
+        """
+        Sort pending jobs (from batches) in place by the best priority of their
+        items, with costs refreshed at most every RERANK_INTERVAL seconds.
+        """
+        if self.policy == 'fifo':
+            return
+        if self.ranked_at is not None and time.monotonic() - self.ranked_at < RERANK_INTERVAL:
+            return
+        self.ranked_at = time.monotonic()
+        self.estimate_costs([item for job in jobs for item in job.get('items') or [job]])
+        jobs.sort(key=lambda job: min(self.priority(item) for item in job.get('items') or [job]))
+
+    def batches(self, items):
+        """
+        Split queue items into jobs for take(): {'platform', 'action', 'path', 'items'},
+        each with up to batch_size items of one platform and action
+        (queue_manager.group_queue_by_platform_and_action) on the same devices.
+        A group is spread over as many jobs as its backend may run at once,
+        so batching never leaves a job slot idle. Jobs keep queue order.
+        """
+        from core.queue_manager import group_queue_by_platform_and_action
+        position = {id(item): index for index, item in enumerate(items)}
+        jobs = []
+        for platform, actions in group_queue_by_platform_and_action(items).items():
+            for action, group in actions.items():
+                by_devices = {}
+                for item in group:
+                    key = tuple(device.key for device in self.devices_of(item))
+                    by_devices.setdefault(key, []).append(item)
+                slots = self.backend_jobs.get(self.backend_of(group[0]), 1)
+                for same in by_devices.values():
+                    size = max(1, min(self.batch_size, -(-len(same) // slots)))
+                    for start in range(0, len(same), size):
+                        chunk = same[start:start + size]
+                        jobs.append({'platform': platform, 'action': action, 'path': chunk[0]['path'], 'items': chunk})
+        jobs.sort(key=lambda job: position[id(job['items'][0])])
+        return jobs
+
+    def device_limit(self, device):
+        if device.rotational is None:
+            return self.unknown_device_jobs
+        return self.hdd_jobs if device.rotational else self.ssd_jobs
+
+    def device_load(self, item):
+        """Jobs running on the busiest device of item, or None when one of them is at its limit."""
+        load = 0
+        for device in self.devices_of(item):
+            jobs = self.device_jobs.get(device.key, 0)
+            limit = self.device_limit(device)
+            if limit and jobs >= limit:
+                return None
+            load = max(load, jobs)
+        return load
+
+    def take(self, pending):
+        """Remove and return the item of pending that should start now, or None."""
+        if sum(self.running.values()) >= self.max_jobs:
+            return None
+        best = None
+        best_load = None
+        for position, item in enumerate(pending):
+            backend = self.backend_of(item)
+            if self.running.get(backend, 0) >= self.backend_jobs.get(backend, 1):
+                continue
+            load = self.device_load(item)
+            if load is None:
+                continue
+            if best_load is None or load < best_load:
+                best, best_load = position, load
+                if load == 0:
+                    break
+        return None if best is None else pending.pop(best)
+
+    def started(self, item):
+        backend = self.backend_of(item)
+        self.running[backend] = self.running.get(backend, 0) + 1
+        now = time.monotonic()
+        devices = self._item_devices[item['path']] = self.devices_of(item)
+        for device in devices:
+            self.device_jobs[device.key] = self.device_jobs.get(device.key, 0) + 1
+            stats = self.stats.get(device.key)
+            if stats is None:
+                stats = self.stats[device.key] = DeviceStats(device)
+            stats.job_started(now)
+
+    def finished(self, item, bytes_read=0, bytes_written=0):
+        backend = self.backend_of(item)
+        self.running[backend] -= 1
+        now = time.monotonic()
+        for device in self._item_devices.pop(item['path']):
+            self.device_jobs[device.key] -= 1
+            self.stats[device.key].job_finished(now, bytes_read, bytes_written)
+
+    def device_report(self):
+        """One line per device used so far: jobs, bytes moved and throughput."""
+        from core.utils import get_human_size
+        lines = []
+        for stats in self.stats.values():
+            kind = {True: "HDD", False: "SSD", None: "unknown"}[stats.device.rotational]
+            lines.append(
+                f"Device {stats.device.name} ({kind}): {stats.jobs} jobs, "
+                f"{get_human_size(stats.bytes_read)} read, {get_human_size(stats.bytes_written)} written, "
+                f"{get_human_size(stats.throughput())}/s"
+            )
+        return lines
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
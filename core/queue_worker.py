@@ -1,86 +1,145 @@
-from PySide6.QtCore import QObject, Signal, QThread
-import subprocess, sys, json, os
+from PySide6.QtCore import QObject, Signal
+import os
 
 class QueueWorker(QObject):
+    """
+    Runs the queue in a QThread, several jobs at once within the limits of
+    a core.queue_scheduler.JobScheduler (per backend, per disk and overall).
+    Items of one platform and action are batched into jobs
+    (JobScheduler.batches) that each go to one processor run; each job runs
+    on a pool thread. Items are still finished one by one as the processor
+    reports them: an item's status lines, then item_finished and
+    item_processed reach the GUI in that order; backend progress comes as
+    job_progress events. stop() lets the running items finish and starts
+    no new ones.
+    """
     status_update = Signal(str)
     finished = Signal()
-    item_finished = Signal()
+    item_finished = Signal(list, list)  # rows upserted, paths removed from roms.db by the item
     item_processed = Signal(str)
+    job_progress = Signal(object)  # progress events of core.job_progress.QueueProgress
 
-    def __init__(self, queue, queue_table, delete_original, verbose=False):
+    def __init__(self, queue, delete_original, verbose=False, scheduler=None, policy=None):
         super().__init__()
         self.queue = queue
-        self.queue_table = queue_table
         self.delete_original = delete_original
         self.stop_flag = False
         self.verbose = verbose
+        self.scheduler = scheduler
+        self.policy = policy  # a queue_scheduler.POLICIES key; None keeps the scheduler's
+        self.progress = None
 
     def stop(self):
         self.stop_flag = True
+        # Running batches skip the items they have not started
+        from core.processor_pool import processor_pool
+        processor_pool().cancel_busy()
 
     def run(self):
-        from core.queue_manager import get_platform_handler
-        for idx, item in enumerate(self.queue):
-            if self.stop_flag:
-                self.status_update.emit("Queue stopped by user.")
-                break
-            platform = item['platform']
-            handler = get_platform_handler(platform)
-            if handler:
-                # Não passa o parâmetro verbose para os handlers
-                handler(item, self.status_update, self.delete_original, self, sync=True)
-                self.queue_table.removeRow(0)
-                self.item_finished.emit()
-                self.item_processed.emit(item['path'])
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        from core.queue_manager import get_platform_backend
+        from core.queue_scheduler import JobScheduler, POLICIES
+        scheduler = self.scheduler or JobScheduler.from_settings()
+        if self.policy:
+            scheduler.policy = self.policy
+        items = []
+        for item in self.queue:
+            if get_platform_backend(item['platform']):
+                items.append(item)
             else:
-                self.status_update.emit(f"Platform not implemented: {platform}")
+                self.status_update.emit(f"Platform not implemented: {item['platform']}")
+        from core.job_progress import QueueProgress
+        self.progress = QueueProgress(items)
+        self.status_update.emit(f"Queue order: {POLICIES.get(scheduler.policy, scheduler.policy)}")
+        pending = scheduler.batches(scheduler.rank(items))
+        running = {}
+        with ThreadPoolExecutor(max_workers=scheduler.max_jobs) as pool:
+            while pending or running:
+                # Estimates and recorded throughput change while the queue runs
+                scheduler.rerank(pending)
+                while pending and not self.stop_flag:
+                    job = scheduler.take(pending)
+                    if job is None:
+                        break
+                    scheduler.started(job)
+                    running[pool.submit(self.run_job, job)] = job
+                if not running:
+                    # Nothing running and nothing may start: stopped, or no limit would ever let them
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = running.pop(future)
+                    try:
+                        bytes_read, bytes_written = future.result()
+                    except Exception as e:
+                        scheduler.finished(job)
+                        self.status_update.emit(f"Error processing {job['path']}: {e}")
+                        continue
+                    scheduler.finished(job, bytes_read, bytes_written)
+        left = [item for job in pending for item in job.get('items') or [job]]
+        if left and not self.stop_flag:
+            from core import db_manager
+            for item in left:
+                if item.get('queue_id') is not None:
+                    db_manager.set_queue_item_state(item['queue_id'], "failed")
+                self.status_update.emit(f"Not started, no job slot for {scheduler.backend_of(item).upper()}: {item['path']}")
+        elif left:
+            # They stay pending in the journal and in the queue view for the next run
+            self.status_update.emit(f"{len(left)} queued items not started: queue stopped")
+        # The processor processes idle between queue runs would only hold memory
+        from core.processor_pool import close_processor_pool
+        close_processor_pool()
+        for line in scheduler.device_report():
+            self.status_update.emit(line)
+        if self.stop_flag:
+            self.status_update.emit("Queue stopped by user.")
         self.finished.emit()
 
-# Exemplo de handler adaptado para QThread
-
-def handle_nintendo_switch_queue_item(item, status_update, delete_original=False, worker=None, sync=False):
-    #status_update.emit(f"[DEBUG] Valor de delete_original recebido: {delete_original}")
-    nsz_queue = [{'action': item['action'], 'path': item['path']}]
-    queue_file = os.path.join(os.path.dirname(__file__), '..', 'compression', 'nsz_queue_tmp.json')
-    with open(queue_file, 'w', encoding='utf-8') as f:
-        json.dump(nsz_queue, f, ensure_ascii=False, indent=2)
-    processor_path = os.path.join(os.path.dirname(__file__), '..', 'compression', 'nsz_queue_processor.py')
-    python_exe = sys.executable
-    try:
-        # Executa o processo NSZ
-        proc = subprocess.Popen([python_exe, processor_path, queue_file], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        
-        # Lê a saída do processo
-        for line in proc.stdout:
-            if worker and worker.stop_flag:
-                status_update.emit("NSZ process interrupted by user.")
-                proc.terminate()
-                break
-            status_update.emit(line.strip())
-        
-        # Espera o processo terminar
-        proc.wait()
-        
-        # Verifica o resultado
-        if proc.returncode == 0:
-            status_update.emit(f"Nintendo Switch queue processed: {item['action']}")
-        elif proc.returncode is not None:
-            status_update.emit(f"Error processing Nintendo Switch queue: código {proc.returncode}")
-
-        # Após o término do processo, tenta deletar se sucesso
-        if proc.returncode == 0 and delete_original:
-            file_path = item.get('path')
-            status_update.emit(f"Tentando deletar arquivo: {file_path}")
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    status_update.emit(f"Arquivo deletado: {file_path}")
-                except Exception as e:
-                    status_update.emit(f"Erro ao deletar arquivo: {e}")
-            else:
-                status_update.emit(f"Arquivo para deletar não encontrado: {file_path}")
-    except Exception as e:
-        status_update.emit(f"Erro ao rodar NSZ: {e}")
-    finally:
-        if os.path.exists(queue_file):
-            os.remove(queue_file)
+    def run_job(self, job):
+        """
+        Run one job of the scheduler (on a pool thread). As each item of it
+        finishes, the files it touched are brought up to date in roms.db and
+        item_finished / item_processed are emitted. Returns (bytes_read, bytes_written).
+        """
+        from core.queue_manager import get_platform_backend, run_processor_batch
+        from core import db_manager, scanner
+        items = job.get('items') or [job]
+        bytes_read = 0
+        for item in items:
+            try:
+                bytes_read += os.path.getsize(item['path'])
+            except OSError:
+                pass
+        written = [0]
+        def on_item(item, report):
+            if report['ok']:
+                self.status_update.emit(f"{item['action']} done: {item['path']}")
+            rows, removed = [], []
+            # An error here must not keep the rest of the batch from being finished
+            try:
+                # Only the files this item read or wrote change in roms.db, no folder rescan
+                rows, removed = scanner.refresh_paths(report['inputs'] + report['outputs'])
+                outputs = set(report['outputs'])
+                item_written = sum(row['size_bytes'] or 0 for row in rows if row['path'] in outputs)
+                written[0] += item_written
+                if report['ok'] and report.get('seconds') and item_written:
+                    from compression.compression_formats import get_format
+                    # Feeds the savings and duration estimates of later runs (JobScheduler.estimate_costs)
+                    db_manager.record_throughput(backend, item['action'], get_format(item['path']),
+                                                 self.progress.sizes.get(item['path'], 0), item_written, report['seconds'],
+                                                 report.get('cpu'))
+            except Exception as e:
+                self.status_update.emit(f"Error updating roms.db after {item['path']}: {e}")
+            self.item_finished.emit(rows, removed)
+            # The GUI takes the item off the queue view when it gets item_processed
+            self.item_processed.emit(item['path'])
+        backend = get_platform_backend(job['platform'])
+        try:
+            reports = run_processor_batch(backend, items, self.delete_original, self, on_item, self.progress)
+        except Exception as e:
+            self.status_update.emit(f"Error running {backend.upper()}: {e}")
+            reports = []
+        if len(items) > 1:
+            finished = sum(1 for report in reports if report is not None)
+            self.status_update.emit(f"{backend.upper()} batch processed: {finished} of {len(items)} items, {job['action']} ({job['platform']})")
+        return bytes_read, written[0]
@@ -0,0 +1,47 @@
+from PySide6.QtCore import QObject, Signal
+import time
+
+from core import scanner, db_manager
+
+class ScanWorker(QObject):
+    """
+    Streaming library scan meant to run in a QThread.
+    Each batch is committed to roms.db and its new and changed rows are handed
+    to the GUI through batch_ready, so the tables fill up while the walk is still
+    running; unchanged files are left to the models' paging.
+    """
+    batch_ready = Signal(list)
+    progress = Signal(int, float)  # files so far, files per second
+    finished = Signal(dict)
+
+    def __init__(self, folder, batch_size=scanner.DEFAULT_BATCH_SIZE):
+        super().__init__()
+        self.folder = folder
+        self.batch_size = batch_size
+        self.stop_flag = False
+
+    def stop(self):
+        self.stop_flag = True
+
+    def run(self):
+        scan_id = db_manager.new_scan_id()
+        summary = {"total": 0, "added": 0, "updated": 0, "removed": 0, "stopped": False}
+        start = time.monotonic()
+        for batch in scanner.iter_scan_batches(self.folder, batch_size=self.batch_size):
+            if self.stop_flag:
+                summary["stopped"] = True
+                break
+            rows, added, updated = scanner.process_scan_batch(batch, scan_id, changed_only=True)
+            summary["total"] += len(batch)
+            summary["added"] += added
+            summary["updated"] += updated
+            if rows:
+                self.batch_ready.emit(rows)
+            elapsed = max(time.monotonic() - start, 1e-6)
+            self.progress.emit(summary["total"], summary["total"] / elapsed)
+        # A partial walk must not delete the rows it did not reach
+        if not summary["stopped"]:
+            summary["removed"] = scanner.finish_scan(scan_id, self.folder)
+        scanner.end_scan()
+        summary["elapsed"] = time.monotonic() - start
+        self.finished.emit(summary)
@@ -1,67 +1,166 @@
-from core import utils
-
-def scan_and_prepare_roms(folder, status_label=None, progress_bar=None):
-    # Busca configurações do user_config.yaml
-    config_path = None
-    possible_paths = [
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), "user_config.yaml"),
-    ]
-    for p in possible_paths:
-        if os.path.exists(p):
-            config_path = p
-            break
-    ignored = []
-    ignore_textures = True
-    ignore_system_files = True
-    system_exts = []
-    if config_path:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f) or {}
-            ignored = config.get("ignored_folders", [])
-            ignore_textures = config.get("ignore_textures", True)
-            ignore_system_files = config.get("ignore_system_files", True)
-            system_exts = config.get("system_extensions", ['.ini', '.sys', '.dll', '.bat', '.tmp', '.lnk', '.dat', '.db', '.log', '.sav', '.cfg', '.bin', '.cue'])
-    file_list = scan_rom_folder(folder, ignored, ignore_textures, ignore_system_files, system_exts)
-    details_list = []
-    for idx, file_path in enumerate(file_list):
-        name = os.path.basename(file_path)
-        platform = utils.get_platform_from_path(file_path)
-        size = utils.get_human_size(os.path.getsize(file_path))
-        action = ""
-        details_list.append((name, platform, file_path, size, action))
-        if status_label:
-            status_label.setText(f"Processing: {name}")
-        if progress_bar:
-            progress_bar.setValue(idx+1)
-    return details_list, file_list
+from core import utils, db_manager, detector
+from compression.compression_formats import is_compressed, get_format
+from core.walker import ScanFilter, stat_entry, iter_files, DEFAULT_WORKERS
 import os
 import yaml
 
-def get_rom_folder():
+# Files handed to the DB/UI per step of the streaming scan
+DEFAULT_BATCH_SIZE = 500
+# A batch writing this many rows (a first scan, a new folder) defers the search index until the scan ends
+DEFER_INDEX_ROWS = 250
+# Disc images (.bin/.cue) are ROMs, not system files: .bin headers are sniffed by core.detector
+DEFAULT_SYSTEM_EXTENSIONS = ['.ini', '.sys', '.dll', '.bat', '.tmp', '.lnk', '.dat', '.db', '.log', '.sav', '.cfg']
+
+def load_scan_settings():
+    """Read the scan filters from user_config.yaml, falling back to the defaults."""
+    settings = {
+        "ignored": [],
+        "ignore_textures": True,
+        "ignore_system_files": True,
+        "system_exts": [],
+        "workers": DEFAULT_WORKERS,
+    }
     config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "user_config.yaml")
     if os.path.exists(config_path):
         with open(config_path, "r", encoding="utf-8") as f:
             config = yaml.safe_load(f) or {}
-            return config.get("default_folder", "")
-    return ""
+            settings["ignored"] = config.get("ignored_folders", [])
+            settings["ignore_textures"] = config.get("ignore_textures", True)
+            settings["ignore_system_files"] = config.get("ignore_system_files", True)
+            settings["system_exts"] = config.get("system_extensions", DEFAULT_SYSTEM_EXTENSIONS)
+            settings["workers"] = config.get("scan_workers", DEFAULT_WORKERS)
+    return settings
+
+def get_scan_filter(settings):
+    return ScanFilter(settings["ignored"], settings["ignore_textures"], settings["ignore_system_files"], settings["system_exts"])
 
+def iter_scan_batches(folder, settings=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield lists of at most batch_size FileEntry objects as the walker discovers them."""
+    if settings is None:
+        settings = load_scan_settings()
+    batch = []
+    for entry in iter_files(folder, get_scan_filter(settings), settings["workers"]):
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-def scan_rom_folder(folder, ignored=None, ignore_textures=True, ignore_system_files=True, system_exts=None):
-    if ignored is None:
-        ignored = []
-    if system_exts is None:
-        system_exts = ['.ini', '.sys', '.dll', '.bat', '.tmp', '.lnk', '.dat', '.db', '.log', '.sav', '.cfg', '.bin', '.cue']
-    ignored = [os.path.normpath(p) for p in ignored]
-    file_list = []
-    for root, dirs, files in os.walk(folder):
-        if ignore_textures:
-            dirs[:] = [d for d in dirs if d.lower() != "textures" and os.path.normpath(os.path.join(root, d)) not in ignored]
+def process_scan_batch(entries, scan_id=None, changed_only=False):
+    """
+    Commit one batch of discovered files to roms.db.
+    Only files whose (size, mtime, inode) fingerprint differs from the stored one
+    are re-processed; every file is stamped with scan_id so finish_scan can drop
+    the ones that vanished. Without one (watcher, refresh_paths) a fresh id is
+    used, so a scan running meanwhile keeps these rows. Large writes during a
+    scan defer the search index, which end_scan rebuilds.
+    Returns (rows, added, updated) where rows are dicts shaped like db_manager.get_all_roms(),
+    for every entry or, with changed_only, for the new and changed ones.
+    """
+    known = db_manager.lookup_roms(entry.path for entry in entries)
+    platforms = {}
+    formats = {}
+    unknown = []
+    for entry in entries:
+        stored = known.get(entry.path)
+        if stored and stored[0] == (entry.size, entry.mtime_ns, entry.inode):
+            # Both may come from a header sniff when the row was written, keep them
+            platforms[entry.path] = stored[1]
+            if stored[3]:
+                formats[entry.path] = stored[3]
+            continue
+        platforms[entry.path] = utils.get_platform_from_path(entry.path)
+        if platforms[entry.path] == "Unknown":
+            unknown.append(entry)
+    # The path says nothing: look at the file headers instead
+    for path, (file_format, platform) in detector.detect(unknown).items():
+        if platform:
+            platforms[path] = platform
+        if file_format:
+            formats[path] = file_format
+    rows = []
+    changed = []
+    unchanged = []
+    added = 0
+    for entry in entries:
+        fingerprint = (entry.size, entry.mtime_ns, entry.inode)
+        platform = platforms[entry.path]
+        file_format = formats.get(entry.path) or get_format(entry.name)
+        compressed = is_compressed(entry.name)
+        stored = known.get(entry.path)
+        if not stored or stored[0] != fingerprint:
+            if not stored:
+                added += 1
+            changed.append((entry.name, platform, entry.path, "") + fingerprint + (file_format, int(compressed)))
         else:
-            dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(root, d)) not in ignored]
-        for file in files:
-            file_path = os.path.join(root, file)
-            ext = os.path.splitext(file)[1].lower()
-            if ignore_system_files and ext in system_exts:
+            unchanged.append(entry.path)
+            if changed_only:
                 continue
-            file_list.append(file_path)
-    return file_list
+        rows.append({
+            'file_name': entry.name,
+            'platform': platform,
+            'path': entry.path,
+            'size_bytes': entry.size,
+            'format': file_format,
+            'compressed': compressed,
+            'action': ""
+        })
+    if scan_id is not None and len(changed) >= DEFER_INDEX_ROWS:
+        db_manager.defer_search_index()
+    stamp = scan_id if scan_id is not None else db_manager.new_scan_id()
+    db_manager.upsert_roms(changed, stamp)
+    # New rows only got their id from the insert
+    ids = {path: stored[2] for path, stored in known.items()}
+    new_paths = [entry.path for entry in entries if entry.path not in ids]
+    if new_paths:
+        ids.update(db_manager.get_rom_ids(new_paths))
+    for row in rows:
+        row['id'] = ids.get(row['path'])
+    # Changed rows were stamped by the upsert
+    if unchanged:
+        db_manager.touch_roms(unchanged, stamp)
+    return rows, added, len(changed) - added
+
+def refresh_paths(paths, settings=None):
+    """
+    Bring roms.db up to date for a few known files (e.g. the inputs and outputs
+    of a queue job) without walking the folder: existing files are upserted,
+    missing ones deleted. Returns (rows, removed_paths) like the folder watcher.
+    """
+    if settings is None:
+        settings = load_scan_settings()
+    scan_filter = get_scan_filter(settings)
+    entries = []
+    removed = []
+    for path in dict.fromkeys(paths):
+        try:
+            st = os.stat(path)
+        except OSError:
+            removed.append(path)
+            continue
+        name = os.path.basename(path)
+        if os.path.isfile(path) and scan_filter.accept_file(name):
+            entries.append(stat_entry(path, st, name))
+    rows = []
+    if entries:
+        rows, _added, _updated = process_scan_batch(entries)
+    if removed:
+        db_manager.delete_roms(removed)
+    return rows, removed
+
+def finish_scan(scan_id, folder):
+    """Remove the rows of files under folder the scan did not see. Returns how many were removed."""
+    return db_manager.delete_unseen(scan_id, folder)
+
+def end_scan():
+    """Rebuild the search index if the scan deferred it; call after every scan, stopped ones included."""
+    db_manager.restore_search_index()
+
+def get_rom_folder():
+    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "user_config.yaml")
+    if os.path.exists(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+            return config.get("default_folder", "")
+    return ""
@@ -0,0 +1,59 @@
+from PySide6.QtCore import QObject, Signal, Slot
+import sqlite3
+
+from core import db_manager
+
+# Milliseconds the search box must stay unchanged before a query starts
+DEFAULT_DEBOUNCE_MS = 250
+
+
+class SearchWorker(QObject):
+    """
+    Runs the search box queries on its own QThread.
+    Each request carries a generation number; when a newer request comes in
+    the query still running is interrupted and queued stale ones are skipped,
+    so only the last one typed reaches results_ready. The result holds the
+    first page of each table and the summary totals, applied by the GUI in one go.
+    """
+    results_ready = Signal(int, list, list, object)  # generation, terms, one page per requested table, get_totals() dict
+    _requested = Signal(int, list, list)
+
+    def __init__(self):
+        super().__init__()
+        self.latest = 0
+        self._conn = None
+        self._requested.connect(self.run_search)
+
+    def request(self, terms, pages):
+        """
+        Queue a search from the GUI thread and return its generation.
+        pages is one (compressed, order_by, descending, limit) tuple per table.
+        """
+        self.latest += 1
+        conn = self._conn
+        if conn is not None:
+            conn.interrupt()
+        self._requested.emit(self.latest, list(terms), list(pages))
+        return self.latest
+
+    @Slot(int, list, list)
+    def run_search(self, generation, terms, pages):
+        if generation != self.latest:
+            return
+        self._conn = db_manager.read_connection()
+        try:
+            results = []
+            for compressed, order_by, descending, limit in pages:
+                results.append(db_manager.fetch_rom_page(compressed, terms, order_by, descending, None, limit))
+                if generation != self.latest:
+                    return
+            totals = db_manager.get_totals(terms)
+        except sqlite3.OperationalError:
+            if generation != self.latest:
+                # Interrupted by a newer request
+                return
+            raise
+        finally:
+            self._conn = None
+        if generation == self.latest:
+            self.results_ready.emit(generation, terms, results, totals)
@@ -0,0 +1,62 @@
+import os
+import queue
+import threading
+import time
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
+# Older session files beyond this many are deleted when a new session starts
+MAX_SESSION_LOGS = 20
+_CLOSE = object()
+
+
+class SessionLogWriter:
+    """
+    Appends log lines to logs/session-<date>-<time>.log from a background thread,
+    so the GUI never waits on the disk. write() only queues the lines; the
+    file is created on the first one and flushed whenever the queue runs dry.
+    """
+
+    def __init__(self, log_dir=LOG_DIR, keep=MAX_SESSION_LOGS):
+        os.makedirs(log_dir, exist_ok=True)
+        _prune_sessions(log_dir, keep - 1)
+        self.path = os.path.join(log_dir, time.strftime("session-%Y%m%d-%H%M%S.log"))
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="SessionLogWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, lines):
+        if lines:
+            self._queue.put(lines)
+
+    def close(self):
+        """Write what is still queued and stop the thread."""
+        if self._thread:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        f = None
+        try:
+            while True:
+                lines = self._queue.get()
+                if lines is _CLOSE:
+                    return
+                if f is None:
+                    # Sessions that log nothing leave no file behind
+                    f = open(self.path, "a", encoding="utf-8", errors="replace")
+                f.write("\n".join(lines) + "\n")
+                if self._queue.empty():
+                    f.flush()
+        finally:
+            if f is not None:
+                f.close()
+
+
+def _prune_sessions(log_dir, keep):
+    sessions = sorted(name for name in os.listdir(log_dir) if name.startswith("session-") and name.endswith(".log"))
+    for name in sessions[:max(len(sessions) - keep, 0)]:
+        try:
+            os.remove(os.path.join(log_dir, name))
+        except OSError:
+            pass
@@ -0,0 +1,36 @@
+import sys
+import time
+
+
+class StartupProfile:
+    """
+    Wall-clock time of each startup phase, printed by main.py --profile-startup.
+    mark(phase) closes a phase: it lasted from the previous mark (or from
+    `started`) until now. When disabled, marks are still recorded but
+    report() prints nothing.
+    """
+
+    def __init__(self, enabled=False, started=None):
+        self.enabled = enabled
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = []
+        self.reported = False
+        self._last = self.started
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self, out=None):
+        self.reported = True
+        if not self.enabled:
+            return
+        out = out or sys.stdout
+        width = max(len(phase) for phase, _elapsed in self.phases)
+        print("Startup profile (ms):", file=out)
+        total = 0.0
+        for phase, elapsed in self.phases:
+            total += elapsed
+            print(f"  {phase:<{width}}  {elapsed * 1000:8.1f}  {total * 1000:8.1f}", file=out)
+        out.flush()
@@ -1,4 +1,5 @@
 import os
+import re
 
 # Cache for platforms list
 _PLATFORMS = None
@@ -17,101 +18,142 @@ def _load_platforms():
         _PLATFORMS = ["Nintendo Switch", "PlayStation", "Xbox", "PC"]  # Default platforms
     return _PLATFORMS
 
+# Common aliases for platforms (matched like the platform names themselves)
+PLATFORM_ALIASES = {
+    "Sony Playstation": ["ps", "ps1", "psx", "psone"],
+    "Sony Playstation 2": ["ps2", "playstation2"],
+    "Sony Playstation 3": ["ps3", "playstation3"],
+    "Sony Playstation 4": ["ps4", "playstation4"],
+    "Nintendo Switch": ["switch", "nx"],
+    "Nintendo Game Boy Advance": ["gba"],
+    "Nintendo Game Boy Color": ["gbc"],
+    "Nintendo GameCube": ["gc", "gamecube", "ngc"],
+    "Nintendo NES": ["famicom"],
+    "Nintendo SNES": ["superfamicom", "sfc"],
+    "Nintendo 64": ["n64"],
+    "Nintendo DS": ["nds"],
+    "Nintendo 3DS": ["3ds"],
+    "Nintendo Wii": ["wii"],
+    "Nintendo Wii U": ["wiiu"],
+    "Microsoft Xbox": ["xbox", "msxbox"],
+    "Microsoft Xbox 360": ["xbox360", "x360"],
+    "Sega Genesis": ["megadrive", "genesis"],
+    "Sega Saturn": ["saturn"],
+    "Sega Dreamcast": ["dc", "dreamcast"],
+}
+
+# Any of these anywhere in the path means Xbox 360, whatever else matches
+XBOX_360_TERMS = ("xbox 360", "xbox360", "x360")
+
+
+class PlatformMatcher:
+    """
+    Platform matcher compiled once from the platform list and PLATFORM_ALIASES.
+
+    Each platform contributes its name, its space-less/hyphenated/underscored
+    variants and its aliases as search terms. A term found in a path part
+    weighs len(term), +10 if both platform and term contain a digit, +5 if some
+    part equals the term or starts/ends with it joined by "_". The heaviest
+    platform wins; ties go to the longer platform name, then list order.
+    Terms never contain path separators, so a path is evaluated part by part
+    and the result of every directory is memoized: all files of a folder only
+    pay for their own file name, and only if it contains a term at all.
+    """
+
+    def __init__(self, platforms):
+        self.platforms = sorted(platforms, key=len, reverse=True)
+        self.xbox_360 = next((p for p in platforms if p.lower() == "microsoft xbox 360"), None)
+        # term -> ((platform index, weight without the exact bonus), ...)
+        targets = {}
+        for index, platform in enumerate(self.platforms):
+            lower = platform.lower()
+            terms = [lower, lower.replace(" ", ""), lower.replace(" ", "-"), lower.replace(" ", "_")]
+            terms.extend(PLATFORM_ALIASES.get(platform, []))
+            has_number = any(char.isdigit() for char in platform)
+            for term in terms:
+                number_bonus = 10 if has_number and any(char.isdigit() for char in term) else 0
+                targets.setdefault(term, {})[index] = len(term) + number_bonus
+        self.term_targets = {term: tuple(by_index.items()) for term, by_index in targets.items()}
+        self.terms = tuple(self.term_targets)
+        # Single pass to reject parts that contain no term at all
+        needles = sorted(set(self.terms) | set(XBOX_360_TERMS), key=len, reverse=True)
+        self._any_term = re.compile("|".join(re.escape(term) for term in needles))
+        self._part_cache = {}
+        self._dir_cache = {}
+
+    def _part_hits(self, part):
+        """Return ({term: exact}, mentions_xbox_360) for one lower-cased path part."""
+        if not self._any_term.search(part):
+            return {}, False
+        hits = {}
+        for term in self.terms:
+            if term in part:
+                hits[term] = part == term or part.startswith(f"{term}_") or part.endswith(f"_{term}")
+        return hits, any(term in part for term in XBOX_360_TERMS)
+
+    def _cached_part_hits(self, part):
+        result = self._part_cache.get(part)
+        if result is None:
+            result = self._part_cache[part] = self._part_hits(part)
+        return result
+
+    def _directory(self, directory):
+        """Merged hits of all parts of a directory plus its resolved platform (memoized)."""
+        result = self._dir_cache.get(directory)
+        if result is None:
+            hits = {}
+            xbox_360 = False
+            for part in directory.split("/"):
+                part_hits, part_xbox = self._cached_part_hits(part)
+                for term, exact in part_hits.items():
+                    hits[term] = hits.get(term, False) or exact
+                xbox_360 = xbox_360 or part_xbox
+            result = self._dir_cache[directory] = (hits, xbox_360, self._resolve(hits, xbox_360))
+        return result
+
+    def _resolve(self, hits, xbox_360):
+        if xbox_360 and self.xbox_360:
+            return self.xbox_360
+        best = {}
+        for term, exact in hits.items():
+            bonus = 5 if exact else 0
+            for index, weight in self.term_targets[term]:
+                weight += bonus
+                if weight > best.get(index, -1):
+                    best[index] = weight
+        if not best:
+            return "Unknown"
+        index = min(best, key=lambda i: (-best[i], i))
+        return self.platforms[index]
+
+    def match(self, path):
+        parts = os.path.normpath(path).lower().replace('\\', '/').split('/')
+        hits, xbox_360, platform = self._directory("/".join(parts[:-1]))
+        name_hits, name_xbox = self._part_hits(parts[-1])
+        if not name_hits and not name_xbox:
+            return platform
+        merged = dict(hits)
+        for term, exact in name_hits.items():
+            merged[term] = merged.get(term, False) or exact
+        return self._resolve(merged, xbox_360 or name_xbox)
+
+
+_MATCHER = None
+
+def get_platform_matcher():
+    """Return the shared PlatformMatcher, compiling it on first use."""
+    global _MATCHER
+    if _MATCHER is None:
+        _MATCHER = PlatformMatcher(_load_platforms())
+    return _MATCHER
+
 def get_platform_from_path(path, platforms_file=None):
     """
     Get platform from file path by checking if any part of the path matches known platforms.
     The matching is case-insensitive.
     Prefers longer matches to handle cases like "Playstation" vs "Playstation 2".
     """
-    platforms = _load_platforms()
-    
-    # Get full path as one string for searching
-    path_lower = os.path.normpath(path).lower()
-    
-    # Special case for Xbox 360 vs Xbox
-    if "xbox 360" in path_lower or "xbox360" in path_lower or "x360" in path_lower:
-        for platform in platforms:
-            if platform.lower() == "microsoft xbox 360":
-                return platform
-    
-    # Track all matches and their lengths to find the most specific one
-    matches = []
-    
-    # Define common aliases for platforms
-    platform_aliases = {
-        "Sony Playstation": ["ps", "ps1", "psx", "psone"],
-        "Sony Playstation 2": ["ps2", "playstation2"],
-        "Sony Playstation 3": ["ps3", "playstation3"],
-        "Sony Playstation 4": ["ps4", "playstation4"],
-        "Nintendo Switch": ["switch", "nx"],
-        "Nintendo Game Boy Advance": ["gba"],
-        "Nintendo Game Boy Color": ["gbc"],
-        "Nintendo GameCube": ["gc", "gamecube", "ngc"],
-        "Nintendo NES": ["famicom"],
-        "Nintendo SNES": ["superfamicom", "sfc"],
-        "Nintendo 64": ["n64"],
-        "Nintendo DS": ["nds"],
-        "Nintendo 3DS": ["3ds"],
-        "Nintendo Wii": ["wii"],
-        "Nintendo Wii U": ["wiiu"],
-        "Microsoft Xbox": ["xbox", "msxbox"],
-        "Microsoft Xbox 360": ["xbox360", "x360"],
-        "Sega Genesis": ["megadrive", "genesis"],
-        "Sega Saturn": ["saturn"],
-        "Sega Dreamcast": ["dc", "dreamcast"],
-    }
-    
-    # Sort platforms by length in descending order to prioritize more specific names
-    sorted_platforms = sorted(platforms, key=len, reverse=True)
-    
-    # Look for platform names in the path
-    for platform in sorted_platforms:
-        # Search for variations of the platform name
-        search_terms = [
-            platform.lower(),                    # Original
-            platform.lower().replace(" ", ""),   # No spaces
-            platform.lower().replace(" ", "-"),  # Hyphenated
-            platform.lower().replace(" ", "_")   # Underscored
-        ]
-        
-        # Add any aliases for this platform
-        if platform in platform_aliases:
-            search_terms.extend(platform_aliases[platform])
-        
-        for term in search_terms:
-            if term in path_lower:
-                # Weigh matches by term length and exact match status
-                # Give preference to exact matches (entire words)
-                exact_match = False
-                # Check if term is a separate word or folder name
-                parts = [p.lower() for p in path_lower.replace('\\', '/').split('/')]
-                if term in parts:  # Exact folder name match
-                    exact_match = True
-                else:  # Check for exact word match with word boundaries
-                    for part in parts:
-                        if part == term or part.startswith(f"{term}_") or part.endswith(f"_{term}"):
-                            exact_match = True
-                            break
-                
-                # Special higher weighting for:
-                # 1. Platforms that include numbers (like "Xbox 360" vs "Xbox")
-                # 2. Exact matches
-                # 3. Term length (longer terms are likely more specific)
-                has_number = any(char.isdigit() for char in platform)
-                number_bonus = 10 if has_number and any(char.isdigit() for char in term) else 0
-                exact_bonus = 5 if exact_match else 0
-                
-                # Calculate final weight
-                weight = len(term) + number_bonus + exact_bonus
-                matches.append((platform, weight, term))
-    
-    # Return the highest weighted match or "Unknown" if no matches
-    if matches:
-        # Sort by weight (descending)
-        matches.sort(key=lambda x: x[1], reverse=True)
-        return matches[0][0]  # Return the platform name with original casing
-    
-    return "Unknown"
+    return get_platform_matcher().match(path)
 
 
 def get_human_size(size_bytes):
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# One discovered file: the stat data comes from the same scandir pass that found it
+FileEntry = namedtuple("FileEntry", ["path", "name", "size", "mtime_ns", "inode"])
+
+DEFAULT_WORKERS = 8
+# Max directory listings buffered between the walker threads and the consumer
+MAX_PENDING_DIRS = 64
+_DONE = object()
+
+
+class ScanFilter:
+    """Folder/file filters from user_config.yaml (ignored folders, textures, system files)."""
+
+    def __init__(self, ignored=None, ignore_textures=True, ignore_system_files=True, system_exts=None):
+        self.ignored = {os.path.normpath(p) for p in (ignored or [])}
+        self.ignore_textures = ignore_textures
+        self.ignore_system_files = ignore_system_files
+        self.system_exts = set(ext.lower() for ext in (system_exts or []))
+
+    def accept_dir(self, path, name=None):
+        if name is None:
+            name = os.path.basename(path)
+        if self.ignore_textures and name.lower() == "textures":
+            return False
+        return os.path.normpath(path) not in self.ignored
+
+    def accept_file(self, name):
+        if not self.ignore_system_files:
+            return True
+        return os.path.splitext(name)[1].lower() not in self.system_exts
+
+    def accept_path(self, path, root):
+        """True if path sits under root without crossing a filtered folder (path itself is not checked)."""
+        relative = os.path.relpath(os.path.dirname(path), root)
+        if relative == os.curdir:
+            return True
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return False
+        current = root
+        for name in relative.split(os.sep):
+            current = os.path.join(current, name)
+            if not self.accept_dir(current, name):
+                return False
+        return True
+
+
+# On Windows DirEntry.stat() leaves st_ino at 0 and DirEntry.inode() costs one more
+# stat per file (a network round trip on shares), so fingerprints do without the inode there
+USE_INODE = os.name != "nt"
+
+
+def stat_entry(path, st, name=None):
+    """FileEntry of path from its stat result, fingerprinted the same way as the walker's."""
+    return FileEntry(path, name or os.path.basename(path), st.st_size, st.st_mtime_ns,
+                     st.st_ino if USE_INODE else 0)
+
+
+def _file_entry(entry):
+    return stat_entry(entry.path, entry.stat(), entry.name)
+
+
+def scan_dir(path, scan_filter):
+    """List one directory. Returns (files, subdirs) following os.walk rules (symlinked dirs are not entered)."""
+    files = []
+    subdirs = []
+    try:
+        it = os.scandir(path)
+    except OSError:
+        return files, subdirs
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir():
+                    if not entry.is_symlink() and scan_filter.accept_dir(entry.path, entry.name):
+                        subdirs.append(entry.path)
+                elif scan_filter.accept_file(entry.name):
+                    files.append(_file_entry(entry))
+            except OSError:
+                # File vanished or is unreadable between listing and stat
+                continue
+    return files, subdirs
+
+
+def iter_files(folder, scan_filter=None, workers=DEFAULT_WORKERS, max_pending=MAX_PENDING_DIRS):
+    """
+    Yield a FileEntry for every accepted file under folder as soon as its
+    directory has been listed. The walker threads block once `max_pending`
+    listings are waiting, so memory stays flat however big the tree is.
+    """
+    if scan_filter is None:
+        scan_filter = ScanFilter()
+    files, subdirs = scan_dir(folder, scan_filter)
+    yield from files
+    if not subdirs:
+        return
+    results = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+
+    def walk(top):
+        stack = [top]
+        while stack and not stop.is_set():
+            files, dirs = scan_dir(stack.pop(), scan_filter)
+            if files:
+                results.put(files)
+            stack.extend(reversed(dirs))
+
+    def produce():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                list(pool.map(walk, subdirs))
+        finally:
+            results.put(_DONE)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield from item
+    finally:
+        # Consumer went away early: stop the walkers and unblock any pending put()
+        stop.set()
+        while producer.is_alive():
+            try:
+                results.get(timeout=0.1)
+            except queue.Empty:
+                pass
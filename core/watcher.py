@@ -0,0 +1,344 @@
+import ctypes
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from core import db_manager, scanner
+from core.walker import iter_files, scan_dir, stat_entry
+
+# Seconds a path must stay quiet before its events are applied
+DEFAULT_DEBOUNCE = 1.0
+# Polling backend: seconds between two checks of the directory mtimes
+DEFAULT_POLL_INTERVAL = 10.0
+# Polling backend: seconds between two full relistings of the tree, for what directory
+# mtimes do not show (files rewritten in place, FAT/exFAT drives that never update them)
+DEFAULT_RESYNC_INTERVAL = 1800.0
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class RomFolderWatcher:
+    """
+    Keeps roms.db in sync with the ROM folder without full rescans.
+    Filesystem events are coalesced per path and applied once the path has
+    been quiet for `debounce` seconds. Uses inotify on Linux and falls back to
+    polling elsewhere: one stat per directory every poll_interval, and only the
+    directories whose mtime moved are listed again. Folders inotify refuses to
+    watch (e.g. past fs.inotify.max_user_watches) are polled the same way.
+    on_changes(rows, removed_paths) is called from the watcher thread after the
+    DB has been updated; rows are dicts shaped like db_manager.get_all_roms().
+    on_message(text), if given, gets the problems worth showing to the user.
+    """
+
+    def __init__(self, folder, on_changes, settings=None, debounce=DEFAULT_DEBOUNCE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, resync_interval=DEFAULT_RESYNC_INTERVAL, use_inotify=True,
+                 on_message=None):
+        self.folder = folder
+        self.on_changes = on_changes
+        self.on_message = on_message
+        self.settings = settings or scanner.load_scan_settings()
+        self.scan_filter = scanner.get_scan_filter(self.settings)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self._libc = _load_libc() if use_inotify else None
+        self._fd = None
+        self._watches = {}
+        self._dirs = {}
+        self._settling = set()
+        self._pending = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def backend(self):
+        return "inotify" if self._libc else "polling"
+
+    def start(self):
+        if self._libc:
+            self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if self._fd < 0:
+                self._libc = None
+        if self._libc:
+            self._watch_tree(self.folder)
+            target = self._run_inotify
+        else:
+            self._index_tree(self.folder)
+            target = self._run_polling
+        self._thread = threading.Thread(target=target, name="RomFolderWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._watches.clear()
+        self._dirs.clear()
+        self._settling.clear()
+
+    # inotify backend
+
+    def _add_watch(self, path):
+        """Watch one directory. Returns 0 on success, else the errno of inotify_add_watch."""
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return ctypes.get_errno() or errno.EINVAL
+        self._watches[wd] = path
+        return 0
+
+    def _watch_tree(self, top):
+        """Watch top and the folders below it; subtrees inotify refuses are polled instead."""
+        failed = []
+        for root, dirs, _files in os.walk(top):
+            error = self._add_watch(root)
+            if error == errno.ENOENT:
+                dirs[:] = []  # gone meanwhile: its parent's events report it
+                continue
+            if error:
+                failed.append((root, error))
+                self._index_tree(root)
+                dirs[:] = []
+                continue
+            dirs[:] = [d for d in dirs if self.scan_filter.accept_dir(os.path.join(root, d), d)]
+        if failed and self.on_message:
+            path, error = failed[0]
+            self.on_message(
+                f"Folder watcher: cannot watch {len(failed)} folder(s) with inotify, e.g. {path} "
+                f"({os.strerror(error)}); polling them every {self.poll_interval:g}s instead. "
+                f"Raising fs.inotify.max_user_watches avoids this."
+            )
+
+    def _unwatch_tree(self, top):
+        """Stop watching (or polling) top and the folders below it, e.g. once moved out of the tree."""
+        prefix = os.path.join(top, "")
+        for wd, path in list(self._watches.items()):
+            if path == top or path.startswith(prefix):
+                del self._watches[wd]
+                self._libc.inotify_rm_watch(self._fd, wd)
+        self._forget_tree(top)
+
+    def _run_inotify(self):
+        last_poll = last_resync = time.monotonic()
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], min(self.debounce, 0.25))
+            if ready:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                self._handle_events(data)
+            now = time.monotonic()
+            if self._dirs and now - last_poll >= self.poll_interval:
+                # Subtrees _watch_tree could not watch
+                last_poll = now
+                resync = now - last_resync >= self.resync_interval
+                if resync:
+                    last_resync = now
+                self._poll(resync)
+            self._flush_quiet()
+
+    def _handle_events(self, data):
+        offset = 0
+        now = time.monotonic()
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost: resync the whole tree
+                self._pending[self.folder] = now
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            parent = self._watches.get(wd)
+            if parent is None:
+                continue
+            path = os.path.join(parent, os.fsdecode(name)) if name else parent
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM or mask & IN_MOVE_SELF:
+                # Its watches would keep reporting events under the old path; a move
+                # within the tree is watched again by the IN_MOVED_TO that follows
+                self._unwatch_tree(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                if self.scan_filter.accept_dir(path):
+                    self._watch_tree(path)
+            self._pending[path] = now
+
+    # polling backend
+
+    def _list_dir(self, directory):
+        """(mtime_ns, {file: fingerprint}, {subdirectory}) of one directory, None if it is gone."""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+        # The mtime is read first: a change made during the listing shows at the next poll
+        files, subdirs = scan_dir(directory, self.scan_filter)
+        return mtime_ns, {entry.path: (entry.size, entry.mtime_ns, entry.inode) for entry in files}, set(subdirs)
+
+    def _index_tree(self, top):
+        """List top and every directory below it into the polling state."""
+        stack = [top]
+        while stack:
+            directory = stack.pop()
+            listing = self._list_dir(directory)
+            if listing is None:
+                continue
+            self._dirs[directory] = listing
+            stack.extend(listing[2])
+
+    def _forget_tree(self, top):
+        prefix = os.path.join(top, "")
+        for directory in [d for d in self._dirs if d == top or d.startswith(prefix)]:
+            del self._dirs[directory]
+
+    def _poll(self, resync=False):
+        """
+        Mark what changed since the last poll as pending. Only directories whose
+        mtime moved are listed (all of them on a resync); files that were created
+        or changed are stat'ed again on the next polls until they stop changing,
+        since writing into a file does not touch its directory.
+        """
+        now = time.monotonic()
+        for directory in list(self._dirs):
+            if directory not in self._dirs:
+                continue  # forgotten with its parent during this poll
+            mtime_ns, files, subdirs = self._dirs[directory]
+            if not resync:
+                try:
+                    if os.stat(directory).st_mtime_ns == mtime_ns:
+                        continue
+                except OSError:
+                    pass
+            listing = self._list_dir(directory)
+            if listing is None:
+                # Gone: the parent's listing reports it, unless it is the root itself
+                self._forget_tree(directory)
+                self._pending[directory] = now
+                continue
+            self._dirs[directory] = listing
+            _mtime_ns, new_files, new_subdirs = listing
+            for path, fingerprint in new_files.items():
+                if files.get(path) != fingerprint:
+                    self._pending[path] = now
+                    self._settling.add(path)
+            for path in files.keys() - new_files.keys():
+                self._pending[path] = now
+            for subdir in new_subdirs - subdirs:
+                self._index_tree(subdir)
+                self._pending[subdir] = now
+            for subdir in subdirs - new_subdirs:
+                self._forget_tree(subdir)
+                self._pending[subdir] = now
+        for path in list(self._settling):
+            listing = self._dirs.get(os.path.dirname(path))
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if listing is None or st is None or path not in listing[1]:
+                self._settling.discard(path)  # removal shows in the directory listing
+                continue
+            fingerprint = stat_entry(path, st)[2:]
+            if listing[1][path] != fingerprint:
+                listing[1][path] = fingerprint
+                self._pending[path] = now
+            elif self._pending.get(path) != now:
+                # Unchanged for a whole poll interval
+                self._settling.discard(path)
+
+    def _run_polling(self):
+        last_resync = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            resync = time.monotonic() - last_resync >= self.resync_interval
+            if resync:
+                last_resync = time.monotonic()
+            self._poll(resync)
+            # Paths that changed in this poll wait for the next one, so files still being written settle first
+            self._flush_quiet()
+
+    # applying changes
+
+    def _flush_quiet(self, force=False):
+        if not self._pending:
+            return
+        deadline = time.monotonic() - self.debounce
+        ready = [path for path, last in self._pending.items() if force or last <= deadline]
+        for path in ready:
+            del self._pending[path]
+        if ready:
+            self.apply_paths(ready)
+
+    def apply_paths(self, paths):
+        """Upsert/delete the rows for the given changed paths. Returns (rows, removed_paths)."""
+        entries = {}
+        removed = set()
+        for path in paths:
+            if path != self.folder and not self.scan_filter.accept_path(path, self.folder):
+                continue
+            if os.path.isdir(path):
+                if path != self.folder and not self.scan_filter.accept_dir(path):
+                    continue
+                # New, moved-in or resynced folder: upsert its files, drop rows that are gone
+                seen = set()
+                for entry in iter_files(path, self.scan_filter, self.settings["workers"]):
+                    entries[entry.path] = entry
+                    seen.add(entry.path)
+                removed.update(p for p in db_manager.get_paths_under(path) if p not in seen)
+            elif os.path.isfile(path) and self.scan_filter.accept_file(os.path.basename(path)):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    removed.add(path)
+                    continue
+                entries[path] = stat_entry(path, st)
+            else:
+                # Deleted or moved away, possibly a whole folder
+                removed.update(db_manager.get_paths_under(path))
+        removed.difference_update(entries)
+        rows = []
+        if entries:
+            rows, _added, _updated = scanner.process_scan_batch(list(entries.values()))
+        if removed:
+            db_manager.delete_roms(removed)
+        if rows or removed:
+            self.on_changes(rows, sorted(removed))
+        return rows, sorted(removed)
@@ -1,62 +1,94 @@
 # Main window UI logic for ROM Compression Center
 # main.py
-from PySide6.QtWidgets import (
-    QApplication, QWidget, QTableWidget, QListWidget, QPushButton, QVBoxLayout,
-    QHBoxLayout, QCheckBox, QLabel, QTableWidgetItem, QLineEdit, QSplitter
-)
+import time
+_STARTED = time.perf_counter()
 
-from PySide6.QtCore import Qt, Signal, QThread
-from core.queue_worker import QueueWorker, handle_nintendo_switch_queue_item
+# Widgets used outside init_ui only; init_ui and the dialogs import their own
+from PySide6.QtWidgets import QApplication, QWidget, QLabel, QTableWidgetItem
+from PySide6.QtCore import Signal, QThread, QTimer
 import os
-from core import db_manager, scanner, queue_manager, utils
+# Only what the window needs to show up is imported here; the queue, scanner
+# and watcher modules (and yaml with them) are imported where they are used
+from core import db_manager, utils
+from core.startup_profile import StartupProfile
+
+# Queue view changes bigger than this rebuild the whole view instead of touching rows one by one
+QUEUE_VIEW_REBUILD = 200
 
 class RomCompressionGUI(QWidget):
     status_update = Signal(str)
+    roms_changed = Signal(list, list)  # upserted rows, removed paths (from the folder watcher)
 
-    def __init__(self):
+    def __init__(self, profile=None):
         super().__init__()
+        self.profile = profile or StartupProfile()
         self.setWindowTitle("ROM Compression Center")
         self.resize(1000, 600)
         self.uncompressed_label = QLabel()
         self.compressed_label = QLabel()
         self.queue_running = False
         self.stop_queue_flag = False
-        self.nsz_proc = None
         self.debug_log = None  # Will be set in init_ui
+        self.scan_thread = None
+        self.rescan_pending = False
+        self.estimate_thread = None
+        self.estimate_pending = False
+        self.folder_watcher = None
+        # Queue membership, in the order ROMs were ticked: roms.id -> (action, file name)
+        self.queue_selection = {}
+        self.queue_items = {}  # roms.id -> action cell of its queue_table row
+        self.queue_bars = {}  # roms.id -> progress bar of a running queue item
         
-        # Inicializa os contadores totais para evitar erros
-        self.total_uncompressed_all = 0
-        self.total_uncompressed_size_all = 0
-        self.total_compressed_all = 0
-        self.total_compressed_size_all = 0
-        
+        db_manager.init_db()
+        self.profile.mark("database")
         self.init_ui()
+        self.profile.mark("widgets")
+        self.start_search_thread()
         self.refresh_button.clicked.connect(self.refresh_rom_folder)
         self.run_button.clicked.connect(self.toggle_queue)
         self.status_update.connect(self.handle_status_update)
+        self.roms_changed.connect(self.apply_rom_changes)
+        # Both run once the event loop is up, so the window shows before any ROM is read
         self.load_roms_from_db()
+        QTimer.singleShot(0, self.start_folder_watcher)
+        QTimer.singleShot(0, self.start_size_estimates)
+        QTimer.singleShot(0, self.restore_queue)
         # Inicializa a visibilidade do console de debug
         self.update_debug_log_visibility()
-        # self.load_queue_from_file_and_populate()
-    def load_queue_from_file_and_populate(self):
-        from core.queue_manager import load_queue_from_file
-        queue = load_queue_from_file()
-        self.queue_table.setRowCount(len(queue))
-        for row, item in enumerate(queue):
-            action_item = QTableWidgetItem(item['action'])
-            action_item.setFlags(action_item.flags() & ~Qt.ItemIsEditable)
-            name_item = QTableWidgetItem(item['name'])
-            name_item.setFlags(name_item.flags() & ~Qt.ItemIsEditable)
-            self.queue_table.setItem(row, 0, action_item)
-            self.queue_table.setItem(row, 1, name_item)
-        
+        self.profile.mark("search thread")
+
+    def restore_queue(self):
+        """
+        Queue state left by the last session: the default order (queue_policy), and the
+        items an interrupted run left pending, ticked again (see queue_manager.recover_queue).
+        """
+        from itertools import groupby
+        from core import queue_manager
+        from core.queue_scheduler import load_queue_settings
+        # queue_policy in user_config.yaml picks the order shown by default
+        self.policy_combo.setCurrentIndex(max(0, self.policy_combo.findData(load_queue_settings()["policy"])))
+        pending, removed = queue_manager.recover_queue()
+        if removed:
+            from core import scanner
+            scanner.refresh_paths(removed)
+            # The first page may already be on its way with the partial files in it
+            self.apply_table_search()
+            self.status_update.emit(f"Removed {len(removed)} partial outputs of the interrupted queue run")
+        if not pending:
+            return
+        ids = db_manager.get_rom_ids([item['path'] for item in pending])
+        # One check_ids per run of the same action keeps the queue order
+        for action, run in groupby(pending, key=lambda item: item['action']):
+            model = self.model_compressed if action == "Uncompress" else self.model_uncompressed
+            model.check_ids([ids[item['path']] for item in run if item['path'] in ids])
+        self.status_update.emit(f"Queue restored: {len(pending)} items left from the last session")
+
     def set_status_label(self, text):
         self.status_label.setText(text)
 
     def handle_status_update(self, text):
-        self.set_status_label(text)
-        if self.debug_log:
-            self.debug_log.appendPlainText(text)
+        # Batched by the console: the status label and the log catch up every LOG_FLUSH_MS
+        self.log_console.append(text)
             
     def add_log(self, text):
         """
@@ -74,13 +106,13 @@ class RomCompressionGUI(QWidget):
     def toggle_queue(self):
         if not self.queue_running:
             # Check if queue has items
-            queue = queue_manager.build_queue_from_tables(
-                self.table_uncompressed,
-                self.table_compressed,
-                self.queue_table
+            from PySide6.QtWidgets import QMessageBox
+            from core import queue_manager
+            from core.queue_worker import QueueWorker
+            queue = queue_manager.build_queue(
+                [(rom_id, action) for rom_id, (action, _name) in self.queue_selection.items()]
             )
             if not queue:
-                from PySide6.QtWidgets import QMessageBox
                 QMessageBox.information(
                     self,
                     "Queue Empty",
@@ -89,7 +121,6 @@ class RomCompressionGUI(QWidget):
                 return
             # Confirmation if delete is checked
             if self.compress_checkbox.isChecked():
-                from PySide6.QtWidgets import QMessageBox
                 reply = QMessageBox.question(
                     self,
                     "Confirm Deletion",
@@ -104,15 +135,21 @@ class RomCompressionGUI(QWidget):
             self.run_button.setText("Stop Queue")
             self.refresh_button.setEnabled(False)
             self.settings_button.setEnabled(False)
+            self.policy_combo.setEnabled(False)
             self.queue_thread = QThread()
             # Ainda passamos o parâmetro 'verbose', mas apenas para controle interno do QueueWorker
             # Esse parâmetro não será propagado para os handlers
-            self.queue_worker = QueueWorker(queue, self.queue_table, self.compress_checkbox.isChecked(), verbose=self.verbose_checkbox.isChecked())
+            self.queue_worker = QueueWorker(queue, self.compress_checkbox.isChecked(), verbose=self.verbose_checkbox.isChecked(),
+                                            policy=self.policy_combo.currentData())
             self.queue_worker.moveToThread(self.queue_thread)
             self.queue_worker.status_update.connect(self.handle_status_update)
             self.queue_worker.finished.connect(self.queue_finished)
-            self.queue_worker.item_finished.connect(self.refresh_rom_folder)
-            self.queue_worker.item_processed.connect(self.update_table_row_for_path)
+            self.queue_worker.item_finished.connect(self.apply_rom_changes)
+            self.queue_worker.item_processed.connect(self.queue_item_processed)
+            self.queue_worker.job_progress.connect(self.update_job_progress)
+            self.queue_progress_bar.setValue(0)
+            self.queue_progress_bar.setFormat("Queue starting...")
+            self.queue_progress_bar.show()
             self.queue_thread.started.connect(self.queue_worker.run)
             self.queue_thread.start()
         else:
@@ -122,51 +159,32 @@ class RomCompressionGUI(QWidget):
             if hasattr(self, 'queue_worker'):
                 self.queue_worker.stop()
 
-    def _recalculate_totals(self):
-        """Recalcula os totais de ROMs e tamanho para os rótulos de resumo"""
-        # Calcula totais para arquivos não comprimidos
-        total_uncompressed = 0
-        total_uncompressed_size = 0
-        for row in range(self.table_uncompressed.rowCount()):
-            if not self.table_uncompressed.isRowHidden(row):
-                total_uncompressed += 1
-                path_item = self.table_uncompressed.item(row, 3)
-                if path_item and os.path.exists(path_item.text()):
-                    try:
-                        total_uncompressed_size += os.path.getsize(path_item.text())
-                    except (OSError, IOError):
-                        pass
-        
-        # Calcula totais para arquivos comprimidos
-        total_compressed = 0
-        total_compressed_size = 0
-        for row in range(self.table_compressed.rowCount()):
-            if not self.table_compressed.isRowHidden(row):
-                total_compressed += 1
-                path_item = self.table_compressed.item(row, 3)
-                if path_item and os.path.exists(path_item.text()):
-                    try:
-                        total_compressed_size += os.path.getsize(path_item.text())
-                    except (OSError, IOError):
-                        pass
-        
-        # Atualiza os totais armazenados e os rótulos
-        self.total_uncompressed_all = total_uncompressed
-        self.total_uncompressed_size_all = total_uncompressed_size
-        self.total_compressed_all = total_compressed
-        self.total_compressed_size_all = total_compressed_size
-        
-        # Atualiza os rótulos
+    def search_terms(self):
+        """Comma-separated terms typed in the search box (all must match)."""
+        return [f.strip() for f in self.search_edit.text().lower().split(',') if f.strip()]
+
+    def update_summary_labels(self, totals=None):
+        """Refresh the summary labels from roms.db (or given get_totals results), honouring the active search filter."""
+        if totals is None:
+            totals = db_manager.get_totals(self.model_uncompressed.terms)
+        total_uncompressed, total_uncompressed_size = totals.get(False, (0, 0))
+        total_compressed, total_compressed_size = totals.get(True, (0, 0))
         self.uncompressed_label.setText(f"Uncompressed ROMs: {total_uncompressed} | Total size: {utils.get_human_size(total_uncompressed_size)}")
         self.compressed_label.setText(f"Compressed ROMs: {total_compressed} | Total size: {utils.get_human_size(total_compressed_size)}")
 
     def queue_finished(self):
         self.queue_running = False
         self.run_button.setText("Run Queue")
+        # Queued log lines would otherwise overwrite the final status
+        self.log_console.flush()
         self.status_label.setText("Queue finished.")
+        self.queue_progress_bar.hide()
+        for bar in self.queue_bars.values():
+            bar.hide()
+        self.queue_bars = {}
         self.refresh_button.setEnabled(True)
         self.settings_button.setEnabled(True)
-        self.refresh_rom_folder()
+        self.policy_combo.setEnabled(True)
         if hasattr(self, 'queue_thread'):
             self.queue_thread.quit()
             self.queue_thread.wait()
@@ -174,25 +192,19 @@ class RomCompressionGUI(QWidget):
             del self.queue_thread
 
     def load_roms_from_db(self):
-        # Load ROMs from database and populate tables
-        details_list = db_manager.get_all_roms()  # List of dicts: file_name, platform, path, size, action
-        db_manager.populate_table_db(self, details_list)
-        # Atualiza os resumos usando os caminhos dos arquivos
-        file_list = [d['path'] for d in details_list if 'path' in d]
-        self.populate_table(file_list)
-
-    # Now handled by db_manager.populate_table_db
+        # The models only read the first page; the rest is fetched as the tables scroll
+        self.apply_table_search()
 
     def init_ui(self):
         from PySide6.QtWidgets import (
-            QHeaderView, QLabel, QLineEdit, QHBoxLayout, QVBoxLayout,
-            QProgressBar, QTableWidget, QListWidget, QCheckBox, QPushButton, QSplitter
+            QHeaderView, QLabel, QLineEdit, QHBoxLayout, QVBoxLayout, QProgressBar, QTableView,
+            QTableWidget, QCheckBox, QPushButton, QSplitter, QComboBox, QPlainTextEdit, QSizePolicy
         )
         from PySide6.QtCore import Qt
+        from ui.rom_table_model import RomTableModel
 
-        def configure_table(table: QTableWidget):
-            table.setColumnCount(5)
-            table.setHorizontalHeaderLabels(["Select", "File Name", "Platform", "Path", "Size"])
+        def configure_table(table: QTableView, model):
+            table.setModel(model)
             header = table.horizontalHeader()
 
             # Autosize (fixed)
@@ -207,34 +219,60 @@ class RomCompressionGUI(QWidget):
             header.setSectionResizeMode(1, QHeaderView.Interactive)  # File Name
             #header.setSectionResizeMode(3, QHeaderView.Interactive)  # Path
 
+            # Size columns to the rows on screen only, not to every row fetched so far
+            header.setResizeContentsPrecision(0)
+
             table.setSortingEnabled(True)
-            table.setSelectionMode(QTableWidget.NoSelection)
+            table.setSelectionMode(QTableView.NoSelection)
+            # Fixed row heights: the view never has to measure rows it does not paint
+            table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
 
         # Tables
-        self.table_uncompressed = QTableWidget()
-        configure_table(self.table_uncompressed)
+        self.model_uncompressed = RomTableModel(compressed=False, parent=self)
+        self.model_uncompressed.checked_changed.connect(
+            lambda added, removed: self.update_queue_selection("Compress", added, removed))
+        self.table_uncompressed = QTableView()
+        configure_table(self.table_uncompressed, self.model_uncompressed)
         self.table_uncompressed.verticalHeader().setVisible(False)
 
-        self.table_compressed = QTableWidget()
-        configure_table(self.table_compressed)
+        self.model_compressed = RomTableModel(compressed=True, parent=self)
+        self.model_compressed.checked_changed.connect(
+            lambda added, removed: self.update_queue_selection("Uncompress", added, removed))
+        self.table_compressed = QTableView()
+        configure_table(self.table_compressed, self.model_compressed)
         self.table_compressed.verticalHeader().setVisible(False)
 
+        for table in [self.table_uncompressed, self.table_compressed]:
+            table.setContextMenuPolicy(Qt.CustomContextMenu)
+            table.customContextMenuRequested.connect(lambda pos, table=table: self.show_selection_menu(table, pos))
+
         # Queue table
-        from PySide6.QtWidgets import QTableWidget, QHeaderView
         self.queue_table = QTableWidget()
-        self.queue_table.setColumnCount(2)
-        self.queue_table.setHorizontalHeaderLabels(["Action", "File Name"])
+        self.queue_table.setColumnCount(3)
+        self.queue_table.setHorizontalHeaderLabels(["Action", "File Name", "Progress"])
         header = self.queue_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.Interactive)
+        header.resizeSection(2, 220)
         self.queue_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.queue_table.setSelectionMode(QTableWidget.NoSelection)
         self.queue_table.verticalHeader().setVisible(False)
+        # Computed once: Qt flag arithmetic is slow in Python and bulk selections add thousands of rows
+        self.queue_item_flags = QTableWidgetItem().flags() & ~Qt.ItemIsEditable
 
         # Controls
         self.compress_checkbox = QCheckBox("Delete original after queue")
         self.verbose_checkbox = QCheckBox("Show detailed log in terminal")
         self.run_button = QPushButton("Run Queue")
+        # Order of the next queue run (core.queue_scheduler.POLICIES)
+        from core.queue_scheduler import POLICIES, DEFAULT_POLICY
+        self.policy_combo = QComboBox()
+        for policy, label in POLICIES.items():
+            self.policy_combo.addItem(label, policy)
+        self.policy_combo.setCurrentIndex(self.policy_combo.findData(DEFAULT_POLICY))
+        self.policy_combo.setToolTip("Which queue items start first. Savings and durations come from the size "
+                                     "estimates and the throughput of earlier runs.")
         self.refresh_button = QPushButton("Refresh")
         self.settings_button = QPushButton("Settings")
         self.status_label = QLabel("")
@@ -242,13 +280,19 @@ class RomCompressionGUI(QWidget):
         self.progress_bar.setMinimum(0)
         self.progress_bar.setValue(0)
         self.progress_bar.hide()
+        # Whole queue run: bytes processed, throughput and ETA (per item bars are in the queue table)
+        self.queue_progress_bar = QProgressBar()
+        self.queue_progress_bar.setRange(0, 1000)
+        self.queue_progress_bar.hide()
 
         # Debug log window
-        from PySide6.QtWidgets import QPlainTextEdit
         self.debug_log = QPlainTextEdit()
         self.debug_log.setReadOnly(True)
         self.debug_log.setMinimumHeight(120)
         self.debug_log.setPlaceholderText("Debug log output...")
+        from ui.log_console import LogConsole
+        from core.session_log import SessionLogWriter
+        self.log_console = LogConsole(self.debug_log, SessionLogWriter(), self.status_label, parent=self)
         
         # Inicialmente esconde ou mostra o console de debug com base no checkbox
         # O método será chamado após a inicialização completa
@@ -256,6 +300,12 @@ class RomCompressionGUI(QWidget):
         # Search
         self.search_edit = QLineEdit()
         self.search_edit.setPlaceholderText("Search table...")
+        # Typing restarts the timer; the query only runs once the box has been still for a moment
+        from core.search_worker import DEFAULT_DEBOUNCE_MS
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(DEFAULT_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_table_search)
 
         search_layout = QVBoxLayout()
         search_row = QHBoxLayout()
@@ -268,7 +318,6 @@ class RomCompressionGUI(QWidget):
         search_layout.addWidget(hint_label)
 
         # Right panel
-        from PySide6.QtWidgets import QSizePolicy
         right_layout = QVBoxLayout()
         right_layout.addLayout(search_layout)
         right_layout.addWidget(self.uncompressed_label)
@@ -285,7 +334,6 @@ class RomCompressionGUI(QWidget):
         right_widget.setLayout(right_layout)
 
         # Left panel
-        from PySide6.QtWidgets import QSizePolicy
         left_layout = QVBoxLayout()
         label_queue = QLabel("Selected Queue")
         label_queue.setMinimumHeight(0)
@@ -305,6 +353,8 @@ class RomCompressionGUI(QWidget):
         bottom_layout.addStretch()
         bottom_layout.addWidget(self.settings_button)
         bottom_layout.addWidget(self.refresh_button)
+        bottom_layout.addWidget(QLabel("Order:"))
+        bottom_layout.addWidget(self.policy_combo)
         bottom_layout.addWidget(self.run_button)
 
         # Main layout with splitter
@@ -320,6 +370,7 @@ class RomCompressionGUI(QWidget):
         final_layout.addLayout(bottom_layout)
         final_layout.addWidget(self.status_label)
         final_layout.addWidget(self.progress_bar)
+        final_layout.addWidget(self.queue_progress_bar)
         final_layout.addWidget(self.debug_log)
 
         self.setLayout(final_layout)
@@ -327,269 +378,280 @@ class RomCompressionGUI(QWidget):
 
         # Signals
         self.settings_button.clicked.connect(self.open_settings)
-        self.search_edit.textChanged.connect(self.apply_table_search)
+        self.search_edit.textChanged.connect(self.search_timer.start)
         self.verbose_checkbox.stateChanged.connect(self.update_debug_log_visibility)
 
 
     def refresh_rom_folder(self):
-        db_manager.clear_roms()
-        self.progress_bar.show()
+        from core import scanner
         folder = scanner.get_rom_folder()
         from PySide6.QtWidgets import QMessageBox
-        import os
         if not folder or not os.path.isdir(folder):
             QMessageBox.warning(self, "ROM Folder", "No valid ROM folder selected in settings.")
             return
-        details_list, file_list = scanner.scan_and_prepare_roms(folder, self.status_label, self.progress_bar)
-        db_manager.insert_roms(details_list)
-        self.status_label.setText(f"Scan complete. {len(file_list)} files processed.")
+        if self.scan_thread:
+            # A scan is already streaming; run another one once it is done
+            self.rescan_pending = True
+            return
+        self.rescan_pending = False
+        from core.scan_worker import ScanWorker
+        # Rows already shown are updated in place as the scanner commits batches to roms.db
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.refresh_button.setEnabled(False)
+        self.scan_thread = QThread()
+        self.scan_worker = ScanWorker(folder)
+        self.scan_worker.moveToThread(self.scan_thread)
+        self.scan_worker.batch_ready.connect(self.append_scan_batch)
+        self.scan_worker.progress.connect(self.update_scan_progress)
+        self.scan_worker.finished.connect(self.scan_finished)
+        self.scan_thread.started.connect(self.scan_worker.run)
+        self.scan_thread.start()
+
+    def append_scan_batch(self, rows):
+        self.model_uncompressed.apply_changes(rows)
+        self.model_compressed.apply_changes(rows)
+
+    def update_scan_progress(self, total, rate):
+        self.status_label.setText(f"Scanning... {total} files ({rate:.0f} rows/s)")
+
+    def scan_finished(self, summary):
+        self.status_label.setText(
+            f"Scan complete. {summary['total']} files "
+            f"({summary['added']} new, {summary['updated']} changed, {summary['removed']} removed) "
+            f"in {summary['elapsed']:.1f}s."
+        )
         self.progress_bar.hide()
-        self.populate_table(file_list)
-
-    def populate_table(self, file_list):
-        import sys, os
-        try:
-            from compression.compression_formats import is_compressed
-        except ImportError:
-            import importlib.util
-            comp_path = os.path.join(os.path.dirname(__file__), '..', 'compression', 'compression_formats.py')
-            spec = importlib.util.spec_from_file_location('compression_formats', comp_path)
-            comp_mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(comp_mod)
-            is_compressed = comp_mod.is_compressed
-        from PySide6.QtWidgets import QCheckBox, QWidget, QHBoxLayout, QComboBox, QTableWidgetItem
-        from PySide6.QtCore import Qt
-        # Separa arquivos por status
-        uncompressed = []
-        compressed = []
-        for path in file_list:
-            name = os.path.basename(path)
-            if is_compressed(name):
-                compressed.append(path)
-            else:
-                uncompressed.append(path)
-        # Resumo para não comprimidos
-        total_uncompressed = len(uncompressed)
-        total_uncompressed_size = sum(os.path.getsize(p) for p in uncompressed if os.path.exists(p))
-        self.uncompressed_label.setText(f"Uncompressed ROMs: {total_uncompressed} | Total size: {utils.get_human_size(total_uncompressed_size)}")
-        # Resumo para comprimidos
-        total_compressed = len(compressed)
-        total_compressed_size = sum(os.path.getsize(p) for p in compressed if os.path.exists(p))
-        self.compressed_label.setText(f"Compressed ROMs: {total_compressed} | Total size: {utils.get_human_size(total_compressed_size)}")
-        
-        # Armazena os totais originais para referência
-        self.total_uncompressed_all = total_uncompressed
-        self.total_uncompressed_size_all = total_uncompressed_size
-        self.total_compressed_all = total_compressed
-        self.total_compressed_size_all = total_compressed_size
-        # Preenche tabela de não comprimidos
-        # Only use this for scan results (refresh), not for DB loading
-        self.table_uncompressed.setRowCount(len(uncompressed))
-        checkboxes_uncompressed = []
-        for i, path in enumerate(uncompressed):
-            checkbox = QCheckBox()
-            checkbox.stateChanged.connect(lambda state, row=i: self.update_selected_queue(row, state))
-            checkboxes_uncompressed.append(checkbox)
-            widget = QWidget()
-            layout = QHBoxLayout(widget)
-            layout.addWidget(checkbox)
-            layout.setAlignment(checkbox, Qt.AlignCenter)
-            layout.setContentsMargins(0,0,0,0)
-            self.table_uncompressed.setCellWidget(i, 0, widget)
-            name = os.path.basename(path)
-            item_name = QTableWidgetItem(name)
-            item_name.setFlags(item_name.flags() & ~Qt.ItemIsEditable)
-            self.table_uncompressed.setItem(i, 1, item_name)
-            platform = utils.get_platform_from_path(path)
-            item_platform = QTableWidgetItem(platform)
-            item_platform.setFlags(item_platform.flags() & ~Qt.ItemIsEditable)
-            self.table_uncompressed.setItem(i, 2, item_platform)
-            item_path = QTableWidgetItem(path)
-            item_path.setFlags(item_path.flags() & ~Qt.ItemIsEditable)
-            self.table_uncompressed.setItem(i, 3, item_path)
-            # Only get size if file exists
-            if os.path.exists(path):
-                size = utils.get_human_size(os.path.getsize(path))
-            else:
-                size = "(missing)"
-            item_size = QTableWidgetItem(size)
-            item_size.setFlags(item_size.flags() & ~Qt.ItemIsEditable)
-            self.table_uncompressed.setItem(i, 4, item_size)
-        self.checkboxes_uncompressed = checkboxes_uncompressed
-        # Preenche tabela de comprimidos
-        self.table_compressed.setRowCount(len(compressed))
-        checkboxes_compressed = []
-        for i, path in enumerate(compressed):
-            checkbox = QCheckBox()
-            checkbox.stateChanged.connect(lambda state, row=i: self.update_selected_queue(row, state))
-            checkboxes_compressed.append(checkbox)
-            widget = QWidget()
-            layout = QHBoxLayout(widget)
-            layout.addWidget(checkbox)
-            layout.setAlignment(checkbox, Qt.AlignCenter)
-            layout.setContentsMargins(0,0,0,0)
-            self.table_compressed.setCellWidget(i, 0, widget)
-            name = os.path.basename(path)
-            item_name = QTableWidgetItem(name)
-            item_name.setFlags(item_name.flags() & ~Qt.ItemIsEditable)
-            self.table_compressed.setItem(i, 1, item_name)
-            platform = utils.get_platform_from_path(path)
-            item_platform = QTableWidgetItem(platform)
-            item_platform.setFlags(item_platform.flags() & ~Qt.ItemIsEditable)
-            self.table_compressed.setItem(i, 2, item_platform)
-            item_path = QTableWidgetItem(path)
-            item_path.setFlags(item_path.flags() & ~Qt.ItemIsEditable)
-            self.table_compressed.setItem(i, 3, item_path)
-            if os.path.exists(path):
-                size = utils.get_human_size(os.path.getsize(path))
-            else:
-                size = "(missing)"
-            item_size = QTableWidgetItem(size)
-            item_size.setFlags(item_size.flags() & ~Qt.ItemIsEditable)
-            self.table_compressed.setItem(i, 4, item_size)
-        self.checkboxes_compressed = checkboxes_compressed
-
+        self.progress_bar.setRange(0, 100)
+        self.refresh_button.setEnabled(not self.queue_running)
+        self.scan_thread.quit()
+        self.scan_thread.wait()
+        self.scan_worker.deleteLater()
+        self.scan_thread.deleteLater()
+        self.scan_thread = None
+        self.scan_worker = None
+        if summary['removed']:
+            # Rows of vanished files are only known to be gone once the scan is complete
+            self.apply_table_search()
+        else:
+            self.update_summary_labels()
+        self.start_size_estimates()
+        if self.rescan_pending:
+            self.refresh_rom_folder()
 
     def update_queue_list(self):
-        # Build a list of (action, name) tuples
-        queue_items = []
-        # COMPRESSED table: checked items = Uncompress
-        for i, checkbox in enumerate(getattr(self, 'checkboxes_compressed', [])):
-            if checkbox.isChecked():
-                name = self.table_compressed.item(i, 1).text()
-                queue_items.append(("Uncompress", name))
-        # UNCOMPRESSED table: checked items = Compress
-        for i, checkbox in enumerate(getattr(self, 'checkboxes_uncompressed', [])):
-            if checkbox.isChecked():
-                name = self.table_uncompressed.item(i, 1).text()
-                queue_items.append(("Compress", name))
-        # Populate the queue_table
-        self.queue_table.setRowCount(len(queue_items))
-        for row, (action, name) in enumerate(queue_items):
-            action_item = QTableWidgetItem(action)
-            action_item.setFlags(action_item.flags() & ~Qt.ItemIsEditable)
-            name_item = QTableWidgetItem(name)
-            name_item.setFlags(name_item.flags() & ~Qt.ItemIsEditable)
-            self.queue_table.setItem(row, 0, action_item)
-            self.queue_table.setItem(row, 1, name_item)
-        # Save queue to file every time it changes
-
-    def update_selected_queue(self, row, state):
-        self.update_queue_list()
+        """Rebuild the queue view from queue_selection."""
+        self.queue_items = {}
+        self.queue_bars = {}
+        self.queue_table.setUpdatesEnabled(False)
+        self.queue_table.setRowCount(0)
+        self.queue_table.setRowCount(len(self.queue_selection))
+        for row, (rom_id, (action, name)) in enumerate(self.queue_selection.items()):
+            self._set_queue_row(row, rom_id, action, name)
+        self.queue_table.setUpdatesEnabled(True)
+
+    def _set_queue_row(self, row, rom_id, action, name):
+        action_item = QTableWidgetItem(action)
+        action_item.setFlags(self.queue_item_flags)
+        name_item = QTableWidgetItem(name)
+        name_item.setFlags(self.queue_item_flags)
+        self.queue_table.setItem(row, 0, action_item)
+        self.queue_table.setItem(row, 1, name_item)
+        self.queue_items[rom_id] = action_item
+
+    def update_queue_selection(self, action, added, removed):
+        """
+        Apply ROMs ticked (table rows) and unticked (ids) in one of the tables to the queue.
+        Small changes only touch their own queue rows; bulk ones rebuild the view once.
+        """
+        for rom_id in removed:
+            self.queue_selection.pop(rom_id, None)
+        # Unticked items must not come back with the queue on the next start
+        db_manager.drop_pending_queue_items(removed)
+        for row in added:
+            self.queue_selection[row[0]] = (action, row[1])
+        if len(added) + len(removed) > QUEUE_VIEW_REBUILD:
+            self.update_queue_list()
+            return
+        for rom_id in removed:
+            self.queue_bars.pop(rom_id, None)
+            item = self.queue_items.pop(rom_id, None)
+            if item is not None:
+                self.queue_table.removeRow(self.queue_table.row(item))
+        for row in added:
+            position = self.queue_table.rowCount()
+            self.queue_table.insertRow(position)
+            self._set_queue_row(position, row[0], action, row[1])
+
+    def show_selection_menu(self, table, pos):
+        """Bulk selection for one ROM table: all/none/invert, one platform, or by expected savings."""
+        from PySide6.QtWidgets import QMenu, QInputDialog
+        model = table.model()
+        menu = QMenu(self)
+        menu.addAction("Select all", model.check_all)
+        menu.addAction("Select none", lambda: model.check_all(False))
+        menu.addAction("Invert selection", model.invert_checked)
+        index = table.indexAt(pos)
+        platform = model.index(index.row(), 2).data() if index.isValid() else None
+        if platform:
+            menu.addAction(f"Select all {platform}", lambda: model.check_platform(platform))
+        if not model.compressed:
+            def select_by_savings():
+                megabytes, ok = QInputDialog.getDouble(self, "Select by savings", "Minimum expected savings (MB):", 100, 0, 10**7, 1)
+                if ok:
+                    model.check_savings(megabytes * 1024 * 1024)
+            menu.addAction("Select by expected savings...", select_by_savings)
+        menu.exec(table.viewport().mapToGlobal(pos))
 
     def open_settings(self):
         from ui.settings_dialog import SettingsDialog
         dialog = SettingsDialog(self)
-        dialog.exec()
+        if dialog.exec():
+            # Folder or filters may have changed
+            self.start_folder_watcher()
+
+    def start_folder_watcher(self):
+        """(Re)start the optional folder watcher according to user_config.yaml."""
+        from ui.settings_dialog import load_config
+        self.stop_folder_watcher()
+        config = load_config()
+        folder = config.get("default_folder", "")
+        if not config.get("watch_folder", False) or not folder or not os.path.isdir(folder):
+            return
+        from core.watcher import RomFolderWatcher
+        self.folder_watcher = RomFolderWatcher(folder, self.roms_changed.emit, on_message=self.status_update.emit)
+        self.folder_watcher.start()
+        self.profile.mark("folder watcher")
+
+    def stop_folder_watcher(self):
+        if self.folder_watcher:
+            self.folder_watcher.stop()
+            self.folder_watcher = None
+
+    def start_search_thread(self):
+        from core.search_worker import SearchWorker
+        self.search_applied = 0
+        self.search_thread = QThread()
+        self.search_worker = SearchWorker()
+        self.search_worker.moveToThread(self.search_thread)
+        self.search_worker.results_ready.connect(self.apply_search_results)
+        self.search_thread.start()
+
+    def start_size_estimates(self):
+        """Predict the compressed size of the uncompressed ROMs that have no estimate yet, in the background."""
+        if self.estimate_thread:
+            # Already running; go over roms.db again once it is done
+            self.estimate_pending = True
+            return
+        self.estimate_pending = False
+        from core.estimate_worker import EstimateWorker
+        self.estimate_thread = QThread()
+        self.estimate_worker = EstimateWorker()
+        self.estimate_worker.moveToThread(self.estimate_thread)
+        self.estimate_worker.estimates_ready.connect(self.model_uncompressed.set_estimates)
+        self.estimate_worker.finished.connect(self.size_estimates_finished)
+        self.estimate_thread.started.connect(self.estimate_worker.run)
+        self.estimate_thread.start()
+
+    def size_estimates_finished(self, count):
+        self.stop_size_estimates()
+        if self.estimate_pending:
+            self.start_size_estimates()
+
+    def stop_size_estimates(self):
+        if self.estimate_thread:
+            self.estimate_worker.stop()
+            self.estimate_thread.quit()
+            self.estimate_thread.wait()
+            self.estimate_worker.deleteLater()
+            self.estimate_thread.deleteLater()
+            self.estimate_thread = None
+            self.estimate_worker = None
+
+    def closeEvent(self, event):
+        self.stop_folder_watcher()
+        self.stop_size_estimates()
+        self.log_console.close()
+        self.search_thread.quit()
+        self.search_thread.wait()
+        db_manager.close_connections()
+        super().closeEvent(event)
+
+    def apply_rom_changes(self, rows, removed_paths):
+        """Apply small upserts/deletes (already committed to roms.db by the watcher or a queue item) to the visible tables."""
+        self.model_uncompressed.apply_changes(rows, removed_paths)
+        self.model_compressed.apply_changes(rows, removed_paths)
+        self.update_summary_labels()
+        if rows:
+            self.start_size_estimates()
 
     def apply_table_search(self):
-        search_text = self.search_edit.text().lower()
-        filters = [f.strip() for f in search_text.split(',') if f.strip()]
-        
-        # Aplica o filtro para cada tabela e conta os itens visíveis
-        total_uncompressed_visible = 0
-        total_uncompressed_size_visible = 0
-        total_compressed_visible = 0
-        total_compressed_size_visible = 0
-        
-        # Tabela de ROMs não comprimidas
-        for row in range(self.table_uncompressed.rowCount()):
-            match = True if filters else True  # Se não há filtros, tudo deve corresponder
-            for f in filters:
-                found = False
-                for col in range(1, self.table_uncompressed.columnCount()):
-                    item = self.table_uncompressed.item(row, col)
-                    if item and f in item.text().lower():
-                        found = True
-                        break
-                if not found:
-                    match = False
-                    break
-            
-            # Oculta a linha se não corresponder ao filtro
-            self.table_uncompressed.setRowHidden(row, not match)
-            
-            # Se a linha for visível (não oculta), adiciona ao total
-            if not self.table_uncompressed.isRowHidden(row):
-                total_uncompressed_visible += 1
-                # Tenta obter o tamanho do arquivo se disponível
-                path_item = self.table_uncompressed.item(row, 3)  # Coluna do caminho
-                if path_item and os.path.exists(path_item.text()):
-                    try:
-                        total_uncompressed_size_visible += os.path.getsize(path_item.text())
-                    except (OSError, IOError):
-                        pass  # Ignora erros ao obter o tamanho do arquivo
-        
-        # Tabela de ROMs comprimidas
-        for row in range(self.table_compressed.rowCount()):
-            match = True if filters else True  # Se não há filtros, tudo deve corresponder
-            for f in filters:
-                found = False
-                for col in range(1, self.table_compressed.columnCount()):
-                    item = self.table_compressed.item(row, col)
-                    if item and f in item.text().lower():
-                        found = True
-                        break
-                if not found:
-                    match = False
-                    break
-            
-            # Oculta a linha se não corresponder ao filtro
-            self.table_compressed.setRowHidden(row, not match)
-            
-            # Se a linha for visível (não oculta), adiciona ao total
-            if not self.table_compressed.isRowHidden(row):
-                total_compressed_visible += 1
-                # Tenta obter o tamanho do arquivo se disponível
-                path_item = self.table_compressed.item(row, 3)  # Coluna do caminho
-                if path_item and os.path.exists(path_item.text()):
-                    try:
-                        total_compressed_size_visible += os.path.getsize(path_item.text())
-                    except (OSError, IOError):
-                        pass  # Ignora erros ao obter o tamanho do arquivo
-        
-        # Atualiza os rótulos de resumo com os novos totais
-        if filters:
-            # Se há filtros, mostra contagem dos itens visíveis
-            self.uncompressed_label.setText(f"Uncompressed ROMs: {total_uncompressed_visible} | Total size: {utils.get_human_size(total_uncompressed_size_visible)}")
-            self.compressed_label.setText(f"Compressed ROMs: {total_compressed_visible} | Total size: {utils.get_human_size(total_compressed_size_visible)}")
-        else:
-            # Se não há filtros, restaura a contagem original
-            if hasattr(self, 'total_uncompressed_all'):
-                self.uncompressed_label.setText(f"Uncompressed ROMs: {self.total_uncompressed_all} | Total size: {utils.get_human_size(self.total_uncompressed_size_all)}")
-            if hasattr(self, 'total_compressed_all'):
-                self.compressed_label.setText(f"Compressed ROMs: {self.total_compressed_all} | Total size: {utils.get_human_size(self.total_compressed_size_all)}")
-
-    def update_table_row_for_path(self, file_path):
-        # Atualiza apenas a linha correspondente ao arquivo processado
-        need_update_totals = False
-        for table in [self.table_uncompressed, self.table_compressed]:
-            for row in range(table.rowCount()):
-                item = table.item(row, 3)  # Coluna de path
-                if item and item.text() == file_path:
-                    # Exemplo: se o arquivo foi deletado, marca como (missing)
-                    if not os.path.exists(file_path):
-                        size_item = table.item(row, 4)
-                        if size_item:
-                            size_item.setText("(missing)")
-                        need_update_totals = True
-                    else:
-                        size_item = table.item(row, 4)
-                        if size_item:
-                            size_item.setText(utils.get_human_size(os.path.getsize(file_path)))
-                        need_update_totals = True
-                    break
-        
-        # Se houve alteração de tamanho, recalcula os totais
-        if need_update_totals:
-            # Se houver filtro ativo, recalcula com o filtro
-            if self.search_edit.text().strip():
-                self.apply_table_search()
-            else:
-                self._recalculate_totals()
+        # The FTS index in roms.db does the matching, on the search thread; see apply_search_results
+        self.search_timer.stop()
+        pages = [self.model_uncompressed.page_request(), self.model_compressed.page_request()]
+        self.search_worker.request(self.search_terms(), pages)
+
+    def apply_search_results(self, generation, terms, pages, totals):
+        if generation != self.search_worker.latest:
+            return
+        if not self.search_applied:
+            self.profile.mark("first page query (search thread)")
+        self.search_applied = generation
+        self.model_uncompressed.load_page(terms, pages[0])
+        self.model_compressed.load_page(terms, pages[1])
+        self.update_summary_labels(totals)
+        if not self.profile.reported:
+            self.profile.mark("first page into the tables")
+            self.profile.report()
+
+    def update_job_progress(self, event):
+        """Show a core.job_progress event: the item's bar in the queue table and the whole-queue bar."""
+        from PySide6.QtWidgets import QProgressBar
+        from core.job_progress import format_eta
+        self.queue_progress_bar.setValue(round(event['queue_percent'] * 10))
+        self.queue_progress_bar.setFormat(
+            f"Queue {event['queue_percent']:.1f}% | {utils.get_human_size(int(event['queue_rate']))}/s"
+            f" | ETA {format_eta(event['queue_eta'])}"
+        )
+        if event.get('finished'):
+            return
+        bar = self.queue_bars.get(event['rom_id'])
+        if bar is None:
+            item = self.queue_items.get(event['rom_id'])
+            if item is None:
+                return
+            bar = self.queue_bars[event['rom_id']] = QProgressBar()
+            bar.setRange(0, 1000)
+            self.queue_table.setCellWidget(self.queue_table.row(item), 2, bar)
+        bar.setValue(round(event['percent'] * 10))
+        text = f"{event['percent']:.1f}%"
+        if event['ratio'] is not None:
+            text += f" | ratio {event['ratio']:.0%}"
+        bar.setFormat(f"{text} | {utils.get_human_size(int(event['rate']))}/s | ETA {format_eta(event['eta'])}")
+        bar.setToolTip(
+            f"{event['stage'] or 'Processing'}: {utils.get_human_size(event['bytes_in'])} read"
+            + (f", {utils.get_human_size(event['bytes_out'])} written" if event['bytes_out'] is not None else "")
+        )
+
+    def queue_item_processed(self, file_path):
+        # Done: untick it, which also takes it off the queue view
+        rom_id = db_manager.get_rom_ids([file_path]).get(file_path)
+        if rom_id is not None:
+            self.model_uncompressed.check_ids([rom_id], False)
+            self.model_compressed.check_ids([rom_id], False)
 
 if __name__ == "__main__":
-    app = QApplication([])
-    window = RomCompressionGUI()
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="ROM Compression Center")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print how long each startup phase took, up to the first page of ROMs.")
+    args, qt_args = parser.parse_known_args()
+    profile = StartupProfile(args.profile_startup, _STARTED)
+    profile.mark("imports")
+    app = QApplication(sys.argv[:1] + qt_args)
+    profile.mark("QApplication")
+    window = RomCompressionGUI(profile)
     window.show()
+    profile.mark("show")
     app.exec()
@@ -0,0 +1,101 @@
+import struct
+
+import pytest
+
+from core import detector
+
+ISO_SECTOR = detector.ISO_SECTOR
+ROOT_LBA = 18
+SYSTEM_CNF_LBA = 19
+
+PS1_SYSTEM_CNF = b"BOOT = cdrom:\\SLUS_000.01;1\r\nTCB = 4\r\nEVENT = 10\r\n"
+PS2_SYSTEM_CNF = b"BOOT2 = cdrom0:\\SLUS_200.02;1\r\nVER = 1.00\r\nVMODE = NTSC\r\n"
+
+
+def _record(name, extent, size):
+    """One ISO9660 directory record."""
+    length = 33 + len(name) + (len(name) + 1) % 2
+    record = bytearray(length)
+    record[0] = length
+    struct.pack_into("<I", record, 2, extent)
+    struct.pack_into(">I", record, 6, extent)
+    struct.pack_into("<I", record, 10, size)
+    struct.pack_into(">I", record, 14, size)
+    record[32] = len(name)
+    record[33:33 + len(name)] = name
+    return bytes(record)
+
+
+def _sector(data=b""):
+    return data.ljust(ISO_SECTOR, b"\0")
+
+
+def _iso_sectors(system_cnf=None, first_sector=b""):
+    """User data of a small disc: PVD at LBA 16, root directory at 18, SYSTEM.CNF at 19."""
+    pvd = bytearray(_sector(b"\x01CD001\x01"))
+    pvd[156:156 + 34] = _record(b"\0", ROOT_LBA, ISO_SECTOR)
+    root = _record(b"\0", ROOT_LBA, ISO_SECTOR) + _record(b"\1", ROOT_LBA, ISO_SECTOR)
+    if system_cnf is not None:
+        root += _record(b"SYSTEM.CNF;1", SYSTEM_CNF_LBA, len(system_cnf))
+    sectors = [_sector(first_sector)] + [_sector()] * 15 + [bytes(pvd), _sector(), _sector(root)]
+    return sectors + [_sector(system_cnf or b"")]
+
+
+def _raw(sectors, mode):
+    """The same sectors as a raw 2352 bytes/sector image (sync, address, mode, subheader)."""
+    raw = []
+    for sector in sectors:
+        header = detector.CD_SYNC + b"\0\x02\0" + bytes([mode])
+        if mode == 2:
+            header += b"\0" * 8
+        raw.append((header + sector).ljust(detector.RAW_SECTOR, b"\0"))
+    return b"".join(raw)
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("version, expected", [(5, "chd"), (4, "chd_v4")])
+def test_chd_header(tmp_path, version, expected):
+    header = b"MComprHD" + struct.pack(">II", 124, version) + b"\0" * 108
+    assert detector.sniff_file(_write(tmp_path, "Game.chd", header)) == (expected, None)
+
+
+@pytest.mark.parametrize("name, expected", [("Game.nsp", "nsp"), ("Game.nsz", "nsz")])
+def test_pfs0_magic(tmp_path, name, expected):
+    data = b"PFS0" + b"\0" * 0x200
+    assert detector.sniff_file(_write(tmp_path, name, data)) == (expected, "Nintendo Switch")
+
+
+@pytest.mark.parametrize("name, expected", [("Game.xci", "xci"), ("Game.xcz", "xcz")])
+def test_xci_head_magic(tmp_path, name, expected):
+    data = b"\0" * 0x100 + b"HEAD" + b"\0" * 0x100
+    assert detector.sniff_file(_write(tmp_path, name, data)) == (expected, "Nintendo Switch")
+
+
+@pytest.mark.parametrize("system_cnf, expected", [
+    (PS1_SYSTEM_CNF, "Sony Playstation"),
+    (PS2_SYSTEM_CNF, "Sony Playstation 2"),
+    (None, None),
+])
+def test_iso_system_cnf(tmp_path, system_cnf, expected):
+    data = b"".join(_iso_sectors(system_cnf))
+    assert detector.sniff_file(_write(tmp_path, "Game.iso", data)) == ("iso", expected)
+
+
+def test_raw_mode2_system_cnf(tmp_path):
+    data = _raw(_iso_sectors(PS1_SYSTEM_CNF), mode=2)
+    assert detector.sniff_file(_write(tmp_path, "Game.bin", data)) == ("bin", "Sony Playstation")
+
+
+def test_raw_mode1_boot_sector(tmp_path):
+    data = _raw(_iso_sectors(first_sector=b"SEGA SEGASATURN SEGA ENTERPRISES"), mode=1)
+    assert detector.sniff_file(_write(tmp_path, "Game.bin", data)) == ("bin", "Sega Saturn")
+
+
+@pytest.mark.parametrize("data", [b"", b"not a disc image" * 200])
+def test_unknown_content(tmp_path, data):
+    assert detector.sniff_file(_write(tmp_path, "Game.iso", data)) == (None, None)
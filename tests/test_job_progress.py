@@ -0,0 +1,36 @@
+import pytest
+
+from core.job_progress import parse_progress
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("Compressing, 42.3% complete... (ratio=51.2%)",
+     {'stage': "Compressing", 'percent': 42.3, 'ratio': 0.512}),
+    ("\rCompressing, 100.0% complete... (ratio=38.0%)",
+     {'stage': "Compressing", 'percent': 100.0, 'ratio': 0.38}),
+    ("Extracting, 10.0% complete...", {'stage': "Extracting", 'percent': 10.0}),
+])
+def test_chdman_lines(line, expected):
+    assert parse_progress(line) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("line, expected", [
+    (" 45%|####5     | 1.21G/2.68G [00:12<00:14, 101MB/s]",
+     {'percent': 45.0, 'bytes_in': round(1.21 * (1 << 30)), 'bytes_total': round(2.68 * (1 << 30))}),
+    ("100%|##########| 512M/512M [00:05<00:00, 99.8MB/s]",
+     {'percent': 100.0, 'bytes_in': 512 << 20, 'bytes_total': 512 << 20}),
+    ("  3%|3         | 800k/26.4M [00:00<00:03, 7.1MiB/s]",
+     {'percent': 3.0, 'bytes_in': 800 << 10, 'bytes_total': round(26.4 * (1 << 20))}),
+])
+def test_tqdm_lines(line, expected):
+    assert parse_progress(line) == expected
+
+
+@pytest.mark.parametrize("line", [
+    "",
+    "chdman - MAME Compressed Hunks of Data (CHD) manager 0.262",
+    "Input file:   Game.cue",
+    "Compression complete ... final ratio = 51.2%",
+])
+def test_other_lines(line):
+    assert parse_progress(line) is None
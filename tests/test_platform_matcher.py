@@ -0,0 +1,80 @@
+import os
+import random
+
+import pytest
+
+from core import utils
+from tests import legacy_platform
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "platform_paths.txt")
+
+
+def _load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
+
+
+def _random_paths(count, seed=5):
+    """Paths assembled from platform names, their variants, aliases and look-alikes."""
+    words = []
+    for platform in utils._load_platforms():
+        lower = platform.lower()
+        words += [platform, lower.replace(" ", ""), lower.replace(" ", "-"), lower.replace(" ", "_"), platform.upper()]
+    for aliases in utils.PLATFORM_ALIASES.values():
+        words += aliases
+    words += ["xbox 360", "X360", "games", "ROMs", "ps2_games", "games_ps2", "psp", "dcx", "nx_", "_gba",
+              "Wii U", "Xbox One", "snes9x", "my ps1 stuff", "gamecube-iso", ""]
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        parts = [rng.choice(words) + rng.choice(["", " (USA)", "_x", "1"]) for _ in range(rng.randint(1, 4))]
+        name = rng.choice(words) + rng.choice(["", "_", " "]) + rng.choice(["game", "Game (Europe)", ""])
+        name += rng.choice([".iso", ".chd", ".nsp", ""])
+        sep = rng.choice(["/", "\\"])
+        paths.append(rng.choice(["R:/ROMs", "/mnt/roms", "C:\\r"]) + sep + sep.join(parts) + sep + name)
+    return paths
+
+
+@pytest.fixture
+def matcher():
+    # A fresh matcher: the memoized one may have cached directories from other tests
+    return utils.PlatformMatcher(utils._load_platforms())
+
+
+def test_corpus_matches_recorded_platforms(matcher):
+    corpus = _load_corpus()
+    assert len(corpus) > 4000
+    mismatches = [(path, expected, matcher.match(path)) for path, expected in corpus if matcher.match(path) != expected]
+    assert mismatches == []
+
+
+def test_corpus_agrees_with_legacy_function(matcher):
+    platforms = utils._load_platforms()
+    mismatches = []
+    for path, _expected in _load_corpus():
+        old = legacy_platform.get_platform_from_path(path, platforms)
+        if matcher.match(path) != old:
+            mismatches.append((path, old, matcher.match(path)))
+    assert mismatches == []
+
+
+def test_random_paths_agree_with_legacy_function(matcher):
+    platforms = utils._load_platforms()
+    mismatches = []
+    for path in _random_paths(20000):
+        old = legacy_platform.get_platform_from_path(path, platforms)
+        if matcher.match(path) != old:
+            mismatches.append((path, old, matcher.match(path)))
+    assert mismatches == []
+
+
+def test_memoized_directory_does_not_leak_into_file_names(matcher):
+    # Same folder, the file name alone decides
+    assert matcher.match("/roms/unsorted/Halo (Xbox 360).iso") == "Microsoft Xbox 360"
+    assert matcher.match("/roms/unsorted/Okami (PS2).iso") == "Sony Playstation 2"
+    assert matcher.match("/roms/unsorted/Okami.iso") == "Unknown"
+
+
+def test_get_platform_from_path_uses_shared_matcher():
+    assert utils.get_platform_from_path("R:/ROMs\\Sony Playstation 2\\Okami (USA).chd") == "Sony Playstation 2"
+    assert utils.get_platform_matcher() is utils.get_platform_matcher()
@@ -0,0 +1,207 @@
+import ctypes
+import errno
+import os
+import time
+
+import pytest
+
+from core import db_manager, watcher
+
+SETTINGS = {
+    "ignored": [],
+    "ignore_textures": True,
+    "ignore_system_files": True,
+    "system_exts": [".ini"],
+    "workers": 2,
+}
+BACKENDS = ["inotify", "polling"]
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, "DB_PATH", str(tmp_path / "roms.db"))
+    db_manager.init_db()
+    root = tmp_path / "roms"
+    (root / "Nintendo Switch").mkdir(parents=True)
+    yield str(root)
+    db_manager.close_connections()
+
+
+@pytest.fixture(params=BACKENDS)
+def watch(request, library):
+    use_inotify = request.param == "inotify"
+    if use_inotify and watcher._load_libc() is None:
+        pytest.skip("inotify is only available on Linux")
+    changes = []
+    folder_watcher = watcher.RomFolderWatcher(
+        library, lambda rows, removed: changes.append((rows, removed)), settings=SETTINGS,
+        debounce=0.05, poll_interval=0.1, use_inotify=use_inotify,
+    )
+    folder_watcher.start()
+    assert folder_watcher.backend == request.param
+    yield folder_watcher, changes
+    folder_watcher.stop()
+
+
+def _stored(folder):
+    return sorted(os.path.relpath(path, folder) for path in db_manager.get_paths_under(folder))
+
+
+def _wait_for(folder, expected, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _stored(folder) == expected:
+            return True
+        time.sleep(0.05)
+    return _stored(folder) == expected
+
+
+def test_create(watch, library):
+    _folder_watcher, changes = watch
+    with open(os.path.join(library, "Nintendo Switch", "New Game.nsp"), "wb") as f:
+        f.write(b"x" * 100)
+    assert _wait_for(library, [os.path.join("Nintendo Switch", "New Game.nsp")])
+    rows = [row for rows, _removed in changes for row in rows]
+    assert rows[-1]["platform"] == "Nintendo Switch"
+    assert rows[-1]["size_bytes"] == 100
+
+
+def test_rename(watch, library):
+    _folder_watcher, changes = watch
+    old = os.path.join(library, "Nintendo Switch", "Game.nsp")
+    with open(old, "wb") as f:
+        f.write(b"x")
+    assert _wait_for(library, [os.path.join("Nintendo Switch", "Game.nsp")])
+    os.rename(old, os.path.join(library, "Nintendo Switch", "Game (USA).nsp"))
+    assert _wait_for(library, [os.path.join("Nintendo Switch", "Game (USA).nsp")])
+    assert any(old in removed for _rows, removed in changes)
+
+
+def test_delete(watch, library):
+    path = os.path.join(library, "Nintendo Switch", "Game.nsp")
+    with open(path, "wb") as f:
+        f.write(b"x")
+    assert _wait_for(library, [os.path.join("Nintendo Switch", "Game.nsp")])
+    os.remove(path)
+    assert _wait_for(library, [])
+
+
+def test_folder_moved_in_and_out(watch, library, tmp_path):
+    outside = tmp_path / "incoming"
+    outside.mkdir()
+    (outside / "Halo.iso").write_bytes(b"iso")
+    (outside / "notes.ini").write_bytes(b"ignored")
+    os.rename(str(outside), os.path.join(library, "Microsoft Xbox"))
+    assert _wait_for(library, [os.path.join("Microsoft Xbox", "Halo.iso")])
+    os.rename(os.path.join(library, "Microsoft Xbox"), str(outside))
+    assert _wait_for(library, [])
+
+
+class _NoWatchesLibc:
+    """libc whose inotify_add_watch fails for folders named `refuse`, like past max_user_watches."""
+
+    def __init__(self, libc, refuse):
+        self._libc = libc
+        self._refuse = os.fsencode(refuse)
+        self.inotify_init1 = libc.inotify_init1
+        self.inotify_rm_watch = libc.inotify_rm_watch
+
+    def inotify_add_watch(self, fd, path, mask):
+        if os.path.basename(path) == self._refuse:
+            ctypes.set_errno(errno.ENOSPC)
+            return -1
+        return self._libc.inotify_add_watch(fd, path, mask)
+
+
+def test_unwatchable_folder_is_polled(library):
+    libc = watcher._load_libc()
+    if libc is None:
+        pytest.skip("inotify is only available on Linux")
+    messages = []
+    folder_watcher = watcher.RomFolderWatcher(
+        library, lambda rows, removed: None, settings=SETTINGS,
+        debounce=0.05, poll_interval=0.1, on_message=messages.append,
+    )
+    folder_watcher._libc = _NoWatchesLibc(libc, "Nintendo Switch")
+    folder_watcher.start()
+    try:
+        assert len(messages) == 1 and "Nintendo Switch" in messages[0]
+        with open(os.path.join(library, "Nintendo Switch", "Game.nsp"), "wb") as f:
+            f.write(b"x")
+        assert _wait_for(library, [os.path.join("Nintendo Switch", "Game.nsp")])
+    finally:
+        folder_watcher.stop()
+
+
+def test_folder_moved_out_is_no_longer_watched(library, tmp_path):
+    if watcher._load_libc() is None:
+        pytest.skip("inotify is only available on Linux")
+    folder_watcher = watcher.RomFolderWatcher(
+        library, lambda rows, removed: None, settings=SETTINGS, debounce=0.05,
+    )
+    folder_watcher.start()
+    try:
+        inside = os.path.join(library, "Microsoft Xbox")
+        os.makedirs(os.path.join(inside, "Halo"))
+        with open(os.path.join(inside, "Halo", "Halo.iso"), "wb") as f:
+            f.write(b"iso")
+        assert _wait_for(library, [os.path.join("Microsoft Xbox", "Halo", "Halo.iso")])
+        outside = str(tmp_path / "Microsoft Xbox")
+        os.rename(inside, outside)
+        assert _wait_for(library, [])
+        with open(os.path.join(outside, "Halo", "Halo 2.iso"), "wb") as f:
+            f.write(b"iso")
+        time.sleep(0.3)
+        assert _stored(library) == []
+        assert not [path for path in folder_watcher._watches.values() if path.startswith(inside)]
+    finally:
+        folder_watcher.stop()
+
+
+def test_growing_file_is_applied_once_settled(library):
+    # Polling only: the directory mtime moves when the file appears, not while it is written
+    changes = []
+    folder_watcher = watcher.RomFolderWatcher(
+        library, lambda rows, removed: changes.append((rows, removed)), settings=SETTINGS,
+        debounce=0.05, poll_interval=0.2, use_inotify=False,
+    )
+    folder_watcher.start()
+    try:
+        path = os.path.join(library, "Nintendo Switch", "Big.nsp")
+        with open(path, "wb") as f:
+            for _ in range(5):
+                f.write(b"x" * 1000)
+                f.flush()
+                time.sleep(0.1)
+        assert _wait_for(library, [os.path.join("Nintendo Switch", "Big.nsp")])
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            sizes = [row["size_bytes"] for rows, _removed in changes for row in rows]
+            if sizes and sizes[-1] == 5000:
+                break
+            time.sleep(0.05)
+        assert sizes[-1] == 5000
+    finally:
+        folder_watcher.stop()
+
+
+def test_resync_catches_rewrite_in_place(library):
+    folder_watcher = watcher.RomFolderWatcher(
+        library, lambda rows, removed: None, settings=SETTINGS,
+        debounce=0.05, poll_interval=0.1, resync_interval=0.5, use_inotify=False,
+    )
+    folder_watcher.start()
+    try:
+        path = os.path.join(library, "Nintendo Switch", "Game.nsp")
+        with open(path, "wb") as f:
+            f.write(b"x")
+        assert _wait_for(library, [os.path.join("Nintendo Switch", "Game.nsp")])
+        time.sleep(0.5)  # no longer settling: only the resync looks at it again
+        with open(path, "r+b") as f:
+            f.write(b"yyyy")
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and db_manager.lookup_roms([path])[path][0][0] != 4:
+            time.sleep(0.05)
+        assert db_manager.lookup_roms([path])[path][0][0] == 4
+    finally:
+        folder_watcher.stop()
@@ -0,0 +1,94 @@
+# Debug log console for ROM Compression Center
+import re
+from collections import deque
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtGui import QTextCursor
+
+# Lines are pushed to the widget at most this often
+LOG_FLUSH_MS = 100
+# The widget keeps only the newest lines; the session file has all of them
+LOG_MAX_LINES = 5000
+
+_PERCENT = re.compile(r"\d+(?:[.,]\d+)?\s*%")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def progress_key(line):
+    """
+    Key shared by successive updates of the same progress line
+    ("Compressing, 12.5% complete..." -> "Compressing, #% complete..."), or None
+    for ordinary lines.
+    """
+    if not _PERCENT.search(line):
+        return None
+    return _NUMBER.sub("#", line)
+
+
+class LogConsole(QObject):
+    """
+    Feeds a QPlainTextEdit from status_update without one repaint per line.
+    append() only queues the line (and hands it to the session file writer);
+    a timer moves the queued lines into the widget in one go, with runs of the
+    same progress line collapsed into its latest value. The widget is capped
+    at max_lines blocks, dropping the oldest ones.
+    """
+
+    def __init__(self, widget, writer=None, status_label=None, max_lines=LOG_MAX_LINES,
+                 interval=LOG_FLUSH_MS, parent=None):
+        super().__init__(parent)
+        self.widget = widget
+        self.writer = writer
+        self.status_label = status_label
+        self.widget.setMaximumBlockCount(max_lines)
+        self._pending = deque()
+        # Progress key of the last line in the widget, so the next update can overwrite it
+        self._last_key = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def append(self, text):
+        lines = text.splitlines() or [""]
+        self._pending.extend(lines)
+        if self.writer:
+            self.writer.write(lines)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        if not self._pending:
+            return
+        lines = list(self._pending)
+        self._pending.clear()
+        if self.status_label is not None:
+            self.status_label.setText(lines[-1])
+        # Collapse runs of the same progress line into their last value
+        collapsed = []
+        keys = []
+        for line in lines:
+            key = progress_key(line)
+            if key is not None and keys and keys[-1] == key:
+                collapsed[-1] = line
+            else:
+                collapsed.append(line)
+                keys.append(key)
+        if keys[0] is not None and keys[0] == self._last_key and not self.widget.document().isEmpty():
+            self._replace_last_line(collapsed.pop(0))
+        if collapsed:
+            self.widget.appendPlainText("\n".join(collapsed))
+        self._last_key = keys[-1]
+
+    def close(self):
+        """Flush the queued lines and close the session file."""
+        self._timer.stop()
+        self.flush()
+        if self.writer:
+            self.writer.close()
+
+    def _replace_last_line(self, line):
+        cursor = QTextCursor(self.widget.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.KeepAnchor)
+        cursor.insertText(line)
@@ -0,0 +1,367 @@
+# Model/view table of ROMs for ROM Compression Center
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+
+from core import db_manager
+from core.utils import get_human_size
+
+COLUMNS = ["Select", "File Name", "Platform", "Path", "Size"]
+# Sort key (db_manager.ROM_SORT_KEYS) of each column; "Select" keeps roms.db order
+SORT_KEYS = ["id", "file_name", "platform", "path", "size_bytes"]
+# Rows read from roms.db each time the view scrolls near the bottom
+FETCH_SIZE = 1000
+
+# Fields of a row tuple
+ROW_ID, ROW_NAME, ROW_PLATFORM, ROW_PATH, ROW_SIZE = range(5)
+# Row field each sort key reads, and the COALESCE default roms.db sorts NULLs as
+SORT_FIELDS = {
+    "id": (ROW_ID, 0),
+    "file_name": (ROW_NAME, ""),
+    "platform": (ROW_PLATFORM, ""),
+    "path": (ROW_PATH, ""),
+    "size_bytes": (ROW_SIZE, 0),
+}
+# COLLATE NOCASE only folds ASCII letters
+NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# data() runs for every painted/measured cell: compare roles as plain ints, Qt enum comparisons are slow
+DISPLAY_ROLE = Qt.DisplayRole.value
+TOOLTIP_ROLE = Qt.ToolTipRole.value
+CHECK_STATE_ROLE = Qt.CheckStateRole.value
+USER_ROLE = Qt.UserRole.value
+
+
+class RomTableModel(QAbstractTableModel):
+    """
+    ROMs of one table (compressed or not) read page by page from roms.db.
+    Rows are plain (id, file_name, platform, path, size_bytes) tuples; the
+    checkbox column uses the check-state role and checked ROMs are kept by id,
+    so they survive searches, sorting and reloads. checked_changed reports only
+    what changed: rows newly checked and ids unchecked. The uncompressed table
+    also shows the predicted compressed size next to the size, when known.
+    """
+    checked_changed = Signal(list, list)
+
+    def __init__(self, compressed, parent=None):
+        super().__init__(parent)
+        self.compressed = compressed
+        self.terms = []
+        self.order_by = "id"
+        self.descending = False
+        self._rows = []
+        # roms.id -> row number and path -> roms.id of the loaded rows
+        self._index = {}
+        self._paths = {}
+        self._checked = {}
+        # roms.id -> (estimate, low, high) predicted compressed size of the loaded rows (uncompressed table only)
+        self._estimates = {}
+        self._after = None
+        # Nothing is read until reload() or load_page(): attaching a view must not query roms.db
+        self._exhausted = True
+
+    # Qt model interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if index.column() == 0:
+            return Qt.ItemIsEnabled | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == DISPLAY_ROLE or role == TOOLTIP_ROLE:
+            if column == 4:
+                return self._size_text(row, role == TOOLTIP_ROLE)
+            return row[column] if column else None
+        if role == CHECK_STATE_ROLE and column == 0:
+            return Qt.Checked if row[ROW_ID] in self._checked else Qt.Unchecked
+        if role == USER_ROLE:
+            return row[ROW_ID]
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != CHECK_STATE_ROLE or index.column() != 0:
+            return False
+        row = self._rows[index.row()]
+        if Qt.CheckState(value) == Qt.Checked:
+            self._set_checked([row[ROW_ID]], [])
+        else:
+            self._set_checked([], [row[ROW_ID]])
+        return True
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        page = db_manager.fetch_rom_page(self.compressed, self.terms, self.order_by, self.descending,
+                                         self._after, FETCH_SIZE)
+        if len(page) < FETCH_SIZE:
+            self._exhausted = True
+        if page:
+            self._after = (page[-1][0], page[-1][1][ROW_ID])
+        # Rows streamed in by a scan may already be here
+        rows = [row for _key, row in page if row[ROW_ID] not in self._index]
+        if rows:
+            self._append(rows)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.order_by = SORT_KEYS[column]
+        self.descending = order == Qt.DescendingOrder and column != 0
+        self.reload()
+
+    # ROM table API
+
+    def reload(self):
+        """Drop the loaded rows and start reading roms.db again from the first page."""
+        page = db_manager.fetch_rom_page(self.compressed, self.terms, self.order_by, self.descending, None, FETCH_SIZE)
+        self.load_page(self.terms, page)
+
+    def page_request(self):
+        """(compressed, order_by, descending, limit) of the first page, for queries run elsewhere (SearchWorker)."""
+        return (self.compressed, self.order_by, self.descending, FETCH_SIZE)
+
+    def load_page(self, terms, page):
+        """Replace the rows with a first page from db_manager.fetch_rom_page, in a single model reset."""
+        self.beginResetModel()
+        self.terms = list(terms)
+        self._rows = [row for _key, row in page]
+        self._index = {row[ROW_ID]: position for position, row in enumerate(self._rows)}
+        self._paths = {row[ROW_PATH]: row[ROW_ID] for row in self._rows}
+        self._estimates = {} if self.compressed else db_manager.get_estimates(self._index)
+        self._after = (page[-1][0], page[-1][1][ROW_ID]) if page else None
+        self._exhausted = len(page) < FETCH_SIZE
+        self.endResetModel()
+        # Forget ticked ROMs that left roms.db in the meantime
+        known = db_manager.lookup_roms(row[ROW_PATH] for row in self._checked.values())
+        stale = [rom_id for rom_id, row in self._checked.items() if row[ROW_PATH] not in known]
+        if stale:
+            self._set_checked([], stale)
+
+    # Bulk selection: each call changes the check state in one pass and emits checked_changed once.
+    # "Visible" means every ROM matching the current search terms, fetched or not.
+
+    def check_ids(self, ids, checked=True):
+        if checked:
+            self._set_checked(ids, [])
+        else:
+            self._set_checked([], ids)
+
+    def check_all(self, checked=True):
+        self.check_ids(db_manager.select_rom_ids(self.compressed, self.terms), checked)
+
+    def check_platform(self, platform, checked=True):
+        self.check_ids(db_manager.select_rom_ids(self.compressed, self.terms, platform=platform), checked)
+
+    def check_savings(self, min_savings):
+        """Check the visible ROMs expected to save at least min_savings bytes once compressed."""
+        self.check_ids(db_manager.select_rom_ids(self.compressed, self.terms, min_savings=min_savings))
+
+    def invert_checked(self):
+        visible = db_manager.select_rom_ids(self.compressed, self.terms)
+        self._set_checked([rom_id for rom_id in visible if rom_id not in self._checked],
+                          [rom_id for rom_id in visible if rom_id in self._checked])
+
+    def set_estimates(self, estimates):
+        """Show predicted compressed sizes ({roms.id: (estimate, low, high)}) next to the loaded rows they belong to."""
+        if self.compressed:
+            return
+        positions = []
+        for rom_id, estimate in estimates.items():
+            position = self._index.get(rom_id)
+            if position is not None:
+                self._estimates[rom_id] = tuple(estimate)
+                positions.append(position)
+        if positions:
+            self.dataChanged.emit(self.index(min(positions), 4), self.index(max(positions), 4))
+
+    def apply_changes(self, rows, removed_paths=()):
+        """
+        Apply rows upserted in roms.db (dicts shaped like db_manager.get_all_roms)
+        and removed paths: rows are updated in place, moved out when their
+        compressed state no longer matches this table, or inserted in sort order
+        when new and inside the loaded rows; the others come with fetchMore.
+        """
+        removed = set(removed_paths)
+        new_rows = []
+        unchecked = []
+        for d in rows:
+            rom_id = d['id']
+            position = self._index.get(rom_id)
+            if bool(d['compressed']) != self.compressed:
+                if position is not None:
+                    removed.add(self._rows[position][ROW_PATH])
+                if rom_id in self._checked:
+                    unchecked.append(rom_id)
+                continue
+            row = (rom_id, d['file_name'], d['platform'], d['path'], d['size_bytes'])
+            if position is None:
+                new_rows.append(row)
+            elif self._rows[position] != row:
+                self._replace(position, row)
+        if removed:
+            unchecked.extend(rom_id for rom_id, row in self._checked.items() if row[ROW_PATH] in removed)
+            self._remove_paths(removed)
+        if unchecked:
+            self._set_checked([], unchecked)
+        if new_rows and self.terms:
+            matching = db_manager.search_rom_ids(self.terms, [row[ROW_ID] for row in new_rows])
+            new_rows = [row for row in new_rows if row[ROW_ID] in matching]
+        if new_rows:
+            self._insert_sorted(new_rows)
+
+    # internals
+
+    def _sort_value(self, row):
+        """The value roms.db sorts row by (db_manager.ROM_SORT_KEYS), as fetch_rom_page returns it."""
+        field, default = SORT_FIELDS[self.order_by]
+        value = row[field]
+        return default if value is None else value
+
+    def _sort_key(self, value, rom_id):
+        if isinstance(value, str):
+            value = value.translate(NOCASE)
+        return (value, rom_id)
+
+    def _row_key(self, row):
+        return self._sort_key(self._sort_value(row), row[ROW_ID])
+
+    def _in_window(self, key):
+        """Whether a row with this sort key belongs among the loaded rows rather than a later page."""
+        if self._exhausted:
+            return True
+        last = self._sort_key(*self._after)
+        return key >= last if self.descending else key <= last
+
+    def _insert_sorted(self, rows):
+        """
+        Insert new rows where the current sort puts them, leaving out those after
+        the last loaded row: the next fetchMore reads them. Rows past the first
+        page that this pushes out at the bottom are dropped again, to be fetched.
+        """
+        rows = [row for row in rows if self._in_window(self._row_key(row))]
+        if not rows:
+            return
+        limit = max(len(self._rows), FETCH_SIZE)
+        first = len(self._rows)
+        for row in sorted(rows, key=self._row_key, reverse=self.descending):
+            position = self._position(self._row_key(row))
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._rows.insert(position, row)
+            self._paths[row[ROW_PATH]] = row[ROW_ID]
+            self.endInsertRows()
+            first = min(first, position)
+        for position in range(first, len(self._rows)):
+            self._index[self._rows[position][ROW_ID]] = position
+        if not self.compressed:
+            self._estimates.update(db_manager.get_estimates(row[ROW_ID] for row in rows))
+        if len(self._rows) > limit:
+            self._truncate(limit)
+
+    def _position(self, key):
+        """Row number a row with this sort key is inserted at (binary search over the loaded rows)."""
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = self._row_key(self._rows[middle])
+            if (middle_key > key) if self.descending else (middle_key < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _truncate(self, count):
+        """Drop the loaded rows after the first count; fetchMore reads them again from there."""
+        self.beginRemoveRows(QModelIndex(), count, len(self._rows) - 1)
+        for row in self._rows[count:]:
+            del self._index[row[ROW_ID]]
+            self._paths.pop(row[ROW_PATH], None)
+            self._estimates.pop(row[ROW_ID], None)
+        del self._rows[count:]
+        self.endRemoveRows()
+        last = self._rows[-1]
+        self._after = (self._sort_value(last), last[ROW_ID])
+        self._exhausted = False
+
+    def _size_text(self, row, detailed=False):
+        size_bytes = row[ROW_SIZE]
+        if size_bytes is None:
+            return "(missing)"
+        estimate = self._estimates.get(row[ROW_ID])
+        if estimate is None:
+            return get_human_size(size_bytes)
+        if detailed:
+            return (f"{get_human_size(size_bytes)}, about {get_human_size(estimate[0])} once compressed "
+                    f"({get_human_size(estimate[1])} to {get_human_size(estimate[2])})")
+        return f"{get_human_size(size_bytes)} → ~{get_human_size(estimate[0])}"
+
+    def _append(self, rows):
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for position, row in enumerate(rows, start=first):
+            self._index[row[ROW_ID]] = position
+            self._paths[row[ROW_PATH]] = row[ROW_ID]
+        self._rows.extend(rows)
+        if not self.compressed:
+            self._estimates.update(db_manager.get_estimates(row[ROW_ID] for row in rows))
+        self.endInsertRows()
+
+    def _replace(self, position, row):
+        if row[ROW_SIZE] != self._rows[position][ROW_SIZE]:
+            # The file changed: its estimate is for the old content
+            self._estimates.pop(row[ROW_ID], None)
+        self._rows[position] = row
+        if row[ROW_ID] in self._checked:
+            self._checked[row[ROW_ID]] = row
+        self.dataChanged.emit(self.index(position, 0), self.index(position, len(COLUMNS) - 1))
+
+    def _set_checked(self, add_ids, remove_ids):
+        """Check add_ids and uncheck remove_ids, then notify the view and checked_changed once."""
+        add_ids = [rom_id for rom_id in dict.fromkeys(add_ids) if rom_id not in self._checked]
+        remove_ids = [rom_id for rom_id in dict.fromkeys(remove_ids) if rom_id in self._checked]
+        if not add_ids and not remove_ids:
+            return
+        # Rows not fetched yet come from roms.db
+        missing = [rom_id for rom_id in add_ids if rom_id not in self._index]
+        fetched = db_manager.get_rom_rows(missing) if missing else {}
+        added = []
+        for rom_id in add_ids:
+            position = self._index.get(rom_id)
+            row = self._rows[position] if position is not None else fetched.get(rom_id)
+            if row is not None:
+                self._checked[rom_id] = row
+                added.append(row)
+        for rom_id in remove_ids:
+            del self._checked[rom_id]
+        positions = [self._index[rom_id] for rom_id in add_ids + remove_ids if rom_id in self._index]
+        if positions:
+            self.dataChanged.emit(self.index(min(positions), 0), self.index(max(positions), 0), [Qt.CheckStateRole])
+        self.checked_changed.emit(added, remove_ids)
+
+    def _remove_paths(self, paths):
+        ids = [self._paths.pop(path) for path in paths if path in self._paths]
+        for rom_id in ids:
+            self._estimates.pop(rom_id, None)
+        positions = sorted(self._index.pop(rom_id) for rom_id in ids)
+        # Back to front so the remaining positions stay valid
+        for position in reversed(positions):
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del self._rows[position]
+            self.endRemoveRows()
+        if positions:
+            # Only the rows after the first removed one moved up
+            for position in range(positions[0], len(self._rows)):
+                self._index[self._rows[position][ROW_ID]] = position
@@ -71,6 +71,11 @@ class SettingsDialog(QDialog):
         self.ignore_system_files_checkbox.setChecked(self.config.get("ignore_system_files", True))
         layout.addWidget(self.ignore_system_files_checkbox)
 
+        # Checkbox to keep the library in sync with the ROM folder while the app runs
+        self.watch_folder_checkbox = QCheckBox("Watch ROM folder for changes")
+        self.watch_folder_checkbox.setChecked(self.config.get("watch_folder", False))
+        layout.addWidget(self.watch_folder_checkbox)
+
         # Botões
         button_layout = QHBoxLayout()
         save_btn = QPushButton("Save")
@@ -99,6 +104,7 @@ class SettingsDialog(QDialog):
         self.config["advanced_mode"] = self.advanced_checkbox.isChecked()
         self.config["ignore_textures"] = self.ignore_textures_checkbox.isChecked()
         self.config["ignore_system_files"] = self.ignore_system_files_checkbox.isChecked()
+        self.config["watch_folder"] = self.watch_folder_checkbox.isChecked()
         # Salva lista de ignorados
         ignored = []
         if hasattr(self, "ignored_list"):
@@ -121,6 +127,7 @@ class SettingsDialog(QDialog):
         self.config["advanced_mode"] = self.advanced_checkbox.isChecked()
         self.config["ignore_textures"] = self.ignore_textures_checkbox.isChecked()
         self.config["ignore_system_files"] = self.ignore_system_files_checkbox.isChecked()
+        self.config["watch_folder"] = self.watch_folder_checkbox.isChecked()
         # Salva lista de ignorados
         ignored = []
         if hasattr(self, "ignored_list"):